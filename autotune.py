@@ -0,0 +1,126 @@
+import json
+import os
+import platform
+import time
+from collections import OrderedDict
+
+import torch
+
+from options.autotune_options import AutotuneOptions
+from models import networks
+from benchmark import parse_list, run_config
+from util.host_config import autocast_context, host_config_path, save_host_config
+
+
+def parse_size(value):
+	height, _, width = value.lower().partition('x')
+	return int(height), int(width or height)
+
+
+def default_threads():
+	cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+	threads = []
+	n = 1
+	while n < cores:
+		threads.append(n)
+		n *= 2
+	return threads + [cores]
+
+
+# largest absolute difference to the fp32 output, in the [-1, 1] output range;
+# both passes draw the same dropout masks, so only the precision differs
+def precision_error(netG, frames, device, precision, seed=0):
+	with torch.inference_mode():
+		torch.manual_seed(seed)
+		reference = netG(frames.to(device)).float()
+		torch.manual_seed(seed)
+		with autocast_context(device, precision):
+			output = netG(frames.to(device)).float()
+	return (output - reference).abs().max().item()
+
+
+def autotune(opt):
+	device = torch.device('cuda:%d' % opt.gpu_ids[0]) if opt.gpu_ids else torch.device('cpu')
+	save_path = os.path.join(opt.checkpoints_dir, opt.name, '%s_net_G%s.pth' % (
+		opt.which_epoch, '_fp16' if opt.fp16_weights else ''))
+	netG = networks.load_G(save_path, opt.input_nc, opt.output_nc, opt.ngf, opt.which_model_netG, opt.norm,
+						   not opt.no_dropout, opt.gpu_ids, False, opt.learn_residual, opt.Add_gauss,
+						   widths=opt.netG_widths, n_blocks=opt.n_blocks, separable=opt.separable_convs)
+	# tuned in the mode TestModel.test() runs the generator in (train mode:
+	# batch statistics in the norms, dropout on), the real inference path
+
+	height, width = parse_size(opt.tune_size)
+	batch_sizes = parse_list(opt.tune_batch_sizes)
+	if device.type == 'cuda':
+		threads = [torch.get_num_threads()]
+		precisions = parse_list(opt.tune_precisions or 'fp32,fp16', str)
+	else:
+		threads = parse_list(opt.tune_threads) if opt.tune_threads else default_threads()
+		precisions = parse_list(opt.tune_precisions or 'fp32,bf16', str)
+		if 'fp16' in precisions:
+			print('skipping fp16 on cpu')
+			precisions.remove('fp16')
+
+	probe = torch.rand(1, opt.input_nc, height, width) * 2 - 1
+	errors = OrderedDict()
+	for precision in precisions:
+		errors[precision] = precision_error(netG, probe, device, precision) if precision != 'fp32' else 0.0
+		if errors[precision] > opt.tune_tolerance:
+			print('rejecting %s: max abs error %.4f > %.4f' % (precision, errors[precision], opt.tune_tolerance))
+	precisions = [p for p in precisions if errors[p] <= opt.tune_tolerance]
+
+	default_n_threads = torch.get_num_threads()
+	results = []
+	for channels_last in (False, True):
+		netG.to(memory_format=torch.channels_last if channels_last else torch.contiguous_format)
+		for n_threads in threads:
+			torch.set_num_threads(n_threads)
+			for precision in precisions:
+				for batch_size in batch_sizes:
+					frames = torch.rand(batch_size, opt.input_nc, height, width) * 2 - 1
+					if channels_last:
+						frames = frames.contiguous(memory_format=torch.channels_last)
+					config = OrderedDict([('threads', n_threads), ('batch_size', batch_size),
+										  ('channels_last', channels_last), ('precision', precision)])
+					try:
+						config.update(run_config(netG, frames, device, precision, opt.bench_warmup, opt.bench_iters))
+					except RuntimeError as e:
+						# e.g. out of memory for the larger batches
+						print('skipping %s: %s' % (json.dumps(config), e))
+						continue
+					config['ms_per_frame'] = config['mean_ms'] / batch_size
+					print(json.dumps(config))
+					results.append(config)
+	torch.set_num_threads(default_n_threads)
+	if not results:
+		raise RuntimeError('no configuration could be run')
+
+	best = min(results, key=lambda r: r['ms_per_frame'])
+	config = OrderedDict([
+		('time', time.strftime('%Y-%m-%d %H:%M:%S')),
+		('host', platform.node()),
+		('platform', platform.platform()),
+		('torch', torch.__version__),
+		('device_type', device.type),
+		('checkpoint', '%s/%s' % (opt.name, opt.which_epoch)),
+		('frame_size', [height, width]),
+		('threads', best['threads']),
+		('batch_size', best['batch_size']),
+		('channels_last', best['channels_last']),
+		('precision', best['precision']),
+		('ms_per_frame', best['ms_per_frame']),
+		('fps', best['fps']),
+		('precision_errors', errors),
+		('results', results)])
+	path = host_config_path(opt)
+	save_host_config(path, config)
+	print('best: %d threads, batch %d, %s%s: %.2f ms/frame, saved to %s' % (
+		best['threads'], best['batch_size'], best['precision'],
+		', channels_last' if best['channels_last'] else '', best['ms_per_frame'], path))
+	return config
+
+
+if __name__ == '__main__':
+	opt = AutotuneOptions().parse()
+	opt.isTrain = False
+	autotune(opt)
@@ -0,0 +1,144 @@
+import json
+import os
+import platform
+import resource
+import time
+from collections import OrderedDict
+
+import torch
+
+from options.benchmark_options import BenchmarkOptions
+from models import networks
+from util.host_config import autocast_context
+from util.timer import StageTimer
+
+
+def parse_list(value, cast=int):
+	return [cast(v.strip()) for v in value.split(',') if v.strip()]
+
+
+def build_generator(opt):
+	if opt.bench_random_init:
+		return networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.which_model_netG, opt.norm,
+								 not opt.no_dropout, opt.gpu_ids, False, opt.learn_residual, opt.Add_gauss, widths=opt.netG_widths,
+								 n_blocks=opt.n_blocks, separable=opt.separable_convs)
+	save_path = os.path.join(opt.checkpoints_dir, opt.name, '%s_net_G%s.pth' % (
+		opt.which_epoch, '_fp16' if opt.fp16_weights else ''))
+	return networks.load_G(save_path, opt.input_nc, opt.output_nc, opt.ngf, opt.which_model_netG, opt.norm,
+						   not opt.no_dropout, opt.gpu_ids, False, opt.learn_residual, opt.Add_gauss, widths=opt.netG_widths,
+						   n_blocks=opt.n_blocks, separable=opt.separable_convs)
+
+
+def load_frames(opt, count):
+	from data.single_dataset import SingleDataset
+	dataset = SingleDataset()
+	dataset.initialize(opt)
+	if len(dataset) == 0:
+		raise ValueError('no frames found in %s' % opt.dataroot)
+	return torch.stack([dataset[i % len(dataset)]['A'] for i in range(count)])
+
+
+def reset_peak_rss():
+	# linux resets VmHWM, the process's peak rss, to the current rss when 5 is
+	# written to clear_refs; elsewhere the peak can only grow
+	try:
+		with open('/proc/self/clear_refs', 'w') as f:
+			f.write('5')
+		return True
+	except OSError:
+		return False
+
+
+def peak_rss_mb():
+	if os.path.exists('/proc/self/status'):
+		with open('/proc/self/status') as f:
+			for line in f:
+				if line.startswith('VmHWM:'):
+					return int(line.split()[1]) / 1024.0
+	# ru_maxrss is in kilobytes on linux and bytes on macos
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return rss / (1024.0 * 1024.0) if platform.system() == 'Darwin' else rss / 1024.0
+
+
+def run_config(netG, frames, device, precision, warmup, iters):
+	timer = StageTimer(window=iters)
+	frames = frames.to(device)
+	with torch.inference_mode(), autocast_context(device, precision):
+		for _ in range(warmup):
+			netG(frames)
+		if device.type == 'cuda':
+			torch.cuda.synchronize()
+			torch.cuda.reset_peak_memory_stats()
+		rss_reset = reset_peak_rss()
+		for _ in range(iters):
+			start = time.perf_counter()
+			netG(frames)
+			if device.type == 'cuda':
+				torch.cuda.synchronize()
+			timer.add('forward', time.perf_counter() - start)
+	pct = timer.percentiles('forward', (50, 95, 99))
+	mean = timer.totals['forward'] / iters
+	result = OrderedDict([('p50_ms', pct['p50'] * 1000), ('p95_ms', pct['p95'] * 1000),
+						  ('p99_ms', pct['p99'] * 1000), ('mean_ms', mean * 1000),
+						  ('fps', frames.size(0) / mean)])
+	# without a reset the peak covers every earlier config too, so leave it out
+	result['peak_rss_mb'] = peak_rss_mb() if rss_reset else None
+	if device.type == 'cuda':
+		result['peak_cuda_mb'] = torch.cuda.max_memory_allocated() / (1024.0 * 1024.0)
+	return result
+
+
+def benchmark(opt):
+	device = torch.device('cuda:%d' % opt.gpu_ids[0]) if opt.gpu_ids else torch.device('cpu')
+	# timed in the mode test.py runs the generator in, as autotune.py does
+	netG = build_generator(opt)
+
+	batch_sizes = parse_list(opt.bench_batch_sizes)
+	sizes = [None] if opt.bench_real else parse_list(opt.bench_sizes)
+	threads = parse_list(opt.bench_threads)
+	precisions = parse_list(opt.bench_precisions, str)
+	default_threads = torch.get_num_threads()
+
+	results = []
+	for n_threads in threads:
+		torch.set_num_threads(n_threads if n_threads > 0 else default_threads)
+		for precision in precisions:
+			if precision == 'fp16' and device.type != 'cuda':
+				print('skipping fp16 on cpu')
+				continue
+			for size in sizes:
+				for batch_size in batch_sizes:
+					if opt.bench_real:
+						frames = load_frames(opt, batch_size)
+					else:
+						frames = torch.rand(batch_size, opt.input_nc, size, size) * 2 - 1
+					config = OrderedDict([('batch_size', batch_size), ('height', frames.size(2)),
+										  ('width', frames.size(3)), ('threads', torch.get_num_threads()),
+										  ('precision', precision)])
+					config.update(run_config(netG, frames, device, precision, opt.bench_warmup, opt.bench_iters))
+					print(json.dumps(config))
+					results.append(config)
+	torch.set_num_threads(default_threads)
+
+	report = OrderedDict([
+		('time', time.strftime('%Y-%m-%d %H:%M:%S')),
+		('host', platform.node()),
+		('platform', platform.platform()),
+		('torch', torch.__version__),
+		('device', str(device)),
+		('which_model_netG', opt.which_model_netG),
+		('checkpoint', 'random' if opt.bench_random_init else '%s/%s' % (opt.name, opt.which_epoch)),
+		('source', 'real' if opt.bench_real else 'synthetic'),
+		('warmup', opt.bench_warmup),
+		('iters', opt.bench_iters),
+		('results', results)])
+	if opt.bench_output:
+		with open(opt.bench_output, 'wt') as f:
+			json.dump(report, f, indent=2)
+	return report
+
+
+if __name__ == '__main__':
+	opt = BenchmarkOptions().parse()
+	opt.isTrain = False
+	benchmark(opt)
@@ -0,0 +1,67 @@
+import json
+from collections import OrderedDict
+
+import torch
+
+from options.benchmark_options import BenchmarkOptions
+from models.deconvolution import Deconvolution, PSFBank
+from benchmark import build_generator, load_frames, parse_list, run_config
+from util import image_metrics
+
+
+def mean_psnr(opt, net, device):
+	from data.single_dataset import SingleDataset
+	dataset = SingleDataset()
+	dataset.initialize(opt)
+	total = 0.0
+	count = min(len(dataset), opt.how_many)
+	with torch.inference_mode():
+		for i in range(count):
+			data = dataset[i]
+			fake_B = net(data['A'].unsqueeze(0).to(device)).float()
+			real_B = data['B'].unsqueeze(0).to(device)
+			if fake_B.shape != real_B.shape:
+				raise ValueError('ground truth %s has shape %s, restored frame has %s' % (
+					data['B_paths'], tuple(real_B.shape), tuple(fake_B.shape)))
+			total += image_metrics.psnr((fake_B + 1) / 2, (real_B + 1) / 2).item()
+	return total / max(1, count)
+
+
+# the generator against Richardson-Lucy and Wiener deconvolution, on the
+# frames of dataroot: latency per batch size and, with --gt_dir, PSNR
+def compare(opt):
+	device = torch.device('cuda:%d' % opt.gpu_ids[0]) if opt.gpu_ids else torch.device('cpu')
+	bank = PSFBank.load(opt.psf_bank) if opt.psf_bank else PSFBank.gaussian(opt.psf_size, opt.psf_nsig)
+	# the generator in the mode test.py runs it in
+	methods = OrderedDict([('generator', build_generator(opt))])
+	for method in ('rl', 'wiener'):
+		methods[method] = Deconvolution(bank, method=method, iters=opt.deconv_iters, wiener_k=opt.wiener_k,
+										tile=opt.deconv_tile, overlap=opt.deconv_overlap,
+										scale=opt.deconv_scale).to(device)
+
+	results = []
+	for name, net in methods.items():
+		psnr = mean_psnr(opt, net, device) if opt.gt_dir else None
+		for batch_size in parse_list(opt.bench_batch_sizes):
+			frames = load_frames(opt, batch_size)
+			result = OrderedDict([('method', name), ('batch_size', batch_size),
+								  ('height', frames.size(2)), ('width', frames.size(3))])
+			result.update(run_config(net, frames, device, 'fp32', opt.bench_warmup, opt.bench_iters))
+			result['PSNR'] = psnr
+			print(json.dumps(result))
+			results.append(result)
+
+	print('%-10s %6s %10s %10s %8s' % ('method', 'batch', 'p50 ms', 'fps', 'PSNR'))
+	for r in results:
+		print('%-10s %6d %10.2f %10.1f %8s' % (r['method'], r['batch_size'], r['p50_ms'], r['fps'],
+											   '%.2f' % r['PSNR'] if r['PSNR'] is not None else '-'))
+	if opt.bench_output:
+		with open(opt.bench_output, 'wt') as f:
+			json.dump(results, f, indent=2)
+	return results
+
+
+if __name__ == '__main__':
+	opt = BenchmarkOptions().parse()
+	opt.isTrain = False
+	compare(opt)
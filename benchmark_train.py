@@ -0,0 +1,147 @@
+import contextlib
+import copy
+import io
+import itertools
+import json
+import multiprocessing
+import platform
+import queue
+import shutil
+import tempfile
+import time
+from collections import OrderedDict
+
+import torch
+
+from options.benchmark_train_options import TrainBenchmarkOptions
+from benchmark import parse_list, peak_rss_mb
+from util.timer import StageTimer
+
+SWEEP_KEYS = ('which_model_netG', 'norm', 'gan_type', 'model', 'batchSize', 'fineSize')
+
+
+def config_key(config):
+	return '/'.join(str(config[k]) for k in SWEEP_KEYS)
+
+
+def run_config(opt, results):
+	# runs in a fresh process, so peak rss belongs to this configuration only
+	from models.models import create_model
+	torch.manual_seed(0)
+	try:
+		with contextlib.redirect_stdout(io.StringIO()):
+			model = create_model(opt)
+		# the sr generators upscale by 4
+		n, size = opt.batchSize, opt.fineSize
+		data = {'A': torch.rand(n, opt.input_nc, size, size) * 2 - 1,
+				'B': torch.rand(n, opt.output_nc, size * 4, size * 4) * 2 - 1,
+				'A_paths': ['synthetic'] * n, 'B_paths': ['synthetic'] * n}
+		use_cuda = len(opt.gpu_ids) > 0
+		for _ in range(opt.bench_warmup):
+			model.set_input(data)
+			model.optimize_parameters()
+		if use_cuda:
+			torch.cuda.synchronize()
+			torch.cuda.reset_peak_memory_stats()
+
+		timer = StageTimer(window=opt.bench_iters)
+		for _ in range(opt.bench_iters):
+			start = time.perf_counter()
+			model.set_input(data)
+			model.optimize_parameters()
+			if use_cuda:
+				torch.cuda.synchronize()
+			timer.add('step', time.perf_counter() - start)
+
+		mean = timer.totals['step'] / opt.bench_iters
+		pct = timer.percentiles('step', (50, 95))
+		result = OrderedDict([('steps_per_sec', 1.0 / mean), ('samples_per_sec', n / mean),
+							  ('p50_ms', pct['p50'] * 1000), ('p95_ms', pct['p95'] * 1000),
+							  ('peak_rss_mb', peak_rss_mb())])
+		if use_cuda:
+			result['peak_cuda_mb'] = torch.cuda.max_memory_allocated() / (1024.0 * 1024.0)
+		results.put(result)
+	except Exception as e:
+		results.put({'error': '%s: %s' % (type(e).__name__, e)})
+
+
+def compare(results, baseline_path, tolerance):
+	with open(baseline_path) as f:
+		baseline = dict((config_key(r), r) for r in json.load(f)['results'])
+	print('%-60s %10s %10s %8s' % ('configuration', 'baseline', 'current', 'ratio'))
+	regressions = 0
+	for r in results:
+		key = config_key(r)
+		old = baseline.get(key)
+		if old is None or 'steps_per_sec' not in old or 'steps_per_sec' not in r:
+			print('%-60s %10s %10s' % (key, '-', '%.3f' % r['steps_per_sec'] if 'steps_per_sec' in r else '-'))
+			continue
+		ratio = r['steps_per_sec'] / old['steps_per_sec']
+		flag = ''
+		if ratio < 1 - tolerance:
+			flag = 'REGRESSION'
+			regressions += 1
+		print('%-60s %10.3f %10.3f %8.3f %s' % (key, old['steps_per_sec'], r['steps_per_sec'], ratio, flag))
+	return regressions
+
+
+def benchmark(opt):
+	opt.isTrain = True
+	opt.continue_train = False
+	opt.display_id = 0
+	opt.vgg_pretrained = False
+	opt.checkpoints_dir = tempfile.mkdtemp(prefix='bench_train_')
+	opt.name = 'bench'
+
+	sweep = [parse_list(opt.bench_netG, str), parse_list(opt.bench_norms, str),
+			 parse_list(opt.bench_gan_types, str), parse_list(opt.bench_models, str),
+			 parse_list(opt.bench_batch_sizes), parse_list(opt.bench_fine_sizes)]
+
+	ctx = multiprocessing.get_context('spawn')
+	results = []
+	try:
+		for values in itertools.product(*sweep):
+			config_opt = copy.copy(opt)
+			config = OrderedDict(zip(SWEEP_KEYS, values))
+			for k, v in config.items():
+				setattr(config_opt, k, v)
+			result_queue = ctx.Queue()
+			process = ctx.Process(target=run_config, args=(config_opt, result_queue))
+			process.start()
+			result = None
+			while result is None:
+				try:
+					result = result_queue.get(timeout=1)
+				except queue.Empty:
+					# e.g. killed for running out of memory
+					if not process.is_alive():
+						result = {'error': 'worker exited with code %s' % process.exitcode}
+			process.join()
+			config.update(result)
+			print(json.dumps(config))
+			results.append(config)
+	finally:
+		shutil.rmtree(opt.checkpoints_dir, ignore_errors=True)
+
+	report = OrderedDict([
+		('time', time.strftime('%Y-%m-%d %H:%M:%S')),
+		('host', platform.node()),
+		('platform', platform.platform()),
+		('torch', torch.__version__),
+		('device', 'cuda:%d' % opt.gpu_ids[0] if opt.gpu_ids else 'cpu'),
+		('threads', torch.get_num_threads()),
+		('warmup', opt.bench_warmup),
+		('iters', opt.bench_iters),
+		('results', results)])
+	if opt.bench_output:
+		with open(opt.bench_output, 'wt') as f:
+			json.dump(report, f, indent=2)
+	if opt.bench_baseline:
+		compare(results, opt.bench_baseline, opt.bench_tolerance)
+	return report
+
+
+if __name__ == '__main__':
+	multiprocessing.freeze_support()
+	opt = TrainBenchmarkOptions().parse()
+	benchmark(opt)
@@ -0,0 +1,15 @@
+# Writes <epoch>_net_G_fp16.pth next to <epoch>_net_G.pth: the same generator
+# weights in half precision, about half the size and loaded back as float32
+# with --fp16_weights.
+import os
+
+from options.test_options import TestOptions
+from util.checkpoint import atomic_save, compact, load_weights
+
+if __name__ == '__main__':
+	opt = TestOptions().parse(quiet=True)
+	save_dir = os.path.join(opt.checkpoints_dir, opt.name)
+	src = os.path.join(save_dir, '%s_net_G.pth' % opt.which_epoch)
+	dst = os.path.join(save_dir, '%s_net_G_fp16.pth' % opt.which_epoch)
+	atomic_save(compact(load_weights(src, mmap=False)), dst)
+	print('%s (%.1f MB) -> %s (%.1f MB)' % (src, os.path.getsize(src) / 1e6, dst, os.path.getsize(dst) / 1e6))
@@ -1,3 +1,4 @@
+import random
 import torch.utils.data as data
 from PIL import Image
 import torchvision.transforms as transforms
@@ -39,6 +40,20 @@ def get_transform(opt):
     return transforms.Compose(transform_list)
 
 
+# Random |size| x |size| crop of the (C, H, W) tensor A and the same region of
+# B, whose resolution may be an integer multiple of A's (the generator upscales).
+def paired_crop(A, B, size):
+    h, w = A.size(1), A.size(2)
+    if size <= 0 or (size >= h and size >= w):
+        return A, B
+    scale = B.size(1) // h
+    top = random.randint(0, max(0, h - size))
+    left = random.randint(0, max(0, w - size))
+    A = A[:, top:top + size, left:left + size]
+    B = B[:, top * scale:(top + size) * scale, left * scale:(left + size) * scale]
+    return A, B
+
+
 def __scale_width(img, target_width):
     ow, oh = img.size
     if ow == target_width:
@@ -1,5 +1,7 @@
+import copy
 import torch.utils.data
 from data.base_data_loader import BaseDataLoader
+from data.resumable_sampler import ResumableSampler
 
 
 def CreateDataset(opt):
@@ -30,16 +32,39 @@ class CustomDatasetDataLoader(BaseDataLoader):
         super(CustomDatasetDataLoader, self).initialize(opt)
         print("Opt.nThreads = ", opt.nThreads)
         self.dataset = CreateDataset(opt)
-        self.dataloader = torch.utils.data.DataLoader(
+        self.sampler = ResumableSampler(self.dataset, shuffle=not opt.serial_batches)
+        self.dataloader = self._create_dataloader(opt.batchSize)
+
+    def _create_dataloader(self, batch_size):
+        return torch.utils.data.DataLoader(
             self.dataset,
-            batch_size=opt.batchSize,
-            shuffle=not opt.serial_batches,
-            num_workers=int(opt.nThreads),
+            batch_size=batch_size,
+            sampler=self.sampler,
+            num_workers=int(self.opt.nThreads),
             pin_memory=True # True if cache is large
         )
 
     def load_data(self):
         return self.dataloader
 
+    # |start| is the number of samples of |epoch| that were already consumed
+    def set_epoch(self, epoch, start=0):
+        self.sampler.set_epoch(epoch, start)
+
+    # crop size and batch size of the following epochs, see ResolutionSchedule.
+    # Workers are started per epoch, so they pick up the new crop size.
+    def set_resolution(self, fine_size, batch_size):
+        if fine_size != self.dataset.opt.fineSize:
+            self.dataset.opt = copy.copy(self.dataset.opt)
+            self.dataset.opt.fineSize = fine_size
+        if batch_size != self.dataloader.batch_size:
+            self.dataloader = self._create_dataloader(batch_size)
+
+    def state_dict(self):
+        return self.sampler.state_dict()
+
+    def load_state_dict(self, state):
+        self.sampler.load_state_dict(state)
+
     def __len__(self):
         return min(len(self.dataset), self.opt.max_dataset_size)
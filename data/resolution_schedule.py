@@ -0,0 +1,42 @@
+class ResolutionSchedule():
+    """Crop size and batch size per epoch range.
+
+    |spec| is a comma separated list of epoch:fineSize[:batchSize] entries, each
+    in effect from its epoch until the next one, e.g. '1:16:64,4:32:16,8:0:4'
+    (fineSize 0 trains on full frames). Before the first entry the options'
+    fineSize and batchSize apply. An entry without a batch size gets one that
+    keeps the pixels per step of |base_batch| crops of |base_size| (|full_size|
+    is the frame size, used for fineSize 0), so small crops train with large
+    batches at about the same step time.
+    """
+
+    def __init__(self, spec, base_batch, base_size, full_size):
+        self.base = (base_size, base_batch)
+        self.full_size = full_size
+        self.pixels_per_step = base_batch * (base_size or full_size) ** 2
+        self.stages = []
+        for entry in spec.split(','):
+            if not entry.strip():
+                continue
+            fields = [int(f) for f in entry.strip().split(':')]
+            if len(fields) not in (2, 3):
+                raise ValueError("Resolution schedule entry [%s] not recognized." % entry)
+            epoch, fine_size = fields[:2]
+            batch_size = fields[2] if len(fields) == 3 else self._scaled_batch(fine_size)
+            self.stages.append((epoch, fine_size, batch_size))
+        self.stages.sort()
+
+    def _scaled_batch(self, fine_size):
+        size = min(fine_size, self.full_size) if fine_size > 0 else self.full_size
+        return max(1, int(round(float(self.pixels_per_step) / (size * size))))
+
+    # (fineSize, batchSize) of |epoch|
+    def stage(self, epoch):
+        fine_size, batch_size = self.base
+        for start, stage_size, stage_batch in self.stages:
+            if epoch >= start:
+                fine_size, batch_size = stage_size, stage_batch
+        return fine_size, batch_size
+
+    def __str__(self):
+        return ', '.join('epoch %d+: fineSize %d batchSize %d' % stage for stage in self.stages)
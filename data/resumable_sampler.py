@@ -0,0 +1,44 @@
+import torch
+import torch.utils.data as data
+
+
+class ResumableSampler(data.Sampler):
+    """Sampler whose order is a pure function of (seed, epoch).
+
+    Because the permutation can be rebuilt from its state, training can resume in
+    the middle of an epoch by skipping the indices that were already consumed,
+    without loading those samples again.
+    """
+
+    def __init__(self, data_source, shuffle=True, seed=None):
+        self.data_source = data_source
+        self.shuffle = shuffle
+        if seed is None:
+            seed = int(torch.randint(0, 2 ** 31 - 1, (1,)).item())
+        self.seed = seed
+        self.epoch = 0
+        self.start = 0
+
+    def set_epoch(self, epoch, start=0):
+        self.epoch = epoch
+        self.start = start
+
+    def __iter__(self):
+        n = len(self.data_source)
+        if self.shuffle:
+            generator = torch.Generator()
+            generator.manual_seed(self.seed + self.epoch)
+            order = torch.randperm(n, generator=generator).tolist()
+        else:
+            order = list(range(n))
+        return iter(order[self.start:])
+
+    def __len__(self):
+        return max(0, len(self.data_source) - self.start)
+
+    def state_dict(self):
+        return {'seed': self.seed, 'epoch': self.epoch, 'start': self.start}
+
+    def load_state_dict(self, state):
+        self.seed = state['seed']
+        self.set_epoch(state['epoch'], state['start'])
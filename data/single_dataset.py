@@ -22,17 +22,26 @@ class SingleDataset(BaseDataset):
         self.dir_A = os.path.join(opt.dataroot)
         self.A_paths = make_dataset(self.dir_A)
         self.A_paths = sorted(self.A_paths)
+        # optional ground truth, matched to each input by file name
+        self.dir_B = getattr(opt, 'gt_dir', '')
+
+    def load_image(self, path):
+        img = Image.open(path)
+        if len(img.size) == 2:
+            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        elif len(img.size) ==3:
+            img = Image.open(path).convert('RGB')
+        return self.transform(img)
 
     def __getitem__(self, index):
         A_path = self.A_paths[index]
+        A_img = self.load_image(A_path)
 
-        A_img = Image.open(A_path)
-        if len(A_img.size) == 2:
-            A_img = cv2.imread(A_path, cv2.IMREAD_GRAYSCALE)
-        elif len(A_img.size) ==3:
-            A_img = Image.open(A_path).convert('RGB')
-        A_img = self.transform(A_img)
-
+        if self.dir_B:
+            B_path = os.path.join(self.dir_B, os.path.basename(A_path))
+            if not os.path.isfile(B_path):
+                raise IOError('no ground truth %s for %s' % (B_path, A_path))
+            return {'A': A_img, 'A_paths': A_path, 'B': self.load_image(B_path), 'B_paths': B_path}
         return {'A': A_img, 'A_paths': A_path}
 
     def __len__(self):
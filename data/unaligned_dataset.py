@@ -1,6 +1,6 @@
 import os.path
 import torchvision.transforms as transforms
-from data.base_dataset import BaseDataset, get_transform
+from data.base_dataset import BaseDataset, get_transform, paired_crop
 from data.image_folder import make_dataset
 from PIL import Image
 import cv2
@@ -45,6 +45,8 @@ class UnalignedDataset(BaseDataset):
 
         A_img = self.transform(A_img)
         B_img = self.transform(B_img)
+        if self.opt.fineSize > 0 and self.opt.phase == 'train':
+            A_img, B_img = paired_crop(A_img, B_img, self.opt.fineSize)
 
         return {'A': A_img, 'B': B_img,
                 'A_paths': A_path, 'B_paths': B_path}
@@ -1,5 +1,7 @@
 import os
 import torch
+from util.timer import StageTimer
+from util.checkpoint import CheckpointManager, compact, load_weights
 
 
 class BaseModel():
@@ -12,6 +14,8 @@ class BaseModel():
         self.isTrain = opt.isTrain
         self.Tensor = torch.cuda.FloatTensor if self.gpu_ids else torch.Tensor
         self.save_dir = os.path.join(opt.checkpoints_dir, opt.name)
+        self.timer = StageTimer(enabled=False)
+        self.checkpoints = CheckpointManager(self.save_dir, keep=getattr(opt, 'keep_checkpoints', 3))
 
     def set_input(self, input):
         self.input = input
@@ -35,23 +39,39 @@ class BaseModel():
     def get_current_errors(self):
         return {}
 
+    # same keys as get_current_errors, as detached tensors (no device sync)
+    def get_current_losses(self):
+        return {}
+
     def save(self, label):
         pass
 
+    # full training state for resuming, see CheckpointManager
+    def get_train_state(self):
+        return {}
+
+    def load_train_state(self, state):
+        pass
+
     # helper saving function that can be used by subclasses
+    # the state dict is snapshotted to cpu and written in the background
     def save_network(self, network, network_label, epoch_label, gpu_ids):
         save_filename = '%s_net_%s.pth' % (epoch_label, network_label)
         save_path = os.path.join(self.save_dir, save_filename)
-        torch.save(network.cpu().state_dict(), save_path)
-        if len(gpu_ids) and torch.cuda.is_available():
-            network.cuda(device=gpu_ids[0])
+        self.checkpoints.write(network.state_dict(), save_path)
+        if network_label == 'G' and getattr(self.opt, 'save_fp16', False):
+            self.checkpoints.write(compact(network.state_dict()), self.weights_path('G', epoch_label, fp16=True))
 
+    # <epoch>_net_<label>.pth, or the half precision <epoch>_net_<label>_fp16.pth
+    def weights_path(self, network_label, epoch_label, fp16=None):
+        if fp16 is None:
+            fp16 = getattr(self.opt, 'fp16_weights', False)
+        save_filename = '%s_net_%s%s.pth' % (epoch_label, network_label, '_fp16' if fp16 else '')
+        return os.path.join(self.save_dir, save_filename)
 
     # helper loading function that can be used by subclasses
     def load_network(self, network, network_label, epoch_label):
-        save_filename = '%s_net_%s.pth' % (epoch_label, network_label)
-        save_path = os.path.join(self.save_dir, save_filename)
-        network.load_state_dict(torch.load(save_path))
+        network.load_state_dict(load_weights(self.weights_path(network_label, epoch_label)))
 
     def update_learning_rate():
         pass
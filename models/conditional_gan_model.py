@@ -33,7 +33,9 @@ class ConditionalGAN(BaseModel):
         print("Use Parallel = ", "True" if use_parallel else "False")
         self.netG = networks.define_G(
             opt.input_nc, opt.output_nc, opt.ngf, opt.which_model_netG, opt.norm,
-            not opt.no_dropout, self.gpu_ids, use_parallel, opt.learn_residual, opt.Add_gauss
+            not opt.no_dropout, self.gpu_ids, use_parallel, opt.learn_residual, opt.Add_gauss,
+            init_weights=self.isTrain and not opt.continue_train, widths=opt.netG_widths,
+            n_blocks=opt.n_blocks, separable=opt.separable_convs
         )
         if self.isTrain:
             use_sigmoid = opt.gan_type == 'gan'
@@ -94,39 +96,113 @@ class ConditionalGAN(BaseModel):
 
     # no backprop gradients
     def test(self):
-        self.real_A = Variable(self.input_A, volatile=True)
-        self.fake_B = self.netG.forward(self.real_A)
-        self.real_B = Variable(self.input_B, volatile=True)
+        with torch.inference_mode():
+            self.real_A = self.input_A
+            self.fake_B = self.netG.forward(self.real_A)
+            self.real_B = self.input_B
 
     # get image paths
     def get_image_paths(self):
         return self.image_paths
 
-    def backward_D(self):
+    # |scale|: share of the micro-batch in the effective batch, see optimize_parameters
+    def backward_D(self, scale=1.0):
         self.loss_D = self.discLoss.get_loss(self.netD, self.real_A, self.fake_B, self.real_B)
 
-        self.loss_D.backward(retain_graph=True)
+        (self.loss_D * scale).backward(retain_graph=True)
 
-    def backward_G(self):
+    def backward_G(self, scale=1.0):
         self.loss_G_GAN = self.discLoss.get_g_loss(self.netD, self.real_A, self.fake_B)
         # Second, G(A) = B
-        self.loss_G_Content = self.contentLoss.get_loss(self.fake_B, self.real_B) * self.opt.lambda_A
-
-        self.loss_G = self.loss_G_GAN + self.loss_G_Content
-
-        self.loss_G.backward()
-
+        with self.timer.stage('content'):
+            self.loss_G_Content = self.contentLoss.get_loss(self.fake_B, self.real_B) * self.opt.lambda_A
+
+        self.loss_G = self.loss_G_GAN + self.loss_G_Content + self.extra_G_loss()
+
+        (self.loss_G * scale).backward()
+
+    # additional generator loss terms of subclasses
+    def extra_G_loss(self):
+        return 0
+
+    # losses set by backward_G, averaged over the micro-batches of a step
+    def G_loss_names(self):
+        return ['loss_G_GAN', 'loss_G_Content']
+
+    def micro_batches(self):
+        n = self.input_A.size(0)
+        k = max(1, min(getattr(self.opt, 'accum_steps', 1), n))
+        return [(A, B, A.size(0) / float(n))
+                for A, B in zip(self.input_A.tensor_split(k), self.input_B.tensor_split(k))]
+
+    # runs |step|(scale) on every micro-batch and sets the losses in |names| to
+    # their mean over the whole batch
+    def _accumulate(self, micro_batches, step, names):
+        input_A, input_B = self.input_A, self.input_B
+        totals = dict((name, 0) for name in names)
+        try:
+            for A, B, scale in micro_batches:
+                self.input_A, self.input_B = A, B
+                step(scale)
+                for name in names:
+                    value = getattr(self, name)
+                    totals[name] = totals[name] + (value.detach() if torch.is_tensor(value) else value) * scale
+        finally:
+            self.input_A, self.input_B = input_A, input_B
+        for name in names:
+            setattr(self, name, totals[name])
+
+    def _step_D(self, scale):
+        with self.timer.stage('forward'):
+            with torch.no_grad():
+                self.forward()
+        with self.timer.stage('D'):
+            self.backward_D(scale)
+
+    def _step_G(self, scale):
+        with self.timer.stage('forward'):
+            self.forward()
+        with self.timer.stage('G'):
+            self.backward_G(scale)
+
+    # With --accum_steps K the batch is split into K micro-batches whose
+    # gradients are summed before each optimizer step, every loss scaled by the
+    # share of its micro-batch, so a step sees the gradients of the whole batch
+    # while only one micro-batch of activations is alive. The D updates use
+    # generator outputs computed without graph, the G update recomputes them.
     def optimize_parameters(self):
-        self.forward()
-
-        for iter_d in xrange(self.criticUpdates):
-            self.optimizer_D.zero_grad()
-            self.backward_D()
-            self.optimizer_D.step()
-
-        self.optimizer_G.zero_grad()
-        self.backward_G()
-        self.optimizer_G.step()
+        micro_batches = self.micro_batches()
+        if len(micro_batches) > 1:
+            # one 'forward', 'D' and 'G' sample per step, as without accumulation
+            with self.timer.merged():
+                for iter_d in xrange(self.criticUpdates):
+                    with self.timer.stage('D'):
+                        self.optimizer_D.zero_grad()
+                    self._accumulate(micro_batches, self._step_D, ['loss_D'])
+                    with self.timer.stage('D'):
+                        self.optimizer_D.step()
+
+                with self.timer.stage('G'):
+                    self.optimizer_G.zero_grad()
+                self._accumulate(micro_batches, self._step_G, self.G_loss_names())
+                with self.timer.stage('G'):
+                    self.optimizer_G.step()
+            return
+
+        # the 'G' stage includes the nested 'content' stage
+        with self.timer.stage('forward'):
+            self.forward()
+
+        with self.timer.stage('D'):
+            for iter_d in xrange(self.criticUpdates):
+                self.optimizer_D.zero_grad()
+                self.backward_D()
+                self.optimizer_D.step()
+
+        with self.timer.stage('G'):
+            self.optimizer_G.zero_grad()
+            self.backward_G()
+            self.optimizer_G.step()
 
     def get_current_errors(self):
         return OrderedDict([('G_GAN', self.loss_G_GAN.item()),
@@ -134,6 +210,12 @@ class ConditionalGAN(BaseModel):
                             ('D_real+fake', self.loss_D.item())
                             ])
 
+    def get_current_losses(self):
+        return OrderedDict([('G_GAN', self.loss_G_GAN.detach()),
+                            ('G_L1', self.loss_G_Content.detach()),
+                            ('D_real+fake', self.loss_D.detach())
+                            ])
+
     def get_current_visuals(self):
         real_A = util.tensor2im(self.real_A.data)
         fake_B = util.tensor2im(self.fake_B.data)
@@ -144,6 +226,20 @@ class ConditionalGAN(BaseModel):
         self.save_network(self.netG, 'G', label, self.gpu_ids)
         self.save_network(self.netD, 'D', label, self.gpu_ids)
 
+    def get_train_state(self):
+        return {'netG': self.netG.state_dict(),
+                'netD': self.netD.state_dict(),
+                'optimizer_G': self.optimizer_G.state_dict(),
+                'optimizer_D': self.optimizer_D.state_dict(),
+                'old_lr': self.old_lr}
+
+    def load_train_state(self, state):
+        self.netG.load_state_dict(state['netG'])
+        self.netD.load_state_dict(state['netD'])
+        self.optimizer_G.load_state_dict(state['optimizer_G'])
+        self.optimizer_D.load_state_dict(state['optimizer_D'])
+        self.old_lr = state['old_lr']
+
     def update_learning_rate(self):
         lrd = self.opt.lr / self.opt.niter_decay
         lr = self.old_lr - lrd
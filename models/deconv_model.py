@@ -0,0 +1,57 @@
+import numpy as np
+import torch
+from collections import OrderedDict
+import util.util as util
+from .base_model import BaseModel
+from .deconvolution import Deconvolution, PSFBank
+from util.manifest import config_digest, file_digest
+
+
+class DeconvModel(BaseModel):
+    """Non-learned drop-in for TestModel: space-variant deconvolution with a PSF bank.
+
+    netG is a models.deconvolution.Deconvolution, so the rest of test.py is
+    unchanged. Without --psf_bank the Gaussian of the generator's Conv_gauss
+    branch is used everywhere in the field.
+    """
+
+    def name(self):
+        return 'DeconvModel'
+
+    def __init__(self, opt):
+        assert(not opt.isTrain)
+        super(DeconvModel, self).__init__(opt)
+        bank = PSFBank.load(opt.psf_bank) if opt.psf_bank else PSFBank.gaussian(opt.psf_size, opt.psf_nsig)
+        self.device = torch.device('cuda:%d' % self.gpu_ids[0]) if self.gpu_ids else torch.device('cpu')
+        self.netG = Deconvolution(bank, method=opt.deconv_method, iters=opt.deconv_iters, wiener_k=opt.wiener_k,
+                                  tile=opt.deconv_tile, overlap=opt.deconv_overlap,
+                                  scale=opt.deconv_scale).to(self.device)
+        print('deconvolution: %s, %dx%d PSF grid of %dx%d, tiles %d overlap %d' % (
+            opt.deconv_method, bank.grid[0], bank.grid[1], bank.size, bank.size, opt.deconv_tile, opt.deconv_overlap))
+
+    def set_input(self, input):
+        self.input_A = input['A'].to(self.device)
+        self.input_B = input['B'].to(self.device) if 'B' in input else None
+        self.image_paths = input['A_paths']
+
+    def test(self):
+        with torch.no_grad():
+            self.real_A = self.input_A
+            with self.timer.stage('generator'):
+                self.fake_B = self.netG(self.real_A)
+
+    # the PSFs and the options that change the output, see util.manifest
+    def checkpoint_id(self):
+        opt = self.opt
+        psfs = file_digest(opt.psf_bank) if opt.psf_bank else [opt.psf_size, opt.psf_nsig]
+        return config_digest(['deconv', psfs, opt.deconv_method, opt.deconv_iters, opt.wiener_k, opt.deconv_tile,
+                              opt.deconv_overlap, opt.deconv_scale, opt.output_bit_depth])
+
+    def get_image_paths(self):
+        return self.image_paths
+
+    def get_current_visuals(self):
+        imtype = np.uint16 if getattr(self.opt, 'output_bit_depth', 8) == 16 else np.uint8
+        real_A = util.tensor2im(self.real_A.data, imtype)
+        fake_B = util.tensor2im(self.fake_B.data, imtype)
+        return OrderedDict([('real_A', real_A), ('fake_B', fake_B)])
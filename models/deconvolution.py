@@ -0,0 +1,171 @@
+import math
+from collections import OrderedDict
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from .networks import gkern
+
+
+class PSFBank():
+    """Point spread functions calibrated on a regular grid over the field.
+
+    |psfs| is (grid_h, grid_w, k, k); PSF [i, j] was measured around the field
+    position ((i + 0.5) / grid_h, (j + 0.5) / grid_w). The PSF at any other
+    position is the bilinear blend of its four nearest grid PSFs.
+    """
+
+    def __init__(self, psfs):
+        psfs = torch.as_tensor(np.asarray(psfs, dtype=np.float32))
+        if psfs.dim() == 2:
+            psfs = psfs[None, None]
+        if psfs.dim() != 4 or psfs.size(2) != psfs.size(3) or psfs.size(2) % 2 == 0:
+            raise ValueError('PSF bank must be (grid_h, grid_w, k, k) with an odd k, got %s' % (tuple(psfs.shape),))
+        self.psfs = psfs / psfs.sum(dim=(2, 3), keepdim=True)
+        self.grid = tuple(psfs.shape[:2])
+        self.size = psfs.size(2)
+
+    @staticmethod
+    def load(path):
+        """A .npy file of (grid_h, grid_w, k, k) or (k, k) PSFs."""
+        return PSFBank(np.load(path))
+
+    @staticmethod
+    def gaussian(size=5, nsig=1):
+        return PSFBank(gkern(size, nsig))
+
+    def _axis(self, positions, n):
+        f = (positions * n - 0.5).clamp(0, n - 1)
+        i0 = f.floor().long()
+        i1 = (i0 + 1).clamp(max=n - 1)
+        return i0, i1, f - i0.float()
+
+    def at(self, y, x):
+        """PSFs at normalized field positions |y|, |x| (1D tensors of the same length)."""
+        y0, y1, wy = self._axis(y, self.grid[0])
+        x0, x1, wx = self._axis(x, self.grid[1])
+        wy, wx = wy[:, None, None], wx[:, None, None]
+        psfs = ((1 - wy) * (1 - wx) * self.psfs[y0, x0] + (1 - wy) * wx * self.psfs[y0, x1] +
+                wy * (1 - wx) * self.psfs[y1, x0] + wy * wx * self.psfs[y1, x1])
+        return psfs / psfs.sum(dim=(1, 2), keepdim=True)
+
+
+def taper_window(tile, overlap):
+    """1 in the middle, raised cosine over |overlap| pixels at both ends;
+    windows |tile| - |overlap| apart sum to 1."""
+    w = torch.ones(tile)
+    if overlap > 0:
+        ramp = 0.5 - 0.5 * torch.cos(math.pi * (torch.arange(overlap, dtype=torch.float32) + 0.5) / overlap)
+        w[:overlap] = ramp
+        w[-overlap:] = ramp.flip(0)
+    return w
+
+
+class Deconvolution(nn.Module):
+    """Space-variant deconvolution by overlapping tiles.
+
+    The frame is cut into |tile| x |tile| tiles |overlap| pixels apart from
+    their neighbours. Every tile is deconvolved with the PSF of its centre,
+    all tiles at once through batched FFTs, and blended back with tapered
+    windows (overlap-add). The FFTs are circular, so each tile is cut with
+    a margin of twice the PSF size of real neighbouring pixels (replicated
+    at the frame border), tapered to the tile mean towards its edges and
+    dropped afterwards; the wrap-around stays in the margin instead of
+    ringing at every tile border. 'wiener' is a single regularized inverse filter,
+    'rl' runs |iters| Richardson-Lucy iterations. The restored frame is then
+    upsampled |scale| times (bicubic) to match the generator output. The
+    transfer functions of the tiles are cached per frame size.
+    """
+
+    def __init__(self, bank, method='rl', iters=10, wiener_k=0.01, tile=64, overlap=16, scale=4):
+        super(Deconvolution, self).__init__()
+        if method not in ('rl', 'wiener'):
+            raise ValueError("Deconvolution method [%s] not recognized." % method)
+        if not 0 <= overlap < tile:
+            raise ValueError('overlap must be smaller than the tile size')
+        self.bank = bank
+        self.method = method
+        self.iters = iters
+        self.wiener_k = wiener_k
+        self.tile = tile
+        self.overlap = overlap
+        self.margin = 2 * bank.size
+        self.scale = scale
+        w = taper_window(tile, overlap)
+        self.register_buffer('window', w[:, None] * w[None, :])
+        w = taper_window(tile + 2 * self.margin, self.margin)
+        self.register_buffer('margin_window', w[:, None] * w[None, :])
+        self.otfs = OrderedDict()
+
+    def _layout(self, height, width):
+        stride = self.tile - self.overlap
+        # border pad so every pixel is covered with full weight
+        pad = self.overlap
+        ny = max(1, int(math.ceil(float(height + 2 * pad - self.tile) / stride)) + 1)
+        nx = max(1, int(math.ceil(float(width + 2 * pad - self.tile) / stride)) + 1)
+        return stride, pad, ny, nx
+
+    def _otf(self, height, width, device):
+        key = (height, width, str(device))
+        if key not in self.otfs:
+            stride, pad, ny, nx = self._layout(height, width)
+            cy = (torch.arange(ny, dtype=torch.float32) * stride + self.tile / 2.0 - pad) / height
+            cx = (torch.arange(nx, dtype=torch.float32) * stride + self.tile / 2.0 - pad) / width
+            psfs = self.bank.at(cy[:, None].expand(ny, nx).reshape(-1), cx[None, :].expand(ny, nx).reshape(-1))
+            k = self.bank.size
+            size = self.tile + 2 * self.margin
+            kernel = torch.zeros(ny * nx, size, size)
+            kernel[:, :k, :k] = psfs
+            # centre of the PSF at the origin, so filtering does not shift the tile
+            kernel = torch.roll(kernel, shifts=(-(k // 2), -(k // 2)), dims=(1, 2))
+            self.otfs[key] = torch.fft.rfft2(kernel.view(ny, nx, size, size)).to(device)
+            # a handful of frame sizes at most
+            while len(self.otfs) > 8:
+                self.otfs.popitem(last=False)
+        return self.otfs[key]
+
+    def _filter(self, x, otf):
+        return torch.fft.irfft2(torch.fft.rfft2(x) * otf, s=x.shape[-2:])
+
+    def _deconvolve(self, tiles, otf):
+        # periodic continuation without a step at the tile edges
+        mean = tiles.mean(dim=(-2, -1), keepdim=True)
+        tiles = mean + (tiles - mean) * self.margin_window.to(tiles.device)
+        if self.method == 'wiener':
+            spectrum = torch.fft.rfft2(tiles) * otf.conj() / (otf.abs() ** 2 + self.wiener_k)
+            return torch.fft.irfft2(spectrum, s=tiles.shape[-2:])
+        estimate = tiles
+        for _ in range(self.iters):
+            blurred = self._filter(estimate, otf).clamp(min=1e-6)
+            estimate = estimate * self._filter(tiles / blurred, otf.conj())
+        return estimate
+
+    def forward(self, input):
+        n, c, height, width = input.shape
+        stride, pad, ny, nx = self._layout(height, width)
+        # intensities in [0, 1], RL needs them positive
+        x = ((input.float() + 1) / 2).clamp(min=0)
+        padded_h = (ny - 1) * stride + self.tile
+        padded_w = (nx - 1) * stride + self.tile
+        m = self.margin
+        x = F.pad(x, (pad + m, padded_w - width - pad + m, pad + m, padded_h - height - pad + m), mode='replicate')
+
+        size = self.tile + 2 * m
+        tiles = x.unfold(2, size, stride).unfold(3, size, stride)
+        restored = self._deconvolve(tiles, self._otf(height, width, input.device))
+        restored = restored[..., m:m + self.tile, m:m + self.tile]
+
+        # overlap-add of the windowed tiles, normalized by the summed windows
+        window = self.window.to(input.device)
+        weighted = (restored * window).permute(0, 1, 4, 5, 2, 3).reshape(n, c * self.tile * self.tile, ny * nx)
+        size = (padded_h, padded_w)
+        out = F.fold(weighted, size, self.tile, stride=stride)
+        norm = F.fold(window.reshape(1, -1, 1).expand(1, -1, ny * nx), size, self.tile, stride=stride)
+        out = (out / norm.clamp(min=1e-6))[:, :, pad:pad + height, pad:pad + width]
+
+        out = out * 2 - 1
+        if self.scale != 1:
+            out = F.interpolate(out, scale_factor=self.scale, mode='bicubic', align_corners=False)
+        return out.clamp(-1, 1)
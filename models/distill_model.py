@@ -0,0 +1,92 @@
+import os
+import torch
+import torch.nn as nn
+from .conditional_gan_model import ConditionalGAN
+from . import networks
+
+
+class DistillModel(ConditionalGAN):
+    """ConditionalGAN whose generator also learns from a frozen teacher.
+
+    On top of the GAN and content losses, netG (the student) is pulled towards
+    the teacher's output (L1, lambda_distill) and towards its features at the
+    taps of networks.feature_taps (MSE, lambda_feat). 1x1 convs map student
+    features to the teacher's widths; they are trained with netG and only
+    used for the loss. The teacher runs under no_grad in the same mode as in
+    test.py. Only netG and netD are saved, so the student loads like any
+    other generator.
+    """
+
+    def name(self):
+        return 'DistillModel'
+
+    def __init__(self, opt):
+        super(DistillModel, self).__init__(opt)
+        device = next(self.netG.parameters()).device
+        teacher_path = os.path.join(opt.checkpoints_dir, opt.teacher_name, '%s_net_G.pth' % opt.teacher_epoch)
+        self.teacher = networks.load_G(teacher_path, opt.input_nc, opt.output_nc, opt.ngf, opt.teacher_model,
+                                       opt.norm, not opt.no_dropout, [], False, opt.learn_residual, opt.Add_gauss,
+                                       widths=opt.teacher_widths).to(device)
+        # left in the mode test.py runs generators in, so the student learns
+        # the outputs the teacher actually produces at inference
+        for param in self.teacher.parameters():
+            param.requires_grad = False
+
+        self.student_features = []
+        self.teacher_features = []
+        student_taps = networks.feature_taps(self.netG)
+        teacher_taps = networks.feature_taps(self.teacher)
+        for (module, _), (teacher_module, _) in zip(student_taps, teacher_taps):
+            module.register_forward_hook(lambda m, i, output: self.student_features.append(output))
+            teacher_module.register_forward_hook(lambda m, i, output: self.teacher_features.append(output))
+        self.adapters = nn.ModuleList([nn.Conv2d(channels, teacher_channels, kernel_size=1)
+                                       for (_, channels), (_, teacher_channels) in zip(student_taps, teacher_taps)])
+        self.adapters.to(device)
+
+        self.optimizer_G = torch.optim.Adam(list(self.netG.parameters()) + list(self.adapters.parameters()),
+                                            lr=opt.lr, betas=(opt.beta1, 0.999))
+        self.criterionDistill = nn.L1Loss()
+        self.criterionFeat = nn.MSELoss()
+
+    def forward(self):
+        del self.student_features[:]
+        del self.teacher_features[:]
+        ConditionalGAN.forward(self)
+        with torch.no_grad():
+            self.teacher_B = self.teacher(self.real_A)
+
+    def test(self):
+        ConditionalGAN.test(self)
+        del self.student_features[:]
+
+    def extra_G_loss(self):
+        self.loss_G_Distill = self.criterionDistill(self.fake_B, self.teacher_B) * self.opt.lambda_distill
+        self.loss_G_Feat = 0
+        for adapter, student, teacher in zip(self.adapters, self.student_features, self.teacher_features):
+            self.loss_G_Feat = self.loss_G_Feat + self.criterionFeat(adapter(student), teacher)
+        self.loss_G_Feat = self.loss_G_Feat * self.opt.lambda_feat
+        return self.loss_G_Distill + self.loss_G_Feat
+
+    def G_loss_names(self):
+        return ConditionalGAN.G_loss_names(self) + ['loss_G_Distill', 'loss_G_Feat']
+
+    def get_current_errors(self):
+        errors = ConditionalGAN.get_current_errors(self)
+        errors['G_distill'] = self.loss_G_Distill.item()
+        errors['G_feat'] = self.loss_G_Feat.item()
+        return errors
+
+    def get_current_losses(self):
+        losses = ConditionalGAN.get_current_losses(self)
+        losses['G_distill'] = self.loss_G_Distill.detach()
+        losses['G_feat'] = self.loss_G_Feat.detach()
+        return losses
+
+    def get_train_state(self):
+        state = ConditionalGAN.get_train_state(self)
+        state['adapters'] = self.adapters.state_dict()
+        return state
+
+    def load_train_state(self, state):
+        ConditionalGAN.load_train_state(self, state)
+        self.adapters.load_state_dict(state['adapters'])
@@ -23,19 +23,25 @@ class PerceptualLoss():
 	
 	def contentFunc(self):
 		conv_3_3_layer = 14+1
-		cnn = models.vgg19(pretrained=True).features
-		cnn = cnn.cuda()
+		if self.pretrained:
+			cnn = models.vgg19(pretrained=True).features
+		else:
+			cnn = models.vgg19().features
 		model = nn.Sequential()
 		model.add_module(str(0), nn.Conv2d(1, 3, kernel_size=(3, 3), stride=(1, 1), padding=(1, 1)))
-		model = model.cuda()
 		for i, layer in enumerate(list(cnn)):
 			model.add_module(str(i+1), layer)
 			if i == conv_3_3_layer:
 				break
+		if self.use_gpu:
+			model = model.cuda()
 		return model
 		
-	def __init__(self, loss):
+	# pretrained=False skips the vgg19 download, for benchmarks on synthetic data
+	def __init__(self, loss, use_gpu=True, pretrained=True):
 		self.criterion = loss
+		self.use_gpu = use_gpu
+		self.pretrained = pretrained
 		self.contentFunc = self.contentFunc()
 			
 	def get_loss(self, fakeIm, realIm):
@@ -145,19 +151,17 @@ class DiscLossWGANGP(DiscLossLS):
 		return -self.D_fake.mean()
 		
 	def calc_gradient_penalty(self, netD, real_data, fake_data):
-		alpha = torch.rand(1, 1)
+		alpha = torch.rand(1, 1, device=real_data.device)
 		alpha = alpha.expand(real_data.size())
-		alpha = alpha.cuda()
 
 		interpolates = alpha * real_data + ((1 - alpha) * fake_data)
 
-		interpolates = interpolates.cuda()
 		interpolates = Variable(interpolates, requires_grad=True)
 		
 		disc_interpolates = netD.forward(interpolates)
 
 		gradients = autograd.grad(
-			outputs=disc_interpolates, inputs=interpolates, grad_outputs=torch.ones(disc_interpolates.size()).cuda(),
+			outputs=disc_interpolates, inputs=interpolates, grad_outputs=torch.ones_like(disc_interpolates),
 			create_graph=True, retain_graph=True, only_inputs=True
 		)[0]
 
@@ -182,7 +186,7 @@ def init_loss(opt, tensor):
 	# content_loss = None
 	
 	if opt.model == 'content_gan':
-		content_loss = PerceptualLoss(nn.MSELoss())
+		content_loss = PerceptualLoss(nn.MSELoss(), len(opt.gpu_ids) > 0, getattr(opt, 'vgg_pretrained', True))
 	elif opt.model == 'pix2pix':
 		content_loss = ContentLoss(nn.L1Loss())
 	else:
@@ -0,0 +1,215 @@
+import copy
+import os
+from collections import OrderedDict
+
+import torch
+import torch.nn as nn
+
+from .networks import ResnetBlock
+
+MB = 1024.0 * 1024.0
+
+
+def _nbytes(tensor):
+    return tensor.numel() * tensor.element_size()
+
+
+def named_networks(model):
+    """name -> nn.Module of |model|, including those held by its losses
+    (e.g. contentLoss.contentFunc, the vgg19 trunk of PerceptualLoss)."""
+    networks = OrderedDict()
+    seen = set()
+    for name, value in list(vars(model).items()):
+        if isinstance(value, nn.Module):
+            items = [(name, value)]
+        elif hasattr(value, '__dict__') and not isinstance(value, (torch.Tensor, torch.optim.Optimizer)):
+            items = [('%s.%s' % (name, inner_name), inner) for inner_name, inner in vars(value).items()
+                     if isinstance(inner, nn.Module)]
+        else:
+            items = []
+        for key, module in items:
+            if id(module) not in seen:
+                seen.add(id(module))
+                networks[key] = module
+    return networks
+
+
+def model_modules(model):
+    return list(named_networks(model).values())
+
+
+def model_optimizers(model):
+    return [value for value in vars(model).values() if isinstance(value, torch.optim.Optimizer)]
+
+
+class SavedTensorTracker():
+    """Storages autograd keeps for backward while the context is active.
+
+    Each storage is counted once, however many views of it are saved, and
+    parameters and buffers are not counted. The storages are referenced until
+    the tracker goes away, so freed memory is not reused and counted twice.
+    """
+
+    def __init__(self, exclude=()):
+        self.exclude = set(t.untyped_storage().data_ptr() for t in exclude)
+        self.storages = {}
+
+    def _pack(self, tensor):
+        storage = tensor.untyped_storage()
+        if storage.data_ptr() not in self.exclude:
+            self.storages[storage.data_ptr()] = storage
+        return tensor
+
+    def __enter__(self):
+        self.hooks = torch.autograd.graph.saved_tensors_hooks(self._pack, lambda tensor: tensor)
+        self.hooks.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self.hooks.__exit__(exc_type, exc_value, traceback)
+
+    def nbytes(self):
+        return sum(storage.nbytes() for storage in self.storages.values())
+
+    def largest(self):
+        return max([storage.nbytes() for storage in self.storages.values()] or [0])
+
+
+def output_scale(netG, input_nc, device, size=16):
+    with torch.no_grad():
+        output = netG(torch.zeros(1, input_nc, size, size, device=device))
+    return output.size(-1) // size
+
+
+def probe_step(model, batch_size, size, scale):
+    """Saved activations of one training step on random |size| inputs.
+
+    Runs the forward and backward passes of optimize_parameters without the
+    optimizer steps; gradients are cleared and parameters and running
+    statistics restored afterwards, so the model is left as it was.
+    Returns (total bytes, bytes of the largest activation).
+    """
+    opt = model.opt
+    device = model.input_A.device
+    inputs = torch.rand(batch_size, opt.input_nc, size, size, device=device) * 2 - 1
+    targets = torch.rand(batch_size, opt.output_nc, size * scale, size * scale, device=device) * 2 - 1
+    AtoB = opt.which_direction == 'AtoB'
+    model.set_input({'A': inputs if AtoB else targets, 'B': targets if AtoB else inputs,
+                     'A_paths': [], 'B_paths': []})
+
+    modules = model_modules(model)
+    states = [copy.deepcopy(module.state_dict()) for module in modules]
+    exclude = [t for module in modules for t in list(module.parameters()) + list(module.buffers())]
+    with SavedTensorTracker(exclude) as tracker:
+        model.forward()
+        for _ in range(model.criticUpdates):
+            model.backward_D()
+        model.backward_G()
+    total, largest = tracker.nbytes(), tracker.largest()
+    del tracker
+
+    for optimizer in model_optimizers(model):
+        optimizer.zero_grad(set_to_none=True)
+    for module, state in zip(modules, states):
+        module.load_state_dict(state)
+    return total + _nbytes(inputs) + _nbytes(targets), largest
+
+
+def inference_bytes(netG, input_nc, size, device):
+    """Activation bytes of one frame under inference: the largest input plus
+    output of a layer, plus the skip input a resnet block holds meanwhile."""
+    peak = [0, 0]
+
+    def layer_hook(module, inputs, output):
+        peak[0] = max(peak[0], sum(_nbytes(t) for t in inputs if torch.is_tensor(t)) + _nbytes(output))
+
+    def block_hook(module, inputs):
+        peak[1] = max(peak[1], _nbytes(inputs[0]))
+
+    handles = []
+    for module in netG.modules():
+        if isinstance(module, ResnetBlock):
+            handles.append(module.register_forward_pre_hook(block_hook))
+        elif not list(module.children()):
+            handles.append(module.register_forward_hook(layer_hook))
+    try:
+        with torch.no_grad():
+            netG(torch.zeros(1, input_nc, size, size, device=device))
+    finally:
+        for handle in handles:
+            handle.remove()
+    return peak[0] + peak[1]
+
+
+class MemoryPlan():
+    """Peak memory of a training model as a function of the batch size.
+
+    Weights, gradients and Adam moments are fixed; the activations saved for
+    backward grow linearly with the batch, so two probe steps (batch 1 and 2)
+    at the given input size give the per sample and the constant part.
+    Gradients of the largest activation are added as backward workspace.
+    """
+
+    def __init__(self, model, size):
+        opt = model.opt
+        device = model.input_A.device
+        self.size = size
+        self.scale = output_scale(model.netG, opt.input_nc, device)
+        self.weights = sum(_nbytes(t) for module in model_modules(model)
+                           for t in list(module.parameters()) + list(module.buffers()))
+        trainable = sum(_nbytes(p) for optimizer in model_optimizers(model)
+                        for group in optimizer.param_groups for p in group['params'])
+        # a gradient plus two moments per trained parameter
+        self.optimizer = 3 * trainable
+
+        one, largest = probe_step(model, 1, size, self.scale)
+        two, _ = probe_step(model, 2, size, self.scale)
+        self.per_sample = max(two - one, 0) + 2 * largest
+        self.constant = max(one - (two - one), 0)
+        self.weights_G = sum(_nbytes(t) for t in list(model.netG.parameters()) + list(model.netG.buffers()))
+        self.inference_per_sample = inference_bytes(model.netG, opt.input_nc, size, device)
+
+    def train_bytes(self, batch_size):
+        return self.weights + self.optimizer + self.constant + self.per_sample * batch_size
+
+    def inference_bytes(self, batch_size):
+        return self.weights_G + self.inference_per_sample * batch_size
+
+    def largest_batch(self, budget):
+        """Largest batch size whose estimated training peak fits in |budget| bytes, 0 if none does."""
+        return int(max(budget - self.train_bytes(0), 0) // self.per_sample)
+
+    def rows(self, batch_sizes):
+        return [OrderedDict([('fineSize', self.size), ('batchSize', batch_size),
+                             ('train_mb', self.train_bytes(batch_size) / MB),
+                             ('inference_mb', self.inference_bytes(batch_size) / MB)])
+                for batch_size in batch_sizes]
+
+
+def default_budget(device):
+    """90% of the free memory of |device|, in bytes."""
+    if device.type == 'cuda':
+        free, _ = torch.cuda.mem_get_info(device)
+        return int(free * 0.9)
+    if os.path.exists('/proc/meminfo'):
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(int(line.split()[1]) * 1024 * 0.9)
+    return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') * 0.9)
+
+
+def auto_batch_size(model, size, budget_mb=0, max_batch_size=0):
+    """Largest batch that fits in |budget_mb| (0: free memory of the device) at input |size|."""
+    device = model.input_A.device
+    budget = int(budget_mb * MB) if budget_mb > 0 else default_budget(device)
+    plan = MemoryPlan(model, size)
+    batch_size = plan.largest_batch(budget)
+    if batch_size < 1:
+        raise ValueError('fineSize %d does not fit in %.0f MB even with batch size 1 (%.0f MB estimated)' % (
+            size, budget / MB, plan.train_bytes(1) / MB))
+    if max_batch_size > 0:
+        batch_size = min(batch_size, max_batch_size)
+    print('auto batch size: %d (%.0f of %.0f MB at fineSize %d)' % (
+        batch_size, plan.train_bytes(batch_size) / MB, budget / MB, size))
+    return batch_size
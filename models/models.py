@@ -1,13 +1,18 @@
-from .conditional_gan_model import ConditionalGAN
-
-
 def create_model(opt):
     model = None
     if opt.model == 'test':
         assert (opt.dataset_mode == 'single')
         from .test_model import TestModel
         model = TestModel(opt)
+    elif opt.model == 'deconv':
+        assert (opt.dataset_mode == 'single')
+        from .deconv_model import DeconvModel
+        model = DeconvModel(opt)
+    elif opt.isTrain and opt.teacher_name:
+        from .distill_model import DistillModel
+        model = DistillModel(opt)
     else:
+        from .conditional_gan_model import ConditionalGAN
         model = ConditionalGAN(opt)
     # model.initialize(opt)
     print("model [%s] was created" % (model.name()))
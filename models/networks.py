@@ -1,9 +1,10 @@
-import scipy.stats as st
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import functools
+import math
 import numpy as np
+from util.checkpoint import load_weights
 
 
 def weights_init(m):
@@ -28,11 +29,16 @@ def get_norm_layer(norm_type='instance'):
     return norm_layer
 
 
+def norm_cdf(x):
+    """Standard normal CDF, same values as scipy.stats.norm.cdf without importing scipy."""
+    return np.array([0.5 * (1.0 + math.erf(v / math.sqrt(2.0))) for v in x])
+
+
 def gkern(kernlen=21, nsig=3):
     """Returns a 2D Gaussian kernel."""
 
     x = np.linspace(-nsig, nsig, kernlen+1)
-    kern1d = np.diff(st.norm.cdf(x))
+    kern1d = np.diff(norm_cdf(x))
     kern2d = np.outer(kern1d, kern1d)
     return kern2d/kern2d.sum() # Make sure sum of values in gaussian kernel equals 1.
 
@@ -49,7 +55,7 @@ class gaussain_filter(nn.Module):
 
         self.gaussian_filter = nn.Conv2d(in_channels=in_channels, out_channels=out_channels, kernel_size=kernel_size, padding=int((kernel_size - 1) / 2), bias=False)
 
-        self.gaussian_filter.weight.data = gaussian_kernel_d
+        self.gaussian_filter.weight.data = gaussian_kernel_d.to(self.gaussian_filter.weight.device)
         self.gaussian_filter.weight.requires_grad = False
 
     def forward(self, x):
@@ -57,8 +63,11 @@ class gaussain_filter(nn.Module):
 
 
 def define_G(input_nc, output_nc, ngf, which_model_netG, norm='batch', use_dropout=False, gpu_ids=[], use_parallel=False,
-             learn_residual=False, Add_gauss=False):
+             learn_residual=False, Add_gauss=False, init_weights=True, widths='', n_blocks=9, separable=False):
     netG = None
+    widths = parse_widths(widths)
+    if widths and which_model_netG not in ('resnet_9blocks_sr_gau', 'resnet_sr_student'):
+        raise NotImplementedError('netG_widths are only supported by resnet_9blocks_sr_gau and resnet_sr_student')
     use_gpu = len(gpu_ids) > 0
     norm_layer = get_norm_layer(norm_type=norm)
 
@@ -70,12 +79,53 @@ def define_G(input_nc, output_nc, ngf, which_model_netG, norm='batch', use_dropo
                                  gpu_ids=gpu_ids, use_parallel=use_parallel, learn_residual=learn_residual, upscale=4, gauss=Add_gauss)
     elif which_model_netG == 'resnet_9blocks_sr_gau':
         netG = ResnetGeneratorSR_Gauss(input_nc, output_nc, ngf, norm_layer=norm_layer, use_dropout=use_dropout, n_blocks=9,
-                                 gpu_ids=gpu_ids, use_parallel=use_parallel, learn_residual=learn_residual, upscale=4, gauss=Add_gauss)
+                                 gpu_ids=gpu_ids, use_parallel=use_parallel, learn_residual=learn_residual, upscale=4, gauss=Add_gauss,
+                                 widths=widths)
+    elif which_model_netG == 'resnet_sr_student':
+        # the teacher architecture with every width scaled by ngf / 64, n_blocks
+        # resnet blocks and optionally depthwise separable convs in the trunk
+        netG = ResnetGeneratorSR_Gauss(input_nc, output_nc, ngf, norm_layer=norm_layer, use_dropout=use_dropout, n_blocks=n_blocks,
+                                 gpu_ids=gpu_ids, use_parallel=use_parallel, learn_residual=learn_residual, upscale=4, gauss=Add_gauss,
+                                 widths=widths or student_widths(ngf), separable=separable)
     else:
         raise NotImplementedError('Generator model name [%s] is not recognized' % which_model_netG)
     if len(gpu_ids) > 0:
         netG.cuda(gpu_ids[0])
-    netG.apply(weights_init)
+    if init_weights:
+        netG.apply(weights_init)
+    return netG
+
+
+def student_widths(ngf):
+    return [max(4, int(round(w * ngf / 64.0))) for w in (64, 128, 256, 128, 100, 25, 6)]
+
+
+# '64,128,256,...' or a list of ints -> list of ints, empty for the default widths
+def parse_widths(widths):
+    if isinstance(widths, str):
+        return [int(w) for w in widths.split(',') if w.strip()]
+    return list(widths or [])
+
+
+def load_G(save_path, input_nc, output_nc, ngf, which_model_netG, norm='batch', use_dropout=False, gpu_ids=[],
+           use_parallel=False, learn_residual=False, Add_gauss=False, widths='', n_blocks=9, separable=False):
+    """Generator with the weights of |save_path|, without a random init.
+
+    The modules are created on the meta device, which allocates no storage, and
+    the tensors of the memory mapped checkpoint are assigned to them.
+    """
+    state_dict = load_weights(save_path)
+    with torch.device('meta'):
+        netG = define_G(input_nc, output_nc, ngf, which_model_netG, norm, use_dropout, [], use_parallel,
+                        learn_residual, Add_gauss, init_weights=False, widths=widths, n_blocks=n_blocks,
+                        separable=separable)
+    netG.load_state_dict(state_dict, assign=True)
+    missing = [name for name, t in list(netG.named_parameters()) + list(netG.named_buffers()) if t.is_meta]
+    if missing:
+        raise ValueError('%s does not initialize %s' % (save_path, ', '.join(missing)))
+    netG.gpu_ids = gpu_ids
+    if len(gpu_ids) > 0:
+        netG.cuda(gpu_ids[0])
     return netG
 
 
@@ -101,6 +151,25 @@ def define_D(input_nc, ndf, which_model_netD, n_layers_D=3, norm='batch', use_si
     return netD
 
 
+# (module, channels) whose outputs are compared in feature distillation: the
+# input and the output of the resnet trunk and the first upsampling stage
+def feature_taps(netG):
+    layers = list(netG.model)
+    blocks = [i for i, m in enumerate(layers) if isinstance(m, ResnetBlock)]
+    channels = 0
+    taps = []
+    for i, m in enumerate(layers):
+        if isinstance(m, nn.Conv2d):
+            channels = m.out_channels
+        elif isinstance(m, nn.ConvTranspose2d):
+            channels = m.out_channels
+            taps.append((layers[i + 2], channels))
+            break
+        if i == blocks[0] - 1 or i == blocks[-1]:
+            taps.append((m, channels))
+    return taps
+
+
 def print_network(net):
     num_params = 0
     for param in net.parameters():
@@ -185,21 +254,24 @@ class ResnetGenerator(nn.Module):
         return output
 
 
+# 3x3 conv, or a depthwise 3x3 followed by a pointwise 1x1 when separable
+def conv3x3(dim, use_bias, separable=False, padding=0):
+    if separable:
+        return [nn.Conv2d(dim, dim, kernel_size=3, padding=padding, groups=dim, bias=False),
+                nn.Conv2d(dim, dim, kernel_size=1, bias=use_bias)]
+    return [nn.Conv2d(dim, dim, kernel_size=3, padding=padding, bias=use_bias)]
+
+
 # Define a resnet block
 class ResnetBlock(nn.Module):
 
-    def __init__(self, dim, padding_type, norm_layer, use_dropout, use_bias):
+    def __init__(self, dim, padding_type, norm_layer, use_dropout, use_bias, separable=False):
         super(ResnetBlock, self).__init__()
 
         padAndConv = {
-            'reflect': [
-                nn.ReflectionPad2d(1),
-                nn.Conv2d(dim, dim, kernel_size=3, bias=use_bias)],
-            'replicate': [
-                nn.ReplicationPad2d(1),
-                nn.Conv2d(dim, dim, kernel_size=3, bias=use_bias)],
-            'zero': [
-                nn.Conv2d(dim, dim, kernel_size=3, padding=1, bias=use_bias)]
+            'reflect': [nn.ReflectionPad2d(1)] + conv3x3(dim, use_bias, separable),
+            'replicate': [nn.ReplicationPad2d(1)] + conv3x3(dim, use_bias, separable),
+            'zero': conv3x3(dim, use_bias, separable, padding=1)
         }
 
         try:
@@ -315,7 +387,8 @@ class ResnetGeneratorSR(nn.Module):
 class ResnetGeneratorSR_Gauss(nn.Module):
     def __init__(
             self, input_nc, output_nc, ngf=64, norm_layer=nn.BatchNorm2d, use_dropout=False,
-            n_blocks=6, gpu_ids=[], use_parallel=False, learn_residual=False, padding_type='reflect', upscale=4, gauss=False):
+            n_blocks=6, gpu_ids=[], use_parallel=False, learn_residual=False, padding_type='reflect', upscale=4, gauss=False,
+            widths=None, separable=False):
         assert (n_blocks >= 0)
         super(ResnetGeneratorSR_Gauss, self).__init__()
         self.input_nc = input_nc
@@ -334,53 +407,61 @@ class ResnetGeneratorSR_Gauss(nn.Module):
             use_bias = norm_layer.func == nn.InstanceNorm2d
         else:
             use_bias = norm_layer == nn.InstanceNorm2d
+        # output channels of the stem, the two downsampling convs (the last one sets
+        # the width of the resnet trunk) and the four upsampling convs
+        if not widths:
+            channel_mid = 100  # upscale^2*4
+            widths = (64, 128, 256, 128, channel_mid, int(channel_mid / upscale), int(channel_mid / upscale ** 2))
+        if len(widths) != 7:
+            raise ValueError('expected 7 generator widths, got %s' % (widths,))
+        self.widths = list(widths)
+        c_stem, c_down, c_trunk, c_up, c_mid, c_up1, c_up2 = widths
         model = [
             nn.ReflectionPad2d(3),
-            nn.Conv2d(input_nc*2, ngf, kernel_size=7, padding=0, bias=use_bias),
-            norm_layer(ngf),
+            nn.Conv2d(input_nc*2, c_stem, kernel_size=7, padding=0, bias=use_bias),
+            norm_layer(c_stem),
             nn.ReLU(True)
         ]
 
         model += [
-            nn.Conv2d(64, 128, kernel_size=3, stride=2, padding=1, bias=use_bias),
-            norm_layer(128),
+            nn.Conv2d(c_stem, c_down, kernel_size=3, stride=2, padding=1, bias=use_bias),
+            norm_layer(c_down),
             nn.ReLU(True),
 
-            nn.Conv2d(128, 256, kernel_size=3, stride=2, padding=1, bias=use_bias),
-            norm_layer(256),
+            nn.Conv2d(c_down, c_trunk, kernel_size=3, stride=2, padding=1, bias=use_bias),
+            norm_layer(c_trunk),
             nn.ReLU(True)
         ]
 
         for i in range(n_blocks):
             model += [
-                ResnetBlock(256, padding_type=padding_type, norm_layer=norm_layer, use_dropout=use_dropout,
-                            use_bias=use_bias)
+                ResnetBlock(c_trunk, padding_type=padding_type, norm_layer=norm_layer, use_dropout=use_dropout,
+                            use_bias=use_bias, separable=separable)
             ]
 
-        channel_mid = 100  # upscale^2*4
         model += [
-            nn.ConvTranspose2d(256, 128, kernel_size=3, stride=2, padding=1, output_padding=1, bias=use_bias),
-            norm_layer(128),
+            nn.ConvTranspose2d(c_trunk, c_up, kernel_size=3, stride=2, padding=1, output_padding=1, bias=use_bias),
+            norm_layer(c_up),
             nn.ReLU(True),
 
-            nn.ConvTranspose2d(128, channel_mid, kernel_size=3, stride=2, padding=1, output_padding=1, bias=use_bias),
-            norm_layer(channel_mid),
+            nn.ConvTranspose2d(c_up, c_mid, kernel_size=3, stride=2, padding=1, output_padding=1, bias=use_bias),
+            norm_layer(c_mid),
             nn.ReLU(True),
         ]
         # UpSampling
         model += [
-            nn.ConvTranspose2d(channel_mid, int(channel_mid / upscale), kernel_size=3, stride=2, padding=1,
+            nn.ConvTranspose2d(c_mid, c_up1, kernel_size=3, stride=2, padding=1,
                                output_padding=1, bias=use_bias),
-            norm_layer(int(channel_mid / upscale)),
+            norm_layer(c_up1),
             nn.ReLU(True),
 
-            nn.ConvTranspose2d(int(channel_mid / upscale), int(channel_mid / upscale ** 2), kernel_size=3, stride=2,
+            nn.ConvTranspose2d(c_up1, c_up2, kernel_size=3, stride=2,
                                padding=1, output_padding=1, bias=use_bias),
-            norm_layer(int(channel_mid / upscale ** 2)),
+            norm_layer(c_up2),
             nn.ReLU(True),
 
             nn.ReflectionPad2d(3),
-            nn.Conv2d(int(channel_mid / upscale ** 2), output_nc, kernel_size=7, padding=0),
+            nn.Conv2d(c_up2, output_nc, kernel_size=7, padding=0),
 
             nn.Tanh()
         ]
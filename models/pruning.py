@@ -0,0 +1,142 @@
+import torch
+import torch.nn as nn
+
+from .networks import ResnetBlock, ResnetGeneratorSR_Gauss
+
+
+def _is_conv(module):
+    return isinstance(module, (nn.Conv2d, nn.ConvTranspose2d))
+
+
+def _is_norm(module):
+    return isinstance(module, (nn.BatchNorm2d, nn.InstanceNorm2d))
+
+
+class ChannelGroup():
+    """Channels that have to be pruned together.
+
+    |producers| write the channels (output dim), |consumers| read them (input
+    dim) and |norms| normalize them. The channels of the resnet trunk form one
+    |residual| group: every block adds its output to its input, so all of them
+    share the same channel indices.
+    """
+
+    def __init__(self):
+        self.producers = []
+        self.consumers = []
+        self.norms = []
+        self.residual = False
+
+    def __len__(self):
+        conv = self.producers[0]
+        return conv.out_channels
+
+    # L1 norm of the weights that read each channel. The instance norms
+    # rescale every channel to unit variance, so the producing filters say
+    # little about a channel while the consuming weights say how much of it
+    # reaches the next layer. A trunk channel is the sum of what the layers
+    # writing the residual stream put into it, so it is scored by those
+    # filters instead; the weights reading it inside the blocks belong to
+    # their own channels.
+    def importance(self):
+        score = torch.zeros(len(self))
+        if self.residual:
+            for conv in self.producers:
+                w = conv.weight.detach().float().abs().cpu()
+                score += w.sum(dim=(0, 2, 3)) if isinstance(conv, nn.ConvTranspose2d) else w.sum(dim=(1, 2, 3))
+            return score
+        for conv in self.consumers:
+            w = conv.weight.detach().float().abs().cpu()
+            if isinstance(conv, nn.ConvTranspose2d):
+                score += w.sum(dim=(1, 2, 3))
+            else:
+                score += w.sum(dim=(0, 2, 3))
+        return score
+
+
+def channel_groups(netG):
+    """Prunable channel groups of a ResnetGeneratorSR_Gauss, in network order.
+
+    The input of the first conv and the output of the last one are fixed by
+    the data and are not part of any group. In a resnet block the first conv
+    reads the trunk and the last one writes it back; channels between them
+    are left as they are.
+    """
+    if not isinstance(netG, ResnetGeneratorSR_Gauss):
+        raise NotImplementedError('pruning is only supported for resnet_9blocks_sr_gau')
+    if any(m.groups > 1 for m in netG.modules() if _is_conv(m)):
+        raise NotImplementedError('pruning of depthwise separable convs is not supported')
+    groups = []
+    current = None
+    for module in netG.model:
+        if isinstance(module, ResnetBlock):
+            trunk = current
+            trunk.residual = True
+            last = [inner for inner in module.conv_block if _is_conv(inner)][-1]
+            for inner in module.conv_block:
+                if _is_conv(inner):
+                    current.consumers.append(inner)
+                    # inner channels of the block, not pruned
+                    current = trunk if inner is last else ChannelGroup()
+                    current.producers.append(inner)
+                elif _is_norm(inner):
+                    current.norms.append(inner)
+        elif _is_conv(module):
+            if current is not None:
+                current.consumers.append(module)
+            current = ChannelGroup()
+            current.producers.append(module)
+            groups.append(current)
+        elif _is_norm(module) and current is not None:
+            current.norms.append(module)
+    # the last conv writes the output image
+    return groups[:-1]
+
+
+def _select(tensor, dim, keep):
+    return nn.Parameter(tensor.detach().index_select(dim, keep.to(tensor.device)).clone(),
+                        requires_grad=tensor.requires_grad)
+
+
+def prune_group(group, keep):
+    """Physically removes the channels of |group| not listed in |keep|."""
+    keep = torch.as_tensor(sorted(keep), dtype=torch.long)
+    for conv in group.producers:
+        # Conv2d weights are (out, in, k, k), ConvTranspose2d ones (in, out, k, k)
+        dim = 1 if isinstance(conv, nn.ConvTranspose2d) else 0
+        conv.weight = _select(conv.weight, dim, keep)
+        if conv.bias is not None:
+            conv.bias = _select(conv.bias, 0, keep)
+        conv.out_channels = len(keep)
+    for conv in group.consumers:
+        dim = 0 if isinstance(conv, nn.ConvTranspose2d) else 1
+        conv.weight = _select(conv.weight, dim, keep)
+        conv.in_channels = len(keep)
+    for norm in group.norms:
+        if norm.affine:
+            norm.weight = _select(norm.weight, 0, keep)
+            norm.bias = _select(norm.bias, 0, keep)
+        if norm.running_mean is not None:
+            norm.running_mean = norm.running_mean.index_select(0, keep.to(norm.running_mean.device)).clone()
+            norm.running_var = norm.running_var.index_select(0, keep.to(norm.running_var.device)).clone()
+        norm.num_features = len(keep)
+
+
+def prune_generator(netG, ratio, min_channels=4):
+    """Removes the |ratio| least important channels of every group, in place.
+
+    Returns the new widths, to be passed as --netG_widths when the pruned
+    generator is loaded again.
+    """
+    for group in channel_groups(netG):
+        n = len(group)
+        n_keep = max(min(min_channels, n), int(round(n * (1.0 - ratio))))
+        if n_keep < n:
+            keep = torch.argsort(group.importance(), descending=True)[:n_keep]
+            prune_group(group, keep.tolist())
+    netG.widths = [len(group) for group in channel_groups(netG)]
+    return netG.widths
+
+
+def count_parameters(net):
+    return sum(p.numel() for p in net.parameters())
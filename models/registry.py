@@ -0,0 +1,130 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import torch
+
+from . import networks
+
+
+def model_nbytes(net):
+    return sum(t.numel() * t.element_size() for t in list(net.parameters()) + list(net.buffers()))
+
+
+def check_model_key(name, which_epoch):
+    """Raises ValueError unless |name| and |which_epoch| are plain file name
+    parts, so a requested model cannot point outside checkpoints_dir."""
+    for value in (name, str(which_epoch)):
+        if not value or value in ('.', '..') or '/' in value or '\\' in value or os.sep in value:
+            raise ValueError("Model [%s/%s] not recognized." % (name, which_epoch))
+
+
+def generator_loader(opt, device, host_config=None):
+    """load_fn for ModelRegistry: the generator of checkpoints_dir/<name>/<epoch>_net_G.pth.
+
+    Every checkpoint is built with the architecture options of |opt|, and in
+    the memory format of |host_config| when given. The generator is left in
+    the mode test.py runs it in.
+    """
+    def load(name, which_epoch):
+        check_model_key(name, which_epoch)
+        save_path = os.path.join(opt.checkpoints_dir, name, '%s_net_G%s.pth' % (
+            which_epoch, '_fp16' if getattr(opt, 'fp16_weights', False) else ''))
+        netG = networks.load_G(save_path, opt.input_nc, opt.output_nc, opt.ngf, opt.which_model_netG, opt.norm,
+                               not opt.no_dropout, [], False, opt.learn_residual, opt.Add_gauss,
+                               widths=opt.netG_widths,
+                               n_blocks=opt.n_blocks, separable=opt.separable_convs)
+        netG = netG.to(device)
+        if host_config is not None and host_config['channels_last']:
+            netG.to(memory_format=torch.channels_last)
+        return netG
+    return load
+
+
+class ModelRegistry():
+    """Loaded generators keyed by (name, which_epoch).
+
+    Models stay resident while their total size (parameters and buffers) fits
+    in |budget_mb|; past that the least recently used ones are dropped. The
+    most recently used model is never evicted, even when it alone exceeds the
+    budget. Loading runs on background threads, so the resident models keep
+    serving while another one is read from disk. Callers holding an evicted
+    model can finish with it, it is freed once the last reference goes.
+    """
+
+    def __init__(self, load_fn, budget_mb=2048, loader_threads=1):
+        self.load_fn = load_fn
+        self.budget = int(budget_mb * 1024 * 1024)
+        self.models = OrderedDict()
+        self.sizes = {}
+        self.loading = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=loader_threads, thread_name_prefix='model-loader')
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def prefetch(self, name, which_epoch='latest'):
+        """Future of the model, loaded in the background if it is not resident."""
+        check_model_key(name, which_epoch)
+        key = (name, str(which_epoch))
+        with self.lock:
+            if key in self.models:
+                self.hits += 1
+                self.models.move_to_end(key)
+                future = Future()
+                future.set_result(self.models[key])
+                return future
+            if key not in self.loading:
+                self.misses += 1
+                self.loading[key] = self.executor.submit(self._load, key)
+            return self.loading[key]
+
+    def get(self, name, which_epoch='latest'):
+        return self.prefetch(name, which_epoch).result()
+
+    def _load(self, key):
+        try:
+            net = self.load_fn(*key)
+        except Exception:
+            with self.lock:
+                del self.loading[key]
+            raise
+        with self.lock:
+            del self.loading[key]
+            self.models[key] = net
+            self.sizes[key] = model_nbytes(net)
+            self._evict()
+        return net
+
+    def _evict(self):
+        while len(self.models) > 1 and sum(self.sizes.values()) > self.budget:
+            key, _ = self.models.popitem(last=False)
+            del self.sizes[key]
+            self.evictions += 1
+            print('evicted model %s/%s' % key)
+
+    def evict(self, name, which_epoch='latest'):
+        key = (name, str(which_epoch))
+        with self.lock:
+            if key in self.models:
+                del self.models[key]
+                del self.sizes[key]
+                self.evictions += 1
+
+    def resident(self):
+        with self.lock:
+            return list(self.models.keys())
+
+    def stats(self):
+        with self.lock:
+            return OrderedDict([
+                ('resident', ['%s/%s' % key for key in self.models]),
+                ('loading', ['%s/%s' % key for key in self.loading]),
+                ('resident_mb', sum(self.sizes.values()) / (1024.0 * 1024.0)),
+                ('budget_mb', self.budget / (1024.0 * 1024.0)),
+                ('hits', self.hits), ('misses', self.misses), ('evictions', self.evictions)])
+
+    def close(self):
+        self.executor.shutdown(wait=False)
@@ -1,10 +1,12 @@
+import numpy as np
 import torch
 from torch.autograd import Variable
 from collections import OrderedDict
 import util.util as util
 from .base_model import BaseModel
 from . import networks
-import time
+from util.host_config import apply_host_config, autocast_context, load_host_config
+from util.manifest import config_digest, file_digest
 
 
 class TestModel(BaseModel):
@@ -16,11 +18,14 @@ class TestModel(BaseModel):
         super(TestModel, self).__init__(opt)
         self.input_A = self.Tensor(opt.batchSize, opt.input_nc, opt.fineSize, opt.fineSize)
 
-        self.netG = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf,
-                                      opt.which_model_netG, opt.norm, not opt.no_dropout, self.gpu_ids, False,
-                                      opt.learn_residual, opt.Add_gauss)
-        which_epoch = opt.which_epoch
-        self.load_network(self.netG, 'G', which_epoch)
+        self.netG = networks.load_G(self.weights_path('G', opt.which_epoch), opt.input_nc, opt.output_nc, opt.ngf,
+                                    opt.which_model_netG, opt.norm, not opt.no_dropout, self.gpu_ids, False,
+                                    opt.learn_residual, opt.Add_gauss, widths=opt.netG_widths,
+                                    n_blocks=opt.n_blocks, separable=opt.separable_convs)
+
+        # thread count, memory format and precision tuned for this host by autotune.py
+        self.device = torch.device('cuda:%d' % self.gpu_ids[0]) if self.gpu_ids else torch.device('cpu')
+        self.precision = apply_host_config(load_host_config(opt, self.device), self.netG)
 
         print('---------- Networks initialized -------------')
         networks.print_network(self.netG)
@@ -32,25 +37,28 @@ class TestModel(BaseModel):
         temp = self.input_A.clone()
         temp.resize_(input_A.size()).copy_(input_A)
         self.input_A = temp
+        self.input_B = input['B'].to(self.input_A.device) if 'B' in input else None
         self.image_paths = input['A_paths']
 
     def test(self):
         with torch.no_grad():
             self.real_A = Variable(self.input_A)
-            start_time = time.time()
-            self.fake_B = self.netG.forward(self.real_A)
-            t_consumer = time.time() - start_time
-            # print('Restore time sonsuming:{} s'.format(t_consumer))
-            with open('results/time_consuming-2022-0514-1.txt', 'a') as f:
-                f.write('Time Now:{}\n'.format(time.asctime( time.localtime(time.time()))))
-                f.write('Restore time consuming:{} s\n'.format(t_consumer))
-                print('Restore time sonsuming:{} s'.format(t_consumer))
+            with self.timer.stage('generator'):
+                with autocast_context(self.device, self.precision):
+                    self.fake_B = self.netG.forward(self.real_A).float()
+
+    # the weights and the options that change the output, see util.manifest
+    def checkpoint_id(self):
+        opt = self.opt
+        return config_digest(['test', file_digest(self.weights_path('G', opt.which_epoch)), opt.which_model_netG,
+                              opt.netG_widths, opt.output_bit_depth, self.precision])
 
     # get image paths
     def get_image_paths(self):
         return self.image_paths
 
     def get_current_visuals(self):
-        real_A = util.tensor2im(self.real_A.data)
-        fake_B = util.tensor2im(self.fake_B.data)
+        imtype = np.uint16 if getattr(self.opt, 'output_bit_depth', 8) == 16 else np.uint8
+        real_A = util.tensor2im(self.real_A.data, imtype)
+        fake_B = util.tensor2im(self.fake_B.data, imtype)
         return OrderedDict([('real_A', real_A), ('fake_B', fake_B)])
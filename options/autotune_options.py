@@ -0,0 +1,13 @@
+from .test_options import TestOptions
+
+
+class AutotuneOptions(TestOptions):
+    def initialize(self):
+        TestOptions.initialize(self)
+        self.parser.add_argument('--tune_size', type=str, default='96', help='typical frame size, HxW or a single value for square frames')
+        self.parser.add_argument('--tune_threads', type=str, default='', help='comma separated intra-op thread counts to try, default powers of two up to the number of cores')
+        self.parser.add_argument('--tune_batch_sizes', type=str, default='1,2,4,8', help='comma separated batch sizes to try')
+        self.parser.add_argument('--tune_precisions', type=str, default='', help='comma separated precisions to try, default fp32,bf16 on cpu and fp32,fp16 on gpu')
+        self.parser.add_argument('--tune_tolerance', type=float, default=0.02, help='largest absolute difference to the fp32 output (range [-1, 1]) accepted for reduced precision')
+        self.parser.add_argument('--bench_warmup', type=int, default=3, help='untimed iterations before each measurement')
+        self.parser.add_argument('--bench_iters', type=int, default=20, help='timed iterations per configuration')
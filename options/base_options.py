@@ -19,7 +19,13 @@ class BaseOptions():
                                  help='selects model to use for netD. "basic" for 3 layers,'
                                       '"n_layers" for n layers set in options')
         self.parser.add_argument('--which_model_netG', type=str, default='resnet_9blocks_sr_gau',
-                                 help='selects model to use for netG. resnet_9blocks_sr, resnet_9blocks_sr_gau')
+                                 help='selects model to use for netG. resnet_9blocks_sr, resnet_9blocks_sr_gau, resnet_sr_student')
+        self.parser.add_argument('--netG_widths', type=str, default='',
+                                 help='comma separated channel widths of a pruned resnet_9blocks_sr_gau (see prune.py), '
+                                      'empty for the default 64,128,256,128,100,25,6')
+        self.parser.add_argument('--n_blocks', type=int, default=9, help='resnet blocks of a resnet_sr_student generator')
+        self.parser.add_argument('--separable_convs', action='store_true',
+                                 help='depthwise separable convs in the resnet blocks of a resnet_sr_student generator')
         self.parser.add_argument('--batchSize', type=int, default=16, help='input batch size')
         self.parser.add_argument('--loadSizeX', type=int, default=96, help='scale images to this size if scale need')
         self.parser.add_argument('--loadSizeY', type=int, default=96, help='scale images to this size if scale need')
@@ -40,7 +46,7 @@ class BaseOptions():
         self.parser.add_argument('--dataset_mode', type=str, default='unaligned',
                                  help='chooses how datasets are loaded. [unaligned | aligned | single]')
         self.parser.add_argument('--model', type=str, default='content_gan',
-                                 help='chooses which model to use. pix2pix, test, content_gan')
+                                 help='chooses which model to use. pix2pix, test, content_gan, deconv (classical deconvolution, test only)')
         self.parser.add_argument('--which_direction', type=str, default='AtoB', help='AtoB or BtoA')
         self.parser.add_argument('--nThreads', default=10, type=int,
                                  help='# threads for loading data, should be set up into number of cores of CPU')
@@ -55,6 +61,12 @@ class BaseOptions():
         self.parser.add_argument('--display_single_pane_ncols', type=int, default=0,
                                  help='if positive, display all images in a single visdom web panel with certain '
                                       'number of images per row.')
+        self.parser.add_argument('--html_page_size', type=int, default=50,
+                                 help='number of image rows per page of the html results')
+        self.parser.add_argument('--image_writer_threads', type=int, default=2,
+                                 help='threads encoding and writing result images in the background, 0 to write synchronously')
+        self.parser.add_argument('--png_compression', type=int, default=6,
+                                 help='zlib level (0-9) of PNGs written by the background image writer')
         self.parser.add_argument('--no_dropout', default=False, action='store_false',
                                  help='no dropout for the generator')
         self.parser.add_argument('--max_dataset_size', type=int, default=float("inf"),
@@ -68,7 +80,8 @@ class BaseOptions():
 
         self.initialized = True
 
-    def parse(self):
+    # quiet: no options dump, no options.txt and no cuda.set_device, for fast start
+    def parse(self, quiet=False):
         if not self.initialized:
             self.initialize()
         self.opt = self.parser.parse_args()
@@ -81,6 +94,9 @@ class BaseOptions():
             if id >= 0:
                 self.opt.gpu_ids.append(id)
 
+        if quiet:
+            return self.opt
+
         # set gpu ids
         if len(self.opt.gpu_ids) > 0:
             torch.cuda.set_device(self.opt.gpu_ids[0])
@@ -0,0 +1,15 @@
+from .test_options import TestOptions
+
+
+class BenchmarkOptions(TestOptions):
+    def initialize(self):
+        TestOptions.initialize(self)
+        self.parser.add_argument('--bench_batch_sizes', type=str, default='1,4', help='comma separated batch sizes to sweep')
+        self.parser.add_argument('--bench_sizes', type=str, default='96', help='comma separated input sizes (square) to sweep, ignored with --bench_real')
+        self.parser.add_argument('--bench_threads', type=str, default='0', help='comma separated intra-op thread counts to sweep, 0 keeps the torch default')
+        self.parser.add_argument('--bench_precisions', type=str, default='fp32', help='comma separated precisions to sweep: fp32, bf16, fp16 (fp16 needs a gpu)')
+        self.parser.add_argument('--bench_warmup', type=int, default=5, help='untimed iterations before each measurement')
+        self.parser.add_argument('--bench_iters', type=int, default=50, help='timed iterations per configuration')
+        self.parser.add_argument('--bench_real', action='store_true', help='use frames from dataroot instead of synthetic input')
+        self.parser.add_argument('--bench_random_init', action='store_true', help='do not load a checkpoint, benchmark a randomly initialized generator')
+        self.parser.add_argument('--bench_output', type=str, default='', help='write the results as json to this file')
@@ -0,0 +1,17 @@
+from .train_options import TrainOptions
+
+
+class TrainBenchmarkOptions(TrainOptions):
+    def initialize(self):
+        TrainOptions.initialize(self)
+        self.parser.add_argument('--bench_netG', type=str, default='resnet_9blocks_sr,resnet_9blocks_sr_gau', help='comma separated which_model_netG values to sweep')
+        self.parser.add_argument('--bench_norms', type=str, default='batch,instance', help='comma separated norm values to sweep')
+        self.parser.add_argument('--bench_gan_types', type=str, default='gan,lsgan,wgan-gp', help='comma separated gan_type values to sweep')
+        self.parser.add_argument('--bench_models', type=str, default='pix2pix,content_gan', help='comma separated model values to sweep')
+        self.parser.add_argument('--bench_batch_sizes', type=str, default='4', help='comma separated batch sizes to sweep')
+        self.parser.add_argument('--bench_fine_sizes', type=str, default='32', help='comma separated input crop sizes to sweep')
+        self.parser.add_argument('--bench_warmup', type=int, default=2, help='untimed training steps before each measurement')
+        self.parser.add_argument('--bench_iters', type=int, default=10, help='timed training steps per configuration')
+        self.parser.add_argument('--bench_output', type=str, default='', help='write the results as json to this file, e.g. to save a baseline')
+        self.parser.add_argument('--bench_baseline', type=str, default='', help='json results of an earlier run to diff against')
+        self.parser.add_argument('--bench_tolerance', type=float, default=0.05, help='relative steps/sec drop reported as a regression')
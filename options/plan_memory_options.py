@@ -0,0 +1,9 @@
+from .train_options import TrainOptions
+
+
+class MemoryPlanOptions(TrainOptions):
+    def initialize(self):
+        TrainOptions.initialize(self)
+        self.parser.add_argument('--plan_batch_sizes', type=str, default='1,2,4,8,16,32', help='comma separated batch sizes to estimate')
+        self.parser.add_argument('--plan_fine_sizes', type=str, default='', help='comma separated input crop sizes to estimate, default fineSize')
+        self.parser.add_argument('--plan_output', type=str, default='', help='write the estimates as json to this file')
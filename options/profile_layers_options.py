@@ -0,0 +1,11 @@
+from .train_options import TrainOptions
+
+
+class LayerProfileOptions(TrainOptions):
+    def initialize(self):
+        TrainOptions.initialize(self)
+        self.parser.add_argument('--profile_warmup', type=int, default=2, help='training steps before the profiler is attached')
+        self.parser.add_argument('--profile_iters', type=int, default=5, help='profiled training steps')
+        self.parser.add_argument('--profile_top', type=int, default=30, help='rows of the ranked per layer table')
+        self.parser.add_argument('--profile_trace', type=str, default='', help='chrome trace output, default checkpoints_dir/name/layer_trace.json')
+        self.parser.add_argument('--profile_output', type=str, default='', help='write the per layer statistics as json to this file')
@@ -0,0 +1,13 @@
+from .train_options import TrainOptions
+
+
+class PruneOptions(TrainOptions):
+    def initialize(self):
+        TrainOptions.initialize(self)
+        self.parser.add_argument('--prune_ratios', type=str, default='0.25,0.5,0.75', help='comma separated fractions of channels removed from every layer, one pruned generator per value')
+        self.parser.add_argument('--prune_min_channels', type=int, default=4, help='never prune a layer below this many channels')
+        self.parser.add_argument('--finetune_iters', type=int, default=500, help='training steps with the ConditionalGAN losses after pruning, 0 to skip')
+        self.parser.add_argument('--bench_size', type=int, default=96, help='input size (square) of the latency measurement')
+        self.parser.add_argument('--bench_batch_size', type=int, default=1, help='batch size of the latency measurement')
+        self.parser.add_argument('--bench_warmup', type=int, default=5, help='untimed iterations before each latency measurement')
+        self.parser.add_argument('--bench_iters', type=int, default=30, help='timed iterations per latency measurement')
@@ -0,0 +1,13 @@
+from .test_options import TestOptions
+
+
+class ServeOptions(TestOptions):
+    def initialize(self):
+        TestOptions.initialize(self)
+        self.parser.add_argument('--host', type=str, default='127.0.0.1', help='address the inference server listens on')
+        self.parser.add_argument('--port', type=int, default=8765, help='port the inference server listens on')
+        self.parser.add_argument('--max_batch_size', type=int, default=0, help='largest batch of concurrent requests run through the generator, 0 takes it from the autotuned config (8 without one)')
+        self.parser.add_argument('--max_wait_ms', type=float, default=5.0, help='how long the first request of a batch waits for others')
+        self.parser.add_argument('--max_queue', type=int, default=256, help='queued frames before requests are rejected with 503')
+        self.parser.add_argument('--model_budget_mb', type=float, default=2048, help='memory of resident generators; least recently used ones are unloaded beyond it')
+        self.parser.add_argument('--preload', type=str, default='', help='comma separated name[:epoch] checkpoints loaded in the background at startup')
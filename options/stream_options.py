@@ -0,0 +1,19 @@
+from .test_options import TestOptions
+
+
+class StreamOptions(TestOptions):
+    def initialize(self):
+        TestOptions.initialize(self)
+        self.parser.add_argument('--stream_source', type=str, default='dir', help='dir: watch dataroot for new frames, raw: read raw frames from --raw_stream')
+        self.parser.add_argument('--raw_stream', type=str, default='-', help='file or fifo of back-to-back raw frames, - for stdin')
+        self.parser.add_argument('--raw_width', type=int, default=96, help='width of raw frames')
+        self.parser.add_argument('--raw_height', type=int, default=96, help='height of raw frames')
+        self.parser.add_argument('--raw_dtype', type=str, default='uint8', help='sample type of raw frames, uint8 or uint16')
+        self.parser.add_argument('--include_existing', action='store_true', help='also restore frames already in dataroot when the stream starts')
+        self.parser.add_argument('--poll_interval', type=float, default=0.05, help='seconds between scans of the watched directory')
+        self.parser.add_argument('--stream_queue', type=int, default=8, help='frames buffered between acquisition and the generator')
+        self.parser.add_argument('--drop_policy', type=str, default='drop_oldest', help='when the queue is full: drop_oldest or block')
+        self.parser.add_argument('--target_latency_ms', type=float, default=0, help='drop queued frames older than this before restoring, 0 to keep every frame')
+        self.parser.add_argument('--stream_batch', type=int, default=4, help='largest number of queued frames restored in one generator call')
+        self.parser.add_argument('--stream_max_frames', type=int, default=0, help='stop after this many restored frames, 0 to run until interrupted')
+        self.parser.add_argument('--display_interval', type=float, default=1.0, help='seconds between fps/lag status lines, 0 to disable')
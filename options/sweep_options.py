@@ -0,0 +1,9 @@
+from .train_options import TrainOptions
+
+
+class SweepOptions(TrainOptions):
+    def initialize(self):
+        TrainOptions.initialize(self)
+        self.parser.add_argument('--sweep', type=str, default='', help='parameter grid, e.g. "lambda_A=50,100;lr=0.0001,0.0002;gan_type=gan,lsgan"; every combination is one experiment')
+        self.parser.add_argument('--sweep_workers', type=int, default=0, help='experiments run at the same time, 0 for cores / sweep_threads')
+        self.parser.add_argument('--sweep_threads', type=int, default=0, help='torch threads and cores pinned per experiment, 0 to split the cores evenly between the workers')
@@ -11,4 +11,23 @@ class TestOptions(BaseOptions):
         self.parser.add_argument('--which_epoch', type=str, default='40', help='which epoch to load? set to '
                                                                                 'latest to use latest cached model')
         self.parser.add_argument('--how_many', type=int, default=300, help='how many test images to run')
+        self.parser.add_argument('--gt_dir', type=str, default='', help='folder of ground truth frames with the same file names as the inputs; enables evaluation')
+        self.parser.add_argument('--metrics', type=str, default='PSNR,SSIM,MS-SSIM', help='comma separated metrics computed when gt_dir is set')
+        self.parser.add_argument('--output_bit_depth', type=int, default=8, help='bit depth of the saved images, 8 or 16')
+        self.parser.add_argument('--output_mode', type=str, default='png', help='how results are saved: png (images and html), store (chunked array store) or both')
+        self.parser.add_argument('--store_chunk_size', type=int, default=256, help='frames per chunk file of the array store')
+        self.parser.add_argument('--store_compression', type=int, default=0, help='zlib level of array store chunks, 0 keeps them uncompressed and memory mappable')
+        self.parser.add_argument('--fp16_weights', action='store_true', help='load the half precision generator <epoch>_net_G_fp16.pth, see --save_fp16 and compact_checkpoint.py')
+        self.parser.add_argument('--autotune_config', type=str, default='', help='inference config written by autotune.py, default checkpoints_dir/name/autotune_<host>.json')
+        self.parser.add_argument('--no_autotune', action='store_true', help='ignore the autotuned inference config of this host')
+        self.parser.add_argument('--psf_bank', type=str, default='', help='.npy of (grid_h, grid_w, k, k) PSFs calibrated over the field, for --model deconv; default a single Gaussian')
+        self.parser.add_argument('--psf_size', type=int, default=5, help='size of the Gaussian PSF used without --psf_bank')
+        self.parser.add_argument('--psf_nsig', type=float, default=1, help='the Gaussian PSF spans +-psf_nsig standard deviations')
+        self.parser.add_argument('--deconv_method', type=str, default='rl', help='rl (Richardson-Lucy) or wiener')
+        self.parser.add_argument('--deconv_iters', type=int, default=10, help='Richardson-Lucy iterations')
+        self.parser.add_argument('--wiener_k', type=float, default=0.01, help='noise to signal power ratio of the Wiener filter')
+        self.parser.add_argument('--deconv_tile', type=int, default=64, help='tile size of the space-variant deconvolution, one PSF per tile')
+        self.parser.add_argument('--deconv_overlap', type=int, default=16, help='overlap of neighbouring tiles, blended with raised cosine windows')
+        self.parser.add_argument('--deconv_scale', type=int, default=4, help='upsampling after deconvolution, to match the generator output size')
+        self.parser.add_argument('--incremental', action='store_true', help='only process inputs that are new or changed since the last run, or were processed with another checkpoint; see manifest.jsonl in the results')
         self.isTrain = False
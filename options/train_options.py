@@ -4,11 +4,14 @@ from .base_options import BaseOptions
 class TrainOptions(BaseOptions):
 	def initialize(self):
 		BaseOptions.initialize(self)
-		self.parser.add_argument('--display_freq', type=int, default=200, help='frequency of showing training results on screen')
-		self.parser.add_argument('--print_freq', type=int, default=50, help='frequency of showing training results on console')
-		self.parser.add_argument('--save_latest_freq', type=int, default=5000, help='frequency of saving the latest results')
+		self.parser.add_argument('--display_freq', type=int, default=200, help='frequency of showing training results on screen, in optimizer steps')
+		self.parser.add_argument('--print_freq', type=int, default=50, help='frequency of showing training results on console, in optimizer steps')
+		self.parser.add_argument('--save_latest_freq', type=int, default=5000, help='frequency of saving the latest results, in optimizer steps')
 		self.parser.add_argument('--save_epoch_freq', type=int, default=5, help='frequency of saving checkpoints at the end of epochs')
 		self.parser.add_argument('--continue_train', action='store_true', help='continue training: load the latest model')
+		self.parser.add_argument('--resume', action='store_true', help='resume from the newest resume_*.pth checkpoint, including optimizer, learning rate, rng state and the position within the epoch')
+		self.parser.add_argument('--keep_checkpoints', type=int, default=3, help='number of resume checkpoints to keep on disk')
+		self.parser.add_argument('--save_fp16', action='store_true', help='also save the generator as half precision <epoch>_net_G_fp16.pth for fast loading at inference')
 		self.parser.add_argument('--epoch_count', type=int, default=1, help='the starting epoch count, we save the model by <epoch_count>, <epoch_count>+<save_latest_freq>, ...')
 		self.parser.add_argument('--phase', type=str, default='train', help='train, val, test, etc')
 		self.parser.add_argument('--which_epoch', type=str, default='latest', help='which epoch to load? set to latest to use latest cached model')
@@ -22,5 +25,23 @@ class TrainOptions(BaseOptions):
 		self.parser.add_argument('--niter', type=int, default=30, help='# of iter at starting learning rate')
 		self.parser.add_argument('--niter_decay', type=int, default=30, help='# of iter to linearly decay learning rate to zero')
 		self.parser.add_argument('--no_html', action='store_true', help='do not save intermediate training results to [opt.checkpoints_dir]/[opt.name]/web/')
+		self.parser.add_argument('--val_freq', type=int, default=0, help='run validation on the val phase every val_freq epochs, 0 to disable')
+		self.parser.add_argument('--val_batchSize', type=int, default=16, help='batch size used for validation')
+		self.parser.add_argument('--val_patience', type=int, default=0, help='stop training after this many validations without a PSNR improvement, 0 to disable')
+		self.parser.add_argument('--log_sinks', type=str, default='text,visdom', help='comma separated loss log sinks: text, jsonl, csv, visdom (visdom only if display_id > 0)')
+		self.parser.add_argument('--log_queue_size', type=int, default=64, help='records buffered per log sink before the oldest are dropped')
+		self.parser.add_argument('--timing', action='store_true', help='time each stage of the training loop and write a per-epoch breakdown to timing_log.jsonl')
+		self.parser.add_argument('--timing_sync', action='store_true', help='synchronize cuda at the end of each timed stage so gpu work is attributed correctly')
+		self.parser.add_argument('--timing_window', type=int, default=200, help='number of recent iterations used for the timing percentiles')
 		# self.
+		self.parser.add_argument('--resolution_schedule', type=str, default='', help='comma separated epoch:fineSize[:batchSize] stages, e.g. 1:16:64,4:32:16,8:0:4; a missing batch size keeps the pixels per step of fineSize/batchSize')
+		self.parser.add_argument('--teacher_name', type=str, default='', help='experiment name of a trained generator to distill into netG (e.g. a resnet_sr_student); empty trains without a teacher')
+		self.parser.add_argument('--teacher_epoch', type=str, default='latest', help='which epoch of the teacher to load')
+		self.parser.add_argument('--teacher_model', type=str, default='resnet_9blocks_sr_gau', help='which_model_netG of the teacher')
+		self.parser.add_argument('--teacher_widths', type=str, default='', help='netG_widths of the teacher')
+		self.parser.add_argument('--lambda_distill', type=float, default=100.0, help='weight of the L1 loss between student and teacher outputs')
+		self.parser.add_argument('--lambda_feat', type=float, default=10.0, help='weight of the MSE loss between student and teacher trunk features')
+		self.parser.add_argument('--auto_batch_size', action='store_true', help='before training, set batchSize to the largest batch whose estimated peak memory fits in --memory_budget_mb')
+		self.parser.add_argument('--memory_budget_mb', type=float, default=0, help='memory budget of --auto_batch_size, 0 for 90%% of the free memory of the device')
+		self.parser.add_argument('--accum_steps', type=int, default=1, help='split every batch into this many micro-batches and accumulate their gradients before each optimizer step; batchSize stays the effective batch')
 		self.isTrain = True
@@ -0,0 +1,46 @@
+import json
+from collections import OrderedDict
+
+from options.plan_memory_options import MemoryPlanOptions
+from data.data_loader import CreateDataLoader
+from models.models import create_model
+from models.memory_planner import MB, MemoryPlan, default_budget
+from benchmark import parse_list
+
+
+def plan(opt):
+	model = create_model(opt)
+	fine_sizes = parse_list(opt.plan_fine_sizes) if opt.plan_fine_sizes else [opt.fineSize]
+	if 0 in fine_sizes:
+		# uncropped frames
+		data_loader = CreateDataLoader(opt)
+		data_loader.set_resolution(0, opt.batchSize)
+		full_size = max(data_loader.dataset[0]['A'].shape[1:])
+		fine_sizes = list(OrderedDict.fromkeys(size or full_size for size in fine_sizes))
+	budget = int(opt.memory_budget_mb * MB) if opt.memory_budget_mb > 0 else default_budget(model.input_A.device)
+
+	rows = []
+	largest = OrderedDict()
+	for size in fine_sizes:
+		memory_plan = MemoryPlan(model, size)
+		rows += memory_plan.rows(parse_list(opt.plan_batch_sizes))
+		largest[size] = memory_plan.largest_batch(budget)
+
+	print('%8s %9s %10s %13s' % ('fineSize', 'batchSize', 'train MB', 'inference MB'))
+	for row in rows:
+		print('%8d %9d %10.1f %13.1f' % (row['fineSize'], row['batchSize'], row['train_mb'], row['inference_mb']))
+	for size, batch_size in largest.items():
+		print('fineSize %d: largest batch in %.0f MB is %d' % (size, budget / MB, batch_size))
+
+	report = OrderedDict([('model', opt.model), ('which_model_netG', opt.which_model_netG),
+						  ('budget_mb', budget / MB), ('largest_batch', largest), ('estimates', rows)])
+	if opt.plan_output:
+		with open(opt.plan_output, 'wt') as f:
+			json.dump(report, f, indent=2)
+	return report
+
+
+if __name__ == '__main__':
+	opt = MemoryPlanOptions().parse()
+	opt.resize_or_crop = 'crop'
+	plan(opt)
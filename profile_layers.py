@@ -0,0 +1,55 @@
+import json
+import os
+from collections import OrderedDict
+
+from options.profile_layers_options import LayerProfileOptions
+from data.data_loader import CreateDataLoader
+from models.models import create_model
+from models.memory_planner import named_networks
+from util.layer_profiler import LayerProfiler
+
+
+def batches(data_loader, count):
+	while True:
+		for data in data_loader.load_data():
+			if count == 0:
+				return
+			count -= 1
+			yield data
+
+
+def profile(opt):
+	data_loader = CreateDataLoader(opt)
+	model = create_model(opt)
+	# netG, netD and the losses' networks, e.g. the vgg19 trunk of content_gan
+	networks = named_networks(model)
+	print('profiling %s' % ', '.join(networks.keys()))
+
+	data = batches(data_loader, opt.profile_warmup + opt.profile_iters)
+	for _ in range(opt.profile_warmup):
+		model.set_input(next(data))
+		model.optimize_parameters()
+
+	profiler = LayerProfiler(networks, sync_cuda=len(opt.gpu_ids) > 0)
+	steps = 0
+	with profiler:
+		for batch in data:
+			model.set_input(batch)
+			model.optimize_parameters()
+			profiler.step()
+			steps += 1
+
+	print(profiler.format_table(opt.profile_top, max(1, steps)))
+	trace_path = opt.profile_trace or os.path.join(opt.checkpoints_dir, opt.name, 'layer_trace.json')
+	profiler.write_trace(trace_path)
+	print('chrome trace written to %s' % trace_path)
+	if opt.profile_output:
+		with open(opt.profile_output, 'wt') as f:
+			json.dump(OrderedDict([('steps', steps), ('layers', [s.as_dict() for s in profiler.ranked()])]), f, indent=2)
+	return profiler
+
+
+if __name__ == '__main__':
+	opt = LayerProfileOptions().parse()
+	opt.resize_or_crop = 'crop'
+	profile(opt)
@@ -0,0 +1,93 @@
+import copy
+import csv
+import json
+import os
+from collections import OrderedDict
+
+import torch
+
+from options.prune_options import PruneOptions
+from data.data_loader import CreateDataLoader
+from models.models import create_model
+from models import pruning
+from benchmark import run_config
+from train import create_val_loader, validate
+from util.checkpoint import atomic_save, snapshot
+
+
+def finetune(opt, dataset, model, iters):
+	model.optimizer_G = torch.optim.Adam(model.netG.parameters(), lr=opt.lr, betas=(opt.beta1, 0.999))
+	model.optimizer_D = torch.optim.Adam(model.netD.parameters(), lr=opt.lr, betas=(opt.beta1, 0.999))
+	step = 0
+	while step < iters:
+		for data in dataset:
+			model.set_input(data)
+			model.optimize_parameters()
+			step += 1
+			if step % opt.print_freq == 0 or step == iters:
+				errors = model.get_current_errors()
+				print('  finetune %d/%d %s' % (step, iters, ' '.join('%s: %.3f' % (k, v) for k, v in errors.items())))
+			if step >= iters:
+				break
+
+
+def measure(opt, model, val_loader, device):
+	netG = model.netG
+	# timed in the mode validate and test.py run the generator in, as benchmark.py does
+	frames = torch.randn(opt.bench_batch_size, opt.input_nc, opt.bench_size, opt.bench_size)
+	latency = run_config(netG, frames, device, 'fp32', opt.bench_warmup, opt.bench_iters)
+	metrics = validate(val_loader, model)
+	return OrderedDict([('params', pruning.count_parameters(netG)),
+						('p50_ms', latency['p50_ms']), ('fps', latency['fps']),
+						('PSNR', metrics.get('PSNR', float('nan'))), ('SSIM', metrics.get('SSIM', float('nan')))])
+
+
+def prune(opt):
+	device = torch.device('cuda:%d' % opt.gpu_ids[0]) if opt.gpu_ids else torch.device('cpu')
+	dataset = CreateDataLoader(opt).load_data()
+	val_loader = create_val_loader(opt)
+	model = create_model(opt)
+	base_G = copy.deepcopy(model.netG)
+	base_D = copy.deepcopy(model.netD)
+
+	rows = []
+	row = OrderedDict([('ratio', 0.0), ('name', opt.name), ('widths', ','.join(map(str, model.netG.widths)))])
+	row.update(measure(opt, model, val_loader, device))
+	rows.append(row)
+	for ratio in [float(r) for r in opt.prune_ratios.split(',') if r.strip()]:
+		name = '%s_pruned%02d' % (opt.name, int(round(ratio * 100)))
+		print('pruning %.0f%% of the channels -> %s' % (ratio * 100, name))
+		model.netG = copy.deepcopy(base_G)
+		model.netD = copy.deepcopy(base_D)
+		widths = pruning.prune_generator(model.netG, ratio, opt.prune_min_channels)
+		if opt.finetune_iters > 0:
+			finetune(opt, dataset, model, opt.finetune_iters)
+
+		save_dir = os.path.join(opt.checkpoints_dir, name)
+		os.makedirs(save_dir, exist_ok=True)
+		atomic_save(snapshot(model.netG.state_dict()), os.path.join(save_dir, '%s_net_G.pth' % opt.which_epoch))
+		row = OrderedDict([('ratio', ratio), ('name', name), ('widths', ','.join(map(str, widths)))])
+		row.update(measure(opt, model, val_loader, device))
+		rows.append(row)
+
+	print('%-6s %-36s %-30s %10s %9s %8s %8s %7s' % ('ratio', 'name', 'netG_widths', 'params', 'p50 ms', 'fps', 'PSNR', 'SSIM'))
+	for row in rows:
+		print('%-6.2f %-36s %-30s %10d %9.2f %8.1f %8.3f %7.4f' % tuple(row.values()))
+
+	report_dir = os.path.join(opt.checkpoints_dir, opt.name)
+	with open(os.path.join(report_dir, 'prune_report.json'), 'wt') as f:
+		json.dump(rows, f, indent=2)
+	with open(os.path.join(report_dir, 'prune_report.csv'), 'wt', newline='') as f:
+		writer = csv.writer(f)
+		writer.writerow(list(rows[0].keys()))
+		writer.writerows([list(row.values()) for row in rows])
+	print('load a pruned generator with --name <name> --netG_widths <netG_widths>')
+	return rows
+
+
+if __name__ == '__main__':
+	opt = PruneOptions().parse()
+	opt.resize_or_crop = "crop"
+	# fine-tuning starts from the trained G and D of which_epoch
+	opt.continue_train = True
+	prune(opt)
@@ -0,0 +1,87 @@
+# Fast-start inference: restores the frames in --dataroot with as little startup
+# work as possible. Only torch, numpy and PIL are imported; no visdom, dominate,
+# cv2, scipy or torchvision, no html page, no options dump and no network repr.
+# Use test.py for metrics and the html results.
+import time
+_start = time.perf_counter()
+
+import os
+import sys
+
+from util.timer import StartupReport
+
+report = StartupReport(_start)
+with report.stage('import torch'):
+	import numpy as np
+	import torch
+	from PIL import Image
+with report.stage('import repo'):
+	from options.test_options import TestOptions
+	from models import networks
+	from data.image_folder import make_dataset
+	from util.image_writer import ImageWriter
+	from util.serving import frame_to_tensor, tensor_to_frame
+
+
+def read_frame(path, input_nc):
+	image = Image.open(path)
+	if input_nc != 1:
+		return frame_to_tensor(np.array(image.convert('RGB')))
+	if image.mode.startswith('I'):
+		# as SingleDataset reads it (cv2 IMREAD_GRAYSCALE): 16-bit frames are
+		# scaled to 8 bits, not clipped as convert('L') would
+		return frame_to_tensor((np.array(image).astype(np.uint32) >> 8).astype(np.uint8))
+	return frame_to_tensor(np.array(image.convert('L')))
+
+
+# consecutive frames of the same shape, at most |batch_size| per batch
+def batches(paths, input_nc, batch_size):
+	batch = []
+	for path in paths:
+		frame = read_frame(path, input_nc)
+		if batch and (len(batch) == batch_size or frame.shape != batch[0][1].shape):
+			yield batch
+			batch = []
+		batch.append((path, frame))
+	if batch:
+		yield batch
+
+
+def restore(opt, netG, device, paths, out_dir):
+	writer = ImageWriter(max(1, opt.image_writer_threads), level=opt.png_compression)
+	count = 0
+	start = time.perf_counter()
+	try:
+		for batch in batches(paths, opt.input_nc, opt.batchSize):
+			with torch.inference_mode():
+				output = netG(torch.stack([frame for _, frame in batch]).to(device)).cpu()
+			for (path, _), fake_B in zip(batch, output):
+				name = os.path.splitext(os.path.basename(path))[0]
+				writer.save(tensor_to_frame(fake_B, opt.output_bit_depth), os.path.join(out_dir, '%s.png' % name))
+			if count == 0:
+				report.add('first batch', time.perf_counter() - start)
+			count += len(batch)
+	finally:
+		writer.close()
+	return count
+
+
+if __name__ == '__main__':
+	with report.stage('options'):
+		opt = TestOptions().parse(quiet=True)
+		device = torch.device('cuda:%d' % opt.gpu_ids[0] if opt.gpu_ids else 'cpu')
+		paths = sorted(make_dataset(opt.dataroot))[:opt.how_many]
+		out_dir = os.path.join(opt.results_dir, opt.name, 'restore_%s' % opt.which_epoch)
+		os.makedirs(out_dir, exist_ok=True)
+	with report.stage('load netG'):
+		save_path = os.path.join(opt.checkpoints_dir, opt.name, '%s_net_G%s.pth' % (
+			opt.which_epoch, '_fp16' if opt.fp16_weights else ''))
+		netG = networks.load_G(save_path, opt.input_nc, opt.output_nc, opt.ngf, opt.which_model_netG, opt.norm,
+							   not opt.no_dropout, [], False, opt.learn_residual, opt.Add_gauss,
+							   widths=opt.netG_widths,
+							   n_blocks=opt.n_blocks, separable=opt.separable_convs).to(device)
+
+	with report.stage('restore'):
+		count = restore(opt, netG, device, paths, out_dir)
+	print('restored %d frames to %s' % (count, out_dir))
+	print(report.format_report(), file=sys.stderr)
@@ -0,0 +1,57 @@
+import asyncio
+import functools
+
+import torch
+
+from options.serve_options import ServeOptions
+from models.registry import ModelRegistry, generator_loader
+from util.host_config import apply_host_config, autocast_context, load_host_config
+from util.serving import DynamicBatcher, InferenceServer
+
+
+# |netG| is None when the server has no registry, the frames are then for |default_netG|
+def run_batch(tensors, netG, precision='fp32', default_netG=None):
+	if netG is None:
+		netG = default_netG
+	device = next(netG.parameters()).device
+	batch = torch.stack(tensors).to(device)
+	with torch.inference_mode(), autocast_context(device, precision):
+		output = netG(batch)
+	return list(output.float().cpu())
+
+
+def parse_models(value, which_epoch):
+	models = []
+	for item in value.split(','):
+		if item.strip():
+			name, _, epoch = item.strip().partition(':')
+			models.append((name, epoch or which_epoch))
+	return models
+
+
+async def serve(opt, registry, precision='fp32', netG=None):
+	batcher = DynamicBatcher(functools.partial(run_batch, precision=precision, default_netG=netG),
+							 max_batch_size=opt.max_batch_size,
+							 max_wait=opt.max_wait_ms / 1000.0, max_queue=opt.max_queue)
+	server = InferenceServer(batcher, input_nc=opt.input_nc, bit_depth=opt.output_bit_depth,
+							 png_level=opt.png_compression, registry=registry,
+							 default_model=(opt.name, opt.which_epoch))
+	await server.start(opt.host, opt.port)
+	print('serving %s/%s on http://%s:%d' % (opt.name, opt.which_epoch, opt.host, opt.port))
+	await server.server.serve_forever()
+
+
+if __name__ == '__main__':
+	opt = ServeOptions().parse()
+	device = torch.device('cuda:%d' % opt.gpu_ids[0] if opt.gpu_ids else 'cpu')
+
+	# thread count, precision and memory format tuned for the default model on this host
+	host_config = load_host_config(opt, device)
+	if opt.max_batch_size <= 0:
+		opt.max_batch_size = host_config['batch_size'] if host_config else 8
+	# generators are loaded once and stay resident while they fit the memory budget
+	registry = ModelRegistry(generator_loader(opt, device, host_config), budget_mb=opt.model_budget_mb)
+	precision = apply_host_config(host_config, registry.get(opt.name, opt.which_epoch))
+	for name, which_epoch in parse_models(opt.preload, opt.which_epoch):
+		registry.prefetch(name, which_epoch)
+	asyncio.run(serve(opt, registry, precision))
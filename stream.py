@@ -0,0 +1,106 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import torch
+
+from options.stream_options import StreamOptions
+from models.models import create_model
+from util.array_store import ArrayStore
+from util.host_config import autocast_context
+from util.image_writer import ImageWriter
+from util.serving import frame_to_tensor, tensor_to_frame
+from util.streaming import FrameQueue, DirectoryWatcher, RawFrameReader, StreamStats
+
+
+def make_source(opt):
+	if opt.stream_source == 'dir':
+		return DirectoryWatcher(opt.dataroot, opt.poll_interval, opt.input_nc, opt.include_existing)
+	elif opt.stream_source == 'raw':
+		stream = sys.stdin.buffer if opt.raw_stream == '-' else open(opt.raw_stream, 'rb')
+		return RawFrameReader(stream, opt.raw_width, opt.raw_height, opt.raw_dtype, opt.input_nc)
+	raise ValueError("Stream source [%s] not recognized." % opt.stream_source)
+
+
+def produce(source, frames):
+	for name, frame in source:
+		frames.put((name, frame_to_tensor(frame), time.perf_counter()))
+	frames.close()
+
+
+def stream(opt, netG, precision='fp32'):
+	device = next(netG.parameters()).device
+	out_dir = os.path.join(opt.results_dir, opt.name, 'stream_%s' % opt.which_epoch)
+	os.makedirs(out_dir, exist_ok=True)
+	store = None
+	writer = None
+	if opt.output_mode in ('store', 'both'):
+		store = ArrayStore(os.path.join(out_dir, 'store'), chunk_size=opt.store_chunk_size,
+						   compression=opt.store_compression)
+	if opt.output_mode in ('png', 'both'):
+		writer = ImageWriter(max(1, opt.image_writer_threads), level=opt.png_compression)
+
+	frames = FrameQueue(opt.stream_queue, opt.drop_policy)
+	source = make_source(opt)
+	producer = threading.Thread(target=produce, args=(source, frames), name='acquisition', daemon=True)
+	producer.start()
+
+	stats = StreamStats()
+	last_display = time.perf_counter()
+	restored = 0
+	try:
+		while not frames.done():
+			if opt.target_latency_ms > 0:
+				frames.drop_stale(opt.target_latency_ms / 1000.0, time.perf_counter())
+			batch = frames.get_many(opt.stream_batch, timeout=0.1)
+			if not batch:
+				continue
+			# frames of each size go through the generator together
+			groups = OrderedDict()
+			for item in batch:
+				groups.setdefault(item[1].shape, []).append(item)
+			for group in groups.values():
+				with torch.inference_mode(), autocast_context(device, precision):
+					output = netG(torch.stack([item[1] for item in group]).to(device)).float().cpu()
+				now = time.perf_counter()
+				stats.add(now, [now - item[2] for item in group])
+				for (name, tensor, _), fake_B in zip(group, output):
+					base = os.path.splitext(name)[0]
+					if writer is not None:
+						writer.save(tensor_to_frame(fake_B, opt.output_bit_depth), os.path.join(out_dir, '%s_fake_B.png' % base))
+					if store is not None:
+						store.append(name, {'fake_B': tensor_to_frame(fake_B, opt.output_bit_depth)})
+				restored += len(group)
+
+			now = time.perf_counter()
+			if opt.display_interval > 0 and now - last_display >= opt.display_interval:
+				last_display = now
+				sys.stdout.write('\rfps %.1f | lag p50 %.0f ms p95 %.0f ms | queue %d | dropped %d | restored %d   ' % (
+					stats.fps(now), stats.lag(50) * 1000, stats.lag(95) * 1000, len(frames), frames.dropped, restored))
+				sys.stdout.flush()
+			if 0 < opt.stream_max_frames <= restored:
+				break
+	except KeyboardInterrupt:
+		pass
+	finally:
+		source.stop()
+		frames.close()
+		if writer is not None:
+			writer.close()
+		if store is not None:
+			store.close()
+	print('\nrestored %d frames, dropped %d' % (restored, frames.dropped))
+	return restored
+
+
+if __name__ == '__main__':
+	opt = StreamOptions().parse()
+	opt.model = 'test'
+	opt.dataset_mode = 'single'
+	opt.batchSize = 1
+	opt.fineSize = 0
+
+	model = create_model(opt)
+	stream(opt, model.netG, model.precision)
@@ -0,0 +1,160 @@
+import copy
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import time
+from collections import OrderedDict
+
+from options.sweep_options import SweepOptions
+
+
+# "lambda_A=50,100;gan_type=gan,lsgan" -> [('lambda_A', ['50', '100']), ('gan_type', ['gan', 'lsgan'])]
+def parse_grid(spec):
+	grid = []
+	for entry in spec.split(';'):
+		if not entry.strip():
+			continue
+		key, _, values = entry.partition('=')
+		grid.append((key.strip(), [v.strip() for v in values.split(',') if v.strip()]))
+	return grid
+
+
+# the option's type is taken from its default value
+def cast_value(opt, key, value):
+	if not hasattr(opt, key):
+		raise ValueError("Sweep option [%s] not recognized." % key)
+	default = getattr(opt, key)
+	if isinstance(default, bool):
+		return value.lower() in ('1', 'true', 'yes')
+	if isinstance(default, (int, float)):
+		return float(value) if isinstance(default, float) or '.' in value or 'e' in value else int(value)
+	return value
+
+
+def experiment_name(base, overrides):
+	return '%s_%s' % (base, '_'.join('%s-%s' % (k, v) for k, v in overrides.items()))
+
+
+def expand(opt):
+	grid = parse_grid(opt.sweep)
+	experiments = []
+	for values in itertools.product(*[v for _, v in grid]):
+		overrides = OrderedDict(zip([k for k, _ in grid], values))
+		run_opt = copy.copy(opt)
+		for key, value in overrides.items():
+			setattr(run_opt, key, cast_value(opt, key, value))
+		run_opt.name = experiment_name(opt.name, overrides)
+		experiments.append((run_opt, overrides))
+	return experiments
+
+
+def run_experiment(opt, cores, results):
+	# runs in a fresh process: pin it (and its data loader workers) to its cores
+	import torch
+	if hasattr(os, 'sched_setaffinity'):
+		os.sched_setaffinity(0, cores)
+	torch.set_num_threads(len(cores))
+	log_dir = os.path.join(opt.checkpoints_dir, opt.name)
+	os.makedirs(log_dir, exist_ok=True)
+	log = open(os.path.join(log_dir, 'sweep_run.log'), 'wt', buffering=1)
+	sys.stdout = sys.stderr = log
+	try:
+		import train
+		results.put(dict(train.main(opt)))
+	except Exception as e:
+		results.put({'error': '%s: %s' % (type(e).__name__, e)})
+	finally:
+		log.flush()
+
+
+def partition_cores(n_workers, n_threads):
+	cores = sorted(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else list(range(os.cpu_count()))
+	if n_threads <= 0:
+		n_workers = n_workers if n_workers > 0 else 1
+		n_threads = max(1, len(cores) // n_workers)
+	if n_workers <= 0:
+		n_workers = max(1, len(cores) // n_threads)
+	slots = []
+	for i in range(n_workers):
+		# wraps around when more threads are requested than there are cores
+		slots.append(set(cores[(i * n_threads + j) % len(cores)] for j in range(n_threads)))
+	return slots
+
+
+def sweep(opt):
+	opt.display_id = 0
+	opt.continue_train = False
+	if opt.val_freq <= 0:
+		# validate once at the end, for the summary
+		opt.val_freq = opt.niter + opt.niter_decay
+	experiments = expand(opt)
+	slots = partition_cores(opt.sweep_workers, opt.sweep_threads)
+	print('%d experiments, %d at a time, cores per experiment: %s' % (
+		len(experiments), len(slots), ' | '.join(','.join(map(str, sorted(s))) for s in slots)))
+
+	ctx = multiprocessing.get_context('spawn')
+	pending = list(experiments)
+	running = {}
+	rows = []
+	while pending or running:
+		for slot, cores in enumerate(slots):
+			if slot not in running and pending:
+				run_opt, overrides = pending.pop(0)
+				results = ctx.Queue()
+				process = ctx.Process(target=run_experiment, args=(run_opt, cores, results))
+				process.start()
+				running[slot] = (process, results, run_opt, overrides, time.time())
+				print('started %s on cores %s' % (run_opt.name, ','.join(map(str, sorted(cores)))))
+		time.sleep(1)
+		for slot, (process, results, run_opt, overrides, start) in list(running.items()):
+			try:
+				result = results.get_nowait()
+			except queue.Empty:
+				if process.is_alive():
+					continue
+				# e.g. killed for running out of memory
+				result = {'error': 'exited with code %s' % process.exitcode}
+			process.join()
+			del running[slot]
+			row = OrderedDict([('name', run_opt.name)])
+			row.update(overrides)
+			row['minutes'] = (time.time() - start) / 60.0
+			row.update(result)
+			rows.append(row)
+			print('finished %s: %s' % (run_opt.name, json.dumps(result)))
+
+	write_summary(opt, rows)
+	return rows
+
+
+def write_summary(opt, rows):
+	columns = []
+	for row in rows:
+		columns += [c for c in row.keys() if c not in columns]
+	rows = sorted(rows, key=lambda r: -r.get('PSNR', float('-inf')))
+	widths = [max(len(c), *[len(format_cell(r.get(c, ''))) for r in rows]) for c in columns]
+	print('  '.join(c.ljust(w) for c, w in zip(columns, widths)))
+	for row in rows:
+		print('  '.join(format_cell(row.get(c, '')).ljust(w) for c, w in zip(columns, widths)))
+
+	summary_dir = os.path.join(opt.checkpoints_dir, opt.name)
+	os.makedirs(summary_dir, exist_ok=True)
+	with open(os.path.join(summary_dir, 'sweep_summary.json'), 'wt') as f:
+		json.dump(rows, f, indent=2)
+	with open(os.path.join(summary_dir, 'sweep_summary.csv'), 'wt', newline='') as f:
+		writer = csv.writer(f)
+		writer.writerow(columns)
+		writer.writerows([[row.get(c, '') for c in columns] for row in rows])
+
+
+def format_cell(value):
+	return '%.4f' % value if isinstance(value, float) else str(value)
+
+
+if __name__ == '__main__':
+	multiprocessing.freeze_support()
+	sweep(SweepOptions().parse())
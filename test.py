@@ -1,14 +1,27 @@
-import time
+import csv
+import json
 import os
 from options.test_options import TestOptions
 from data.data_loader import CreateDataLoader
 from models.models import create_model
 from util.visualizer import Visualizer
-from pdb import set_trace as st
 from util import html
-from util.metrics import PSNR
-from pytorch_msssim import ssim as SSIM
-from PIL import Image
+from util.image_metrics import MetricAggregator
+from util.timer import StageTimer
+from util.array_store import ArrayStore
+from util.manifest import OutputManifest
+
+
+# records the inputs whose images are all on disk, returns the ones still being written
+def record_written(manifest, checkpoint, pending):
+	waiting = []
+	for path, outputs, writes in pending:
+		if not all(write.done() for write in writes):
+			waiting.append((path, outputs, writes))
+		elif all(write.exception() is None for write in writes):
+			manifest.record(path, checkpoint, outputs)
+	return waiting
+
 
 if __name__ == '__main__':
 
@@ -17,33 +30,93 @@ if __name__ == '__main__':
 	opt.batchSize = 1  # test code only supports batchSize = 1
 	opt.serial_batches = True  # no shuffle
 	opt.no_flip = True  # no flip
-	opt.model = 'test'
+	# --model deconv runs the classical deconvolution instead of the generator
+	if opt.model != 'deconv':
+		opt.model = 'test'
 	opt.dataset_mode = 'single'
 	opt.fineSize = 0
 
 	data_loader = CreateDataLoader(opt)
 	dataset = data_loader.load_data()
 	model = create_model(opt)
+	model.timer = StageTimer(window=opt.how_many)
 	visualizer = Visualizer(opt)
 	# create website
 	web_dir = os.path.join(opt.results_dir, opt.name, '%s_%s' % (opt.phase, opt.which_epoch))
-	webpage = html.HTML(web_dir, 'Experiment = %s, Phase = %s, Epoch = %s' % (opt.name, opt.phase, opt.which_epoch))
+	if opt.output_mode not in ('png', 'store', 'both'):
+		raise ValueError("Output mode [%s] not recognized." % opt.output_mode)
+	webpage = None
+	if opt.output_mode != 'store':
+		webpage = html.PagedHTML(web_dir, 'Experiment = %s, Phase = %s, Epoch = %s' % (opt.name, opt.phase, opt.which_epoch),
+								 page_size=opt.html_page_size, append=opt.incremental)
+	store = None
+	if opt.output_mode != 'png':
+		store = ArrayStore(os.path.join(web_dir, 'store'), chunk_size=opt.store_chunk_size,
+						   compression=opt.store_compression)
+	# skip inputs whose outputs are current
+	manifest = None
+	if opt.incremental:
+		manifest = OutputManifest(os.path.join(web_dir, 'manifest.jsonl'))
+		checkpoint = model.checkpoint_id()
+		paths = data_loader.dataset.A_paths
+		data_loader.dataset.A_paths = [path for path in paths if not manifest.is_current(path, checkpoint) or
+									   (store is not None and path not in store.index)]
+		print('incremental: %d of %d inputs are up to date, processing %d' % (
+			len(paths) - len(data_loader.dataset.A_paths), len(paths), len(data_loader.dataset.A_paths)))
+	# inputs processed but not yet recorded, see record_written
+	pending = []
 	# test
-	avgPSNR = 0.0
-	avgSSIM = 0.0
-	counter = 0
+	metrics = None
+	if opt.gt_dir:
+		metrics = MetricAggregator([m.strip() for m in opt.metrics.split(',') if m.strip()])
 
 	for i, data in enumerate(dataset):
 		if i >= opt.how_many:
 			break
-		counter = i
 		model.set_input(data)
 		model.test()
+		model.timer.step(data['A'].size(0))
+		if metrics is not None:
+			if model.fake_B.shape != model.input_B.shape:
+				raise ValueError('ground truth %s has shape %s, restored frame has %s' % (
+					data['B_paths'][0], tuple(model.input_B.shape), tuple(model.fake_B.shape)))
+			metrics.update((model.fake_B + 1) / 2, (model.input_B + 1) / 2, data['A_paths'])
 		visuals = model.get_current_visuals()
 		img_path = model.get_image_paths()
-		with open('./results/time_consuming-2022-0514-1.txt', 'a') as f:
-			f.write('Process image:{} \n'.format(img_path))
-			print('process image... %s' % img_path)
-		visualizer.save_images(webpage, visuals, img_path)
+		print('process image... %s' % img_path)
+		writes = []
+		if webpage is not None:
+			writes = visualizer.save_images(webpage, visuals, img_path)
+		if store is not None:
+			store.append(img_path[0], visuals)
+		if manifest is not None:
+			outputs = []
+			if opt.output_mode != 'store':
+				name = os.path.splitext(os.path.basename(img_path[0]))[0]
+				outputs = [os.path.join(webpage.get_image_dir(), '%s_%s.png' % (name, label)) for label in visuals]
+			# only once the writer has put the images in place, so an
+			# interrupted run never records outputs it did not write
+			pending = record_written(manifest, checkpoint, pending + [(img_path[0], outputs, writes)])
+
+	if webpage is not None:
+		webpage.save()
+	visualizer.close()
+	if store is not None:
+		store.close()
+	if manifest is not None:
+		record_written(manifest, checkpoint, pending)
+		manifest.close()
+	print(model.timer.format_summary())
+
+	if metrics is not None and len(metrics) > 0:
+		summary = metrics.summary()
+		for name, stats in summary.items():
+			print('%s: mean %.4f std %.4f p5 %.4f p50 %.4f p95 %.4f (%d images)' % (
+				name, stats['mean'], stats['std'], stats['p5'], stats['p50'], stats['p95'], stats['count']))
+		with open(os.path.join(web_dir, 'metrics.json'), 'wt') as f:
+			json.dump(summary, f, indent=2)
+		with open(os.path.join(web_dir, 'metrics.csv'), 'wt', newline='') as f:
+			writer = csv.writer(f)
+			writer.writerow(['path'] + metrics.names)
+			writer.writerows(metrics.per_image())
 
-	webpage.save()
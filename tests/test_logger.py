@@ -0,0 +1,117 @@
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from util.logger import MetricsLogger, VisdomSink
+
+try:
+    import visdom
+except ImportError:
+    visdom = None
+
+
+class VisdomHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        msg = json.loads(self.rfile.read(int(self.headers['Content-Length'])) or b'{}')
+        if server.down:
+            # drop the connection without answering, as a dead server would
+            self.close_connection = True
+            return
+        time.sleep(server.delay)
+        endpoint = self.path.lstrip('/')
+        if endpoint == 'win_exists':
+            body = 'true' if msg['win'] in server.windows else 'false'
+        elif endpoint in ('events', 'update'):
+            server.windows.add(msg['win'])
+            for trace in msg['data']:
+                server.points.append((msg['win'], trace['x'][0], trace['y'][0]))
+            body = msg['win']
+        else:
+            body = ''
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StandInVisdom(ThreadingHTTPServer):
+    """Accepts the endpoints the visdom client posts to and records the plotted
+    points. `delay` stalls every response; `down` drops every connection."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), VisdomHandler)
+        self.delay = 0
+        self.down = False
+        self.windows = set()
+        self.points = []
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+
+    def sink(self):
+        return VisdomSink(self.server_address[1], server='http://127.0.0.1')
+
+
+@unittest.skipIf(visdom is None, 'visdom is not installed')
+class VisdomSinkTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInVisdom()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_plots_averaged_losses(self):
+        logger = MetricsLogger([self.server.sink()])
+        logger.accumulate({'G_GAN': torch.tensor(1.0), 'D_real': torch.tensor(4.0)})
+        logger.accumulate({'G_GAN': torch.tensor(3.0), 'D_real': torch.tensor(2.0)})
+        logger.flush_train(1, 10, 2, 4, 0.1)
+        logger.log('val', 1, {'PSNR': 30.0})
+        logger.close()
+
+        self.assertEqual(self.server.points,
+                         [('G_GAN', 1.5, 2.0), ('D_real', 1.5, 3.0), ('val_PSNR', 1, 30.0)])
+
+    def test_unreachable_server_disables_sink(self):
+        self.server.down = True
+        sink = self.server.sink()
+        logger = MetricsLogger([sink])
+        logger.log('train', 1, {'G_GAN': 1.0})
+        logger.close()
+        self.assertTrue(sink.disabled)
+        self.assertEqual(self.server.points, [])
+
+    def test_slow_server_does_not_block_flush_train(self):
+        self.server.delay = 0.2
+        logger = MetricsLogger([self.server.sink()], max_pending=4)
+        start = time.time()
+        for iters in range(1, 21):
+            logger.accumulate({'G_GAN': torch.tensor(float(iters))})
+            logger.flush_train(0, 10, iters, 20, 0.1)
+        self.assertLess(time.time() - start, self.server.delay)
+        logger.close(timeout=30)
+
+        plotted = [y for _, _, y in self.server.points]
+        self.assertEqual(logger.workers[0].dropped, 20 - len(plotted))
+        self.assertGreater(logger.workers[0].dropped, 0)
+        # apart from the record already being sent, what arrives is the newest
+        # run: the queue dropped its oldest records first
+        kept = plotted[1:] if plotted[0] == 1.0 else plotted
+        self.assertEqual(kept, [float(i) for i in range(21 - len(kept), 21)])
+
+
+if __name__ == '__main__':
+    unittest.main()
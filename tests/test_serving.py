@@ -0,0 +1,150 @@
+import asyncio
+import functools
+import io
+import os
+import sys
+import unittest
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+import torch.nn as nn
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import serve
+from models.registry import ModelRegistry
+from util import png
+from util.serving import DynamicBatcher, InferenceServer, decode_frame
+
+
+def encode_png(image):
+    return png.encode_array(image)
+
+
+async def request(port, method, path, body=b'', headers=None):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    lines = ['%s %s HTTP/1.1' % (method, path), 'Host: localhost', 'Content-Length: %d' % len(body),
+             'Connection: close']
+    lines += ['%s: %s' % item for item in (headers or {}).items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, payload = response.partition(b'\r\n\r\n')
+    return int(head.split()[1]), payload
+
+
+class InferenceServerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.batch_sizes = []
+
+        def run_batch(tensors, model):
+            self.batch_sizes.append(len(tensors))
+            # a stand-in generator: invert the frame
+            return [-t for t in tensors]
+
+        self.batcher = DynamicBatcher(run_batch, max_batch_size=8, max_wait=0.05, max_queue=64)
+        self.server = InferenceServer(self.batcher)
+        await self.server.start('127.0.0.1', 0)
+        self.port = self.server.server.sockets[0].getsockname()[1]
+
+    async def asyncTearDown(self):
+        self.server.server.close()
+        await self.server.server.wait_closed()
+        self.batcher.task.cancel()
+        self.batcher.executor.shutdown(wait=True)
+
+    async def test_health(self):
+        status, payload = await request(self.port, 'GET', '/health')
+        self.assertEqual((status, payload), (200, b'ok'))
+
+    async def test_concurrent_requests_are_batched(self):
+        frames = [np.full((16, 16), 10 * i, dtype=np.uint8) for i in range(6)]
+        responses = await asyncio.gather(*[request(self.port, 'POST', '/restore', encode_png(f)) for f in frames])
+        for frame, (status, payload) in zip(frames, responses):
+            self.assertEqual(status, 200)
+            output = np.array(Image.open(io.BytesIO(payload)))
+            self.assertLessEqual(np.abs(output.astype(int) - (255 - frame.astype(int))).max(), 1)
+        self.assertEqual(sum(self.batch_sizes), 6)
+        self.assertLess(len(self.batch_sizes), 6)
+
+    async def test_undecodable_frame(self):
+        status, _ = await request(self.port, 'POST', '/restore', b'not a png')
+        self.assertEqual(status, 400)
+
+
+class QueueFullTest(unittest.IsolatedAsyncioTestCase):
+    async def test_queue_filling_while_model_loads_gives_503(self):
+        load = Future()
+
+        class Registry():
+            def prefetch(self, name, which_epoch):
+                return load
+
+            def stats(self):
+                return {}
+
+        # not started, so nothing drains the queue
+        batcher = DynamicBatcher(lambda tensors, model: tensors, max_queue=1)
+        server = InferenceServer(batcher, registry=Registry(), default_model=('model', 'latest'))
+        body = encode_png(np.zeros((8, 8), dtype=np.uint8))
+        pending = asyncio.ensure_future(server.dispatch('POST', '/restore', {}, body))
+        await asyncio.sleep(0.1)
+        batcher.submit(torch.zeros(1, 8, 8))
+        load.set_result(object())
+        status, _, payload, _ = await pending
+        self.assertEqual((status, payload), (503, b'queue full'))
+        self.assertEqual(server.rejected, 1)
+        batcher.executor.shutdown(wait=True)
+
+
+class ModelSelectionTest(unittest.IsolatedAsyncioTestCase):
+    async def test_names_outside_checkpoints_dir_are_rejected(self):
+        loaded = []
+        registry = ModelRegistry(lambda name, which_epoch: loaded.append((name, which_epoch)) or nn.Conv2d(1, 1, 1))
+        batcher = DynamicBatcher(lambda tensors, model: tensors)
+        server = InferenceServer(batcher, registry=registry, default_model=('model', 'latest'))
+        body = encode_png(np.zeros((8, 8), dtype=np.uint8))
+        for query in ({'model': ['../../x']}, {'model': ['a/b']}, {'model': ['..']}, {'epoch': ['../latest']}):
+            status, _, _, _ = await server.dispatch('POST', '/restore', {}, body, query)
+            self.assertEqual(status, 400)
+            status, _, _, _ = await server.dispatch('POST', '/models/load', {}, b'', query)
+            self.assertEqual(status, 400)
+        self.assertEqual(loaded, [])
+        registry.close()
+        batcher.executor.shutdown(wait=True)
+
+    async def test_without_registry_the_default_generator_serves(self):
+        netG = nn.Conv2d(1, 1, 1)
+        nn.init.constant_(netG.weight, -1.0)
+        nn.init.zeros_(netG.bias)
+        batcher = DynamicBatcher(functools.partial(serve.run_batch, default_netG=netG))
+        server = InferenceServer(batcher)
+        batcher.start()
+        body = encode_png(np.full((8, 8), 200, dtype=np.uint8))
+        status, _, payload, _ = await server.dispatch('POST', '/restore', {}, body)
+        self.assertEqual(status, 200)
+        self.assertLessEqual(abs(int(np.array(Image.open(io.BytesIO(payload))).max()) - 55), 1)
+        batcher.task.cancel()
+        batcher.executor.shutdown(wait=True)
+
+
+class DecodeFrameTest(unittest.TestCase):
+    def test_16_bit_png_is_scaled_not_clipped(self):
+        image = (np.arange(256, dtype=np.uint16) * 257).reshape(16, 16)
+        tensor = decode_frame(encode_png(image), {})
+        expected = torch.from_numpy((image >> 8).astype(np.float32) / 255 * 2 - 1)
+        self.assertTrue(torch.allclose(tensor[0], expected))
+
+    def test_raw_frame(self):
+        image = np.arange(12, dtype=np.uint16).reshape(3, 4) * 1000
+        headers = {'content-type': 'application/octet-stream', 'x-width': '4', 'x-height': '3', 'x-dtype': 'uint16'}
+        tensor = decode_frame(image.tobytes(), headers)
+        self.assertEqual(tuple(tensor.shape), (1, 3, 4))
+        self.assertAlmostEqual(tensor[0, 2, 3].item(), 11000 / 65535.0 * 2 - 1, places=5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,65 +1,200 @@
+import copy
+import os
 import time
+from collections import OrderedDict
+import torch
 from options.train_options import TrainOptions
 from data.data_loader import CreateDataLoader
 from models.models import create_model
+from models.memory_planner import auto_batch_size
 from util.visualizer import Visualizer
+from util.timer import StageTimer
+from util.logger import create_logger
+from util import image_metrics
+from util.checkpoint import capture_rng_state, restore_rng_state
+from data.resolution_schedule import ResolutionSchedule
 from multiprocessing import freeze_support
 
 
-def train(opt, _data_loader, model, visualizer):
+def validate(val_loader, model):
+	# generator in the mode TestModel.test() runs it in (train mode, as test.py
+	# does), under inference mode, metrics summed on device; the running
+	# statistics this updates are put back, and the mode restored afterwards
+	was_training = model.netG.training
+	buffers = [(b, b.clone()) for b in model.netG.buffers()]
+	model.netG.train()
+	psnr_sum = 0.0
+	ssim_sum = 0.0
+	count = 0
+	with torch.inference_mode():
+		for data in val_loader.load_data():
+			model.set_input(data)
+			model.test()
+			fake_B = (model.fake_B + 1) / 2
+			real_B = (model.real_B + 1) / 2
+			psnr_sum = psnr_sum + image_metrics.psnr(fake_B, real_B).sum()
+			ssim_sum = ssim_sum + image_metrics.ssim(fake_B, real_B).sum()
+			count += fake_B.size(0)
+		for buffer, saved in buffers:
+			buffer.copy_(saved)
+	model.netG.train(was_training)
+	if count == 0:
+		return OrderedDict()
+	return OrderedDict([('PSNR', float(psnr_sum) / count), ('SSIM', float(ssim_sum) / count)])
+
+
+# loader of the held-out |dataroot|/val split, in order and without augmentation
+def create_val_loader(opt):
+	val_opt = copy.copy(opt)
+	val_opt.phase = 'val'
+	val_opt.batchSize = opt.val_batchSize
+	val_opt.serial_batches = True
+	val_opt.no_flip = True
+	val_opt.nThreads = min(opt.nThreads, 2)
+	return CreateDataLoader(val_opt)
+
+
+def train(opt, _data_loader, model, visualizer, val_loader=None):
 	# load data
-	dataset = _data_loader.load_data()
 	dataset_size = len(_data_loader)
 	print('#training images = %d' % dataset_size)
 
-	total_steps = 0
+	schedule = None
+	if opt.resolution_schedule:
+		# size of the uncropped frames
+		_data_loader.set_resolution(0, opt.batchSize)
+		full_size = max(_data_loader.dataset[0]['A'].shape[1:])
+		schedule = ResolutionSchedule(opt.resolution_schedule, opt.batchSize, opt.fineSize, full_size)
+		print('resolution schedule: %s' % schedule)
+
+	timer = StageTimer(enabled=opt.timing, window=opt.timing_window, sync_cuda=opt.timing_sync and len(opt.gpu_ids) > 0)
+	model.timer = timer
+	timing_log = os.path.join(opt.checkpoints_dir, opt.name, 'timing_log.jsonl')
+	logger = create_logger(opt)
+
+	def resume_state(epoch, epoch_iter, total_steps, steps):
+		return {'epoch': epoch, 'epoch_iter': epoch_iter, 'total_steps': total_steps, 'steps': steps,
+				'model': model.get_train_state(), 'data': _data_loader.state_dict(),
+				'rng': capture_rng_state()}
+
+	# total_steps counts training images, steps the optimizer steps the
+	# display, print and save_latest frequencies are given in
+	start_epoch, start_iter, total_steps, steps = opt.epoch_count, 0, 0, 0
+	if opt.resume:
+		state = model.checkpoints.load_latest()
+		if state is not None:
+			model.load_train_state(state['model'])
+			_data_loader.load_state_dict(state['data'])
+			restore_rng_state(state['rng'])
+			start_epoch, start_iter, total_steps = state['epoch'], state['epoch_iter'], state['total_steps']
+			steps = state.get('steps', total_steps // opt.batchSize)
+			print('resumed at epoch %d, iters %d, total_steps %d' % (start_epoch, start_iter, total_steps))
+
+	best_psnr = None
+	stale_validations = 0
+	val_results = OrderedDict()
+
 	total_epoch = opt.niter + opt.niter_decay
-	for epoch in range(opt.epoch_count, total_epoch + 1):
-		epoch_start_time = time.time()
-		epoch_iter = 0
-		for i, data in enumerate(dataset):
-			iter_start_time = time.time()
-			total_steps += opt.batchSize
-			epoch_iter += opt.batchSize
+	for epoch in range(start_epoch, total_epoch + 1):
+		epoch_start_time = time.perf_counter()
+		timer.reset_epoch()
+		# skip the samples of a resumed epoch that were already trained on
+		epoch_iter = start_iter if epoch == start_epoch else 0
+		batch_size = opt.batchSize
+		if schedule is not None:
+			fine_size, batch_size = schedule.stage(epoch)
+			_data_loader.set_resolution(fine_size, batch_size)
+			print('epoch %d: fineSize %d, batchSize %d' % (epoch, fine_size, batch_size))
+		_data_loader.set_epoch(epoch, epoch_iter)
+		dataset = _data_loader.load_data()
+		for i, data in enumerate(timer.iterate(dataset, 'data')):
+			iter_start_time = time.perf_counter()
+			n_images = data['A'].size(0)
+			total_steps += n_images
+			epoch_iter += n_images
+			steps += 1
 			model.set_input(data)
 			model.optimize_parameters()
+			timer.step(n_images)
+			logger.accumulate(model.get_current_losses())
 
-			if total_steps % opt.display_freq == 0:
-				results = model.get_current_visuals()
-				visualizer.display_current_results(results, epoch)
+			if steps % opt.display_freq == 0:
+				with timer.stage('visuals'):
+					results = model.get_current_visuals()
+					visualizer.display_current_results(results, epoch)
 
-			if total_steps % opt.print_freq == 0:
-				errors = model.get_current_errors()
+			if steps % opt.print_freq == 0:
+				# losses are averaged over the steps since the last print
+				t = (time.perf_counter() - iter_start_time) / n_images
+				logger.flush_train(epoch, total_epoch, epoch_iter, dataset_size, t)
+				if opt.timing:
+					print(timer.format_summary())
 
-				t = (time.time() - iter_start_time) / opt.batchSize
-				visualizer.print_current_errors(epoch, total_epoch, epoch_iter, dataset_size, errors, t)
-				if opt.display_id > 0:
-					for item in errors.items():
-						visualizer.plot_current_errors_tuple(epoch, float(epoch_iter)/dataset_size, opt, item)
-
-			if total_steps % opt.save_latest_freq == 0:
+			if steps % opt.save_latest_freq == 0:
 				print('saving the latest model (epoch %d, total_steps %d)' % (epoch, total_steps))
-				model.save('latest')
+				with timer.stage('save'):
+					model.save('latest')
+					model.checkpoints.save_resume(resume_state(epoch, epoch_iter, total_steps, steps), total_steps)
 
 		if epoch % opt.save_epoch_freq == 0:
 			print('saving the model at the end of epoch %d, iters %d' % (epoch, total_steps))
-			model.save('latest')
-			model.save(epoch)
+			with timer.stage('save'):
+				model.save('latest')
+				model.save(epoch)
 
-		print('End of epoch %d / %d \t Time Taken: %d sec' % (epoch, opt.niter + opt.niter_decay, time.time() - epoch_start_time))
+		timer.write_epoch(timing_log, epoch)
+		print('End of epoch %d / %d \t Time Taken: %d sec' % (epoch, opt.niter + opt.niter_decay, time.perf_counter() - epoch_start_time))
 
 		if epoch > opt.niter:
 			model.update_learning_rate()
+		model.checkpoints.save_resume(resume_state(epoch + 1, 0, total_steps, steps), total_steps)
 
+		if val_loader is not None and epoch % opt.val_freq == 0:
+			with timer.stage('validate'):
+				results = validate(val_loader, model)
+			if results:
+				val_results = results
+				logger.log('val', epoch, results, images=len(val_loader))
+				if best_psnr is None or results['PSNR'] > best_psnr:
+					best_psnr = results['PSNR']
+					stale_validations = 0
+				else:
+					stale_validations += 1
+				if opt.val_patience > 0 and stale_validations >= opt.val_patience:
+					print('no PSNR improvement in %d validations, stopping at epoch %d' % (stale_validations, epoch))
+					break
 
-if __name__ == '__main__':
-	freeze_support()
+	model.checkpoints.close()
+	logger.close()
+	visualizer.close()
+	# metrics of the last validation plus the best PSNR seen
+	if best_psnr is not None:
+		val_results['best_PSNR'] = best_psnr
+	return val_results
 
-	opt = TrainOptions().parse()
+
+def main(opt):
 	opt.resize_or_crop = "crop"
 	opt.save_latest_freq = 100
 
 	data_loader = CreateDataLoader(opt)
+	val_loader = None
+	if opt.val_freq > 0:
+		val_loader = create_val_loader(opt)
 	model = create_model(opt)
+	if opt.auto_batch_size:
+		size = opt.fineSize
+		if size == 0:
+			data_loader.set_resolution(0, opt.batchSize)
+			size = max(data_loader.dataset[0]['A'].shape[1:])
+		# the planner sizes the micro-batch, the effective batch is accum_steps of them
+		micro_batch_size = auto_batch_size(model, size, opt.memory_budget_mb, max(1, len(data_loader) // opt.accum_steps))
+		opt.batchSize = micro_batch_size * opt.accum_steps
+		data_loader.set_resolution(opt.fineSize, opt.batchSize)
 	visualizer = Visualizer(opt)
-	train(opt, data_loader, model, visualizer)
+	return train(opt, data_loader, model, visualizer, val_loader)
+
+
+if __name__ == '__main__':
+	freeze_support()
+	main(TrainOptions().parse())
@@ -0,0 +1,169 @@
+import json
+import os
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+
+class ArrayStore():
+    """Chunked on-disk store of fixed-shape frames, indexed by frame path.
+
+    Layout of |root|:
+        meta.json               chunk size, compression, dtype and shape per key
+        index.jsonl             one {"path": ..., "index": ...} line per frame
+        <key>/chunk_000000.npy  frames [0, chunk_size) when uncompressed
+        <key>/chunk_000000.zlib the same, zlib compressed
+
+    Frames are buffered until a chunk is full and every chunk file is written
+    once, under a temporary name and renamed. Uncompressed chunks are read
+    through np.load(mmap_mode='r'), so random access only touches the pages it
+    needs. Opening an existing store appends after its last frame.
+    """
+
+    def __init__(self, root, chunk_size=256, compression=0, mode='a'):
+        self.root = root
+        self.mode = mode
+        meta_path = os.path.join(root, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+        elif mode == 'r':
+            raise IOError('no array store at %s' % root)
+        else:
+            os.makedirs(root, exist_ok=True)
+            self.meta = {'chunk_size': chunk_size, 'compression': compression, 'keys': OrderedDict()}
+            self._write_meta()
+        self.chunk_size = self.meta['chunk_size']
+        self.compression = self.meta['compression']
+
+        self.paths = []
+        self.index = {}
+        index_path = os.path.join(root, 'index.jsonl')
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                for line in f:
+                    entry = json.loads(line)
+                    self.index[entry['path']] = entry['index']
+                    self.paths.append(entry['path'])
+        self.index_file = open(index_path, 'a') if mode != 'r' else None
+
+        self._cache = (None, None)
+        # frames of the last, partially filled chunk of each key
+        self.buffers = dict((key, self._read_partial(key)) for key in self.meta['keys'])
+        # index lines are written only after the chunk holding their frames
+        self.pending_index = []
+
+    def _write_meta(self):
+        tmp_path = os.path.join(self.root, 'meta.json.tmp')
+        with open(tmp_path, 'wt') as f:
+            json.dump(self.meta, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.root, 'meta.json'))
+
+    def _chunk_path(self, key, chunk):
+        ext = 'zlib' if self.compression > 0 else 'npy'
+        return os.path.join(self.root, key, 'chunk_%06d.%s' % (chunk, ext))
+
+    def _read_partial(self, key):
+        n_partial = len(self.paths) % self.chunk_size
+        if n_partial == 0:
+            return []
+        chunk = self._load_chunk(key, len(self.paths) // self.chunk_size)
+        return [np.array(frame) for frame in chunk[:n_partial]]
+
+    def __len__(self):
+        return len(self.paths)
+
+    def keys(self):
+        return list(self.meta['keys'].keys())
+
+    def append(self, path, frames):
+        """|frames|: dict of key -> numpy array, the same keys for every call."""
+        if self.mode == 'r':
+            raise IOError('array store %s is open read-only' % self.root)
+        keys = self.meta['keys']
+        if not keys:
+            for key, frame in frames.items():
+                keys[key] = {'dtype': str(frame.dtype), 'shape': list(frame.shape)}
+                os.makedirs(os.path.join(self.root, key), exist_ok=True)
+                self.buffers[key] = []
+            self._write_meta()
+        if set(frames.keys()) != set(keys.keys()):
+            raise ValueError('expected frames for %s, got %s' % (sorted(keys), sorted(frames)))
+        for key, frame in frames.items():
+            if list(frame.shape) != keys[key]['shape'] or str(frame.dtype) != keys[key]['dtype']:
+                raise ValueError('frame %s of %s is %s %s, the store holds %s %s' % (
+                    key, path, frame.dtype, tuple(frame.shape), keys[key]['dtype'], tuple(keys[key]['shape'])))
+
+        index = len(self.paths)
+        for key, frame in frames.items():
+            self.buffers[key].append(np.ascontiguousarray(frame))
+        self.paths.append(path)
+        self.index[path] = index
+        self.pending_index.append(json.dumps({'path': path, 'index': index}) + '\n')
+        if len(self.paths) % self.chunk_size == 0:
+            self._flush_chunks()
+        return index
+
+    def _flush_chunks(self):
+        chunk = (len(self.paths) - 1) // self.chunk_size
+        for key, frames in self.buffers.items():
+            if frames:
+                self._write_chunk(key, chunk, np.stack(frames))
+            if len(frames) == self.chunk_size:
+                self.buffers[key] = []
+        self.index_file.writelines(self.pending_index)
+        self.index_file.flush()
+        self.pending_index = []
+
+    def _write_chunk(self, key, chunk, data):
+        path = self._chunk_path(key, chunk)
+        tmp_path = path + '.tmp'
+        if self.compression > 0:
+            with open(tmp_path, 'wb') as f:
+                f.write(zlib.compress(data.tobytes(), self.compression))
+        else:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, data)
+        os.replace(tmp_path, path)
+        if self._cache[0] == (key, chunk):
+            self._cache = (None, None)
+
+    def _load_chunk(self, key, chunk):
+        if self._cache[0] == (key, chunk):
+            return self._cache[1]
+        path = self._chunk_path(key, chunk)
+        if self.compression > 0:
+            spec = self.meta['keys'][key]
+            with open(path, 'rb') as f:
+                data = np.frombuffer(zlib.decompress(f.read()), dtype=spec['dtype'])
+            data = data.reshape([-1] + spec['shape'])
+        else:
+            data = np.load(path, mmap_mode='r')
+        self._cache = ((key, chunk), data)
+        return data
+
+    def read(self, key, index):
+        if index < 0:
+            index += len(self.paths)
+        if not 0 <= index < len(self.paths):
+            raise IndexError('frame %d out of range' % index)
+        chunk, offset = divmod(index, self.chunk_size)
+        frames = self.buffers.get(key)
+        if frames and chunk == (len(self.paths) - 1) // self.chunk_size:
+            return frames[offset]
+        return self._load_chunk(key, chunk)[offset]
+
+    def get(self, path, key):
+        return self.read(key, self.index[path])
+
+    # writes the partially filled last chunk, it is rewritten when appending resumes
+    def flush(self):
+        if self.mode != 'r' and len(self.paths) % self.chunk_size != 0:
+            self._flush_chunks()
+
+    def close(self):
+        self.flush()
+        if self.index_file is not None:
+            self.index_file.close()
+            self.index_file = None
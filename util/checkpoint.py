@@ -0,0 +1,154 @@
+import os
+import glob
+import queue
+import random
+import threading
+import numpy as np
+import torch
+
+
+# Copies every tensor in a (nested) state dict to cpu memory. The live
+# network and optimizer stay where they are.
+def snapshot(state):
+    if torch.is_tensor(state):
+        return state.detach().to('cpu', copy=True)
+    if isinstance(state, dict):
+        return type(state)((k, snapshot(v)) for k, v in state.items())
+    if isinstance(state, (list, tuple)):
+        return type(state)(snapshot(v) for v in state)
+    return state
+
+
+def atomic_save(obj, path):
+    tmp_path = '%s.%d.tmp' % (path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        torch.save(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+# Loads a state dict to cpu. The file is memory mapped when it is in the zip
+# format, so tensors are paged in from disk on first use instead of copied.
+# Half precision tensors of compact checkpoints come back as float32.
+def load_weights(path, mmap=True):
+    try:
+        state = torch.load(path, map_location='cpu', mmap=mmap, weights_only=True)
+    except RuntimeError:
+        # legacy (pre zip) checkpoints cannot be mapped
+        state = torch.load(path, map_location='cpu', weights_only=True)
+    metadata = getattr(state, '_metadata', None)
+    state = type(state)((k, v.float() if v.dtype == torch.float16 else v) for k, v in state.items())
+    if metadata is not None:
+        state._metadata = metadata
+    return state
+
+
+# float32 tensors of |state| as float16, about half the size on disk
+def compact(state):
+    metadata = getattr(state, '_metadata', None)
+    state = type(state)((k, v.detach().to('cpu', torch.float16) if v.dtype == torch.float32 else snapshot(v))
+                        for k, v in state.items())
+    if metadata is not None:
+        state._metadata = metadata
+    return state
+
+
+def capture_rng_state():
+    state = {'python': random.getstate(),
+             'numpy': np.random.get_state(),
+             'torch': torch.get_rng_state()}
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def restore_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+class CheckpointManager():
+    """Writes checkpoints from a background thread.
+
+    State dicts are snapshotted to cpu on the caller's thread, then written to a
+    temporary file and renamed into place, so a crash never leaves a truncated
+    checkpoint behind. Resume checkpoints are named by total step count and only
+    the newest |keep| are kept.
+    """
+
+    def __init__(self, save_dir, keep=3, max_pending=2):
+        self.save_dir = save_dir
+        self.keep = keep
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = None
+        self.error = None
+
+    def _start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                if job is None:
+                    return
+                obj, path, prune = job
+                atomic_save(obj, path)
+                if prune:
+                    self.prune()
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError('checkpoint writer failed: %s' % error)
+
+    # snapshot |state| and write it to |path| in the background
+    def write(self, state, path, prune=False):
+        self._check()
+        self._start()
+        self.queue.put((snapshot(state), path, prune))
+
+    def resume_path(self, total_steps):
+        return os.path.join(self.save_dir, 'resume_%09d.pth' % total_steps)
+
+    def resume_paths(self):
+        return sorted(glob.glob(os.path.join(self.save_dir, 'resume_*.pth')))
+
+    def save_resume(self, state, total_steps):
+        self.write(state, self.resume_path(total_steps), prune=True)
+
+    def prune(self):
+        paths = self.resume_paths()
+        for path in paths[:max(0, len(paths) - self.keep)]:
+            os.remove(path)
+
+    def load_latest(self):
+        self.flush()
+        paths = self.resume_paths()
+        if not paths:
+            return None
+        print('resuming from %s' % paths[-1])
+        return torch.load(paths[-1], map_location='cpu', weights_only=False)
+
+    # block until every queued checkpoint is on disk
+    def flush(self):
+        if self.thread is not None:
+            self.queue.join()
+        self._check()
+
+    def close(self):
+        if self.thread is not None:
+            self.queue.put(None)
+            self.thread.join()
+            self.thread = None
+        self._check()
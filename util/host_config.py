@@ -0,0 +1,59 @@
+import json
+import os
+import platform
+
+import torch
+
+
+def autocast_context(device, precision):
+    if precision == 'fp32':
+        return torch.autocast(device.type, enabled=False)
+    dtype = {'bf16': torch.bfloat16, 'fp16': torch.float16}[precision]
+    return torch.autocast(device.type, dtype=dtype)
+
+
+def host_config_path(opt, name=None):
+    """checkpoints_dir/<name>/autotune_<host>.json unless --autotune_config is set."""
+    if getattr(opt, 'autotune_config', ''):
+        return opt.autotune_config
+    return os.path.join(opt.checkpoints_dir, name or opt.name, 'autotune_%s.json' % platform.node())
+
+
+def save_host_config(path, config):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wt') as f:
+        json.dump(config, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def load_host_config(opt, device, name=None):
+    """The autotuned inference config of this host, or None.
+
+    A config tuned on another device type (cpu vs cuda) is ignored.
+    """
+    if getattr(opt, 'no_autotune', False):
+        return None
+    path = host_config_path(opt, name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        config = json.load(f)
+    if config.get('device_type') != device.type:
+        print('ignoring %s, tuned for %s' % (path, config.get('device_type')))
+        return None
+    print('using autotuned config %s: %d threads, batch %d, %s%s' % (
+        path, config['threads'], config['batch_size'],
+        'fp32' if config['precision'] == 'fp32' else '%s autocast' % config['precision'],
+        ', channels_last' if config['channels_last'] else ''))
+    return config
+
+
+def apply_host_config(config, netG):
+    """Sets the thread count and memory format; returns the precision to run in."""
+    if config is None:
+        return 'fp32'
+    if config['threads'] > 0:
+        torch.set_num_threads(config['threads'])
+    if config['channels_last']:
+        netG.to(memory_format=torch.channels_last)
+    return config['precision']
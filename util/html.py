@@ -1,5 +1,6 @@
 import dominate
 from dominate.tags import *
+import glob
 import os
 
 
@@ -49,6 +50,104 @@ class HTML:
         f.close()
 
 
+class PagedHTML:
+    """Append-only HTML report split into pages of |page_size| image rows.
+
+    Only the current page is held in memory. A full page is written once and
+    dropped; index.html just links the pages, so writing stays cheap however many
+    rows are added. With |append|, numbering continues after the pages already in
+    |web_dir|.
+    """
+
+    def __init__(self, web_dir, title, page_size=50, reflesh=0, append=False):
+        self.title = title
+        self.web_dir = web_dir
+        self.page_size = page_size
+        self.reflesh = reflesh
+        self.img_dir = os.path.join(self.web_dir, 'images')
+        if not os.path.exists(self.web_dir):
+            os.makedirs(self.web_dir)
+        if not os.path.exists(self.img_dir):
+            os.makedirs(self.img_dir)
+
+        self.n_written = len(self._existing_pages()) if append else 0
+        self._new_page()
+
+    def _existing_pages(self):
+        return sorted(glob.glob(os.path.join(self.web_dir, 'page_*.html')))
+
+    def _page_name(self, n):
+        return 'page_%05d.html' % n
+
+    def _new_page(self):
+        self.page_no = self.n_written + 1
+        self.rows = 0
+        self.doc = dominate.document(title='%s (page %d)' % (self.title, self.page_no))
+        if self.reflesh > 0:
+            with self.doc.head:
+                meta(http_equiv="reflesh", content=str(self.reflesh))
+        with self.doc:
+            with p():
+                if self.page_no > 1:
+                    a('previous', href=self._page_name(self.page_no - 1))
+                a('index', href='index.html')
+                a('next', href=self._page_name(self.page_no + 1))
+
+    def get_image_dir(self):
+        return self.img_dir
+
+    def add_header(self, str):
+        # split before a header so a header is never separated from its row
+        if self.rows >= self.page_size:
+            self._flush_page()
+        with self.doc:
+            h3(str)
+
+    def add_images(self, ims, txts, links, width=400):
+        if self.rows >= self.page_size:
+            self._flush_page()
+        t = table(border=1, style="table-layout: fixed;")
+        self.doc.add(t)
+        with t:
+            with tr():
+                for im, txt, link in zip(ims, txts, links):
+                    with td(style="word-wrap: break-word;", halign="center", valign="top"):
+                        with p():
+                            with a(href=os.path.join('images', link)):
+                                img(style="width:%dpx" % width, src=os.path.join('images', im))
+                            br()
+                            p(txt)
+        self.rows += 1
+
+    def _write_page(self):
+        with open(os.path.join(self.web_dir, self._page_name(self.page_no)), 'wt') as f:
+            f.write(self.doc.render())
+
+    def _write_index(self, n_pages):
+        doc = dominate.document(title=self.title)
+        with doc:
+            h3(self.title)
+            with ul():
+                for n in range(1, n_pages + 1):
+                    li(a(self._page_name(n), href=self._page_name(n)))
+        with open(os.path.join(self.web_dir, 'index.html'), 'wt') as f:
+            f.write(doc.render())
+
+    def _flush_page(self):
+        self._write_page()
+        self.n_written = self.page_no
+        self._write_index(self.n_written)
+        self._new_page()
+
+    # writes the partially filled current page, which is at most |page_size| rows
+    def save(self):
+        if self.rows == 0:
+            self._write_index(self.n_written)
+            return
+        self._write_page()
+        self._write_index(self.page_no)
+
+
 if __name__ == '__main__':
     html = HTML('web/', 'test_html')
     html.add_header('hello world')
@@ -0,0 +1,146 @@
+import torch
+import torch.nn.functional as F
+
+# Batched, torch-native image quality metrics. Inputs are (N, C, H, W) tensors
+# in [0, data_range]; every metric returns one value per image, shape (N,).
+
+_windows = {}
+
+
+def gaussian_window(window_size, sigma, channel, device, dtype=torch.float32):
+    """Depthwise gaussian window, cached per (size, sigma, channels, device, dtype)."""
+    key = (window_size, sigma, channel, str(device), dtype)
+    window = _windows.get(key)
+    if window is None:
+        coords = torch.arange(window_size, dtype=torch.float64) - (window_size - 1) / 2.0
+        gauss = torch.exp(-coords ** 2 / (2 * sigma ** 2))
+        gauss = gauss / gauss.sum()
+        window_2d = torch.outer(gauss, gauss).to(device=device, dtype=dtype)
+        window = window_2d.expand(channel, 1, window_size, window_size).contiguous()
+        _windows[key] = window
+    return window
+
+
+def psnr(img1, img2, data_range=1.0):
+    mse = (img1.float() - img2.float()).pow(2).flatten(1).mean(1)
+    # identical images give 100 dB, as util.metrics.PSNR does
+    return 10 * torch.log10(data_range ** 2 / mse.clamp_min(1e-10))
+
+
+def _ssim_components(img1, img2, data_range, window_size, sigma):
+    channel = img1.size(1)
+    window = gaussian_window(window_size, sigma, channel, img1.device, img1.dtype)
+    padding = window_size // 2
+    mu1 = F.conv2d(img1, window, padding=padding, groups=channel)
+    mu2 = F.conv2d(img2, window, padding=padding, groups=channel)
+
+    mu1_sq = mu1.pow(2)
+    mu2_sq = mu2.pow(2)
+    mu1_mu2 = mu1 * mu2
+
+    sigma1_sq = F.conv2d(img1 * img1, window, padding=padding, groups=channel) - mu1_sq
+    sigma2_sq = F.conv2d(img2 * img2, window, padding=padding, groups=channel) - mu2_sq
+    sigma12 = F.conv2d(img1 * img2, window, padding=padding, groups=channel) - mu1_mu2
+
+    C1 = (0.01 * data_range) ** 2
+    C2 = (0.03 * data_range) ** 2
+
+    cs_map = (2 * sigma12 + C2) / (sigma1_sq + sigma2_sq + C2)
+    ssim_map = ((2 * mu1_mu2 + C1) / (mu1_sq + mu2_sq + C1)) * cs_map
+    return ssim_map.flatten(1).mean(1), cs_map.flatten(1).mean(1)
+
+
+def ssim(img1, img2, data_range=1.0, window_size=11, sigma=1.5):
+    return _ssim_components(img1.float(), img2.float(), data_range, window_size, sigma)[0]
+
+
+MS_SSIM_WEIGHTS = (0.0448, 0.2856, 0.3001, 0.2363, 0.1333)
+
+
+def ms_ssim(img1, img2, data_range=1.0, window_size=11, sigma=1.5, weights=MS_SSIM_WEIGHTS):
+    """Multi-scale SSIM. Images too small for every scale use only the scales
+    that fit, with the remaining weights renormalized."""
+    img1 = img1.float()
+    img2 = img2.float()
+    min_side = min(img1.shape[-2:])
+    levels = 1
+    while levels < len(weights) and min_side // (2 ** levels) >= window_size:
+        levels += 1
+    weights = torch.tensor(weights[:levels], device=img1.device)
+    weights = weights / weights.sum()
+
+    values = []
+    for level in range(levels):
+        ssim_val, cs = _ssim_components(img1, img2, data_range, window_size, sigma)
+        if level < levels - 1:
+            values.append(F.relu(cs))
+            img1 = F.avg_pool2d(img1, kernel_size=2)
+            img2 = F.avg_pool2d(img2, kernel_size=2)
+        else:
+            values.append(F.relu(ssim_val))
+    values = torch.stack(values, dim=1)
+    return torch.prod(values ** weights, dim=1)
+
+
+METRICS = {'PSNR': psnr, 'SSIM': ssim, 'MS-SSIM': ms_ssim}
+
+
+class MetricAggregator():
+    """Streams batches of per-image metrics and summarizes them.
+
+    means() comes from running sums and is cheap to call while streaming. The
+    per-image values are kept on cpu, one float per image and metric, for exact
+    percentiles and the per-image table.
+    """
+
+    def __init__(self, names=('PSNR', 'SSIM', 'MS-SSIM'), data_range=1.0):
+        for name in names:
+            if name not in METRICS:
+                raise ValueError("Metric [%s] not recognized." % name)
+        self.names = list(names)
+        self.data_range = data_range
+        self.values = dict((name, []) for name in self.names)
+        self.sums = dict((name, 0.0) for name in self.names)
+        self.count = 0
+        self.paths = []
+
+    @torch.no_grad()
+    def update(self, img1, img2, paths=None):
+        batch = {}
+        for name in self.names:
+            batch[name] = METRICS[name](img1, img2, data_range=self.data_range)
+        # one host transfer per batch
+        stacked = torch.stack([batch[name] for name in self.names]).cpu()
+        for i, name in enumerate(self.names):
+            self.values[name].append(stacked[i])
+            self.sums[name] += float(stacked[i].double().sum())
+        self.count += stacked.size(1)
+        if paths is not None:
+            self.paths.extend(paths)
+        return dict((name, stacked[i]) for i, name in enumerate(self.names))
+
+    def __len__(self):
+        return self.count
+
+    def means(self):
+        return dict((name, self.sums[name] / max(1, self.count)) for name in self.names)
+
+    def summary(self, qs=(5, 50, 95)):
+        result = {}
+        for name in self.names:
+            if not self.values[name]:
+                continue
+            values = torch.cat(self.values[name]).double()
+            stats = {'mean': self.sums[name] / self.count, 'std': float(values.std()) if values.numel() > 1 else 0.0,
+                     'min': float(values.min()), 'max': float(values.max()), 'count': values.numel()}
+            quantiles = torch.quantile(values, torch.tensor([q / 100.0 for q in qs], dtype=torch.float64))
+            for q, v in zip(qs, quantiles.tolist()):
+                stats['p%d' % q] = v
+            result[name] = stats
+        return result
+
+    def per_image(self):
+        columns = [torch.cat(self.values[name]).tolist() for name in self.names]
+        for i, row in enumerate(zip(*columns)):
+            path = self.paths[i] if i < len(self.paths) else ''
+            yield [path] + list(row)
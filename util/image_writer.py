@@ -0,0 +1,50 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import png
+
+
+class ImageWriter():
+    """Encodes and writes PNG files on a thread pool.
+
+    zlib releases the GIL, so encoding overlaps with generator compute on the
+    calling thread. At most |max_pending| images are queued; save() blocks
+    beyond that, which bounds the memory held by pending frames. Files are
+    written under a temporary name and renamed, so readers never see a
+    partial PNG. save() returns a future that is done once the file is in
+    place, or holds the exception of a failed write.
+    """
+
+    def __init__(self, num_threads=2, max_pending=16, level=6):
+        self.level = level
+        self.pool = ThreadPoolExecutor(max_workers=num_threads, thread_name_prefix='image-writer')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.error = None
+
+    def _write(self, image_numpy, path):
+        try:
+            data = png.encode_array(image_numpy, self.level)
+            tmp_path = '%s.%d.tmp' % (path, threading.get_ident())
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            self.error = e
+            raise
+        finally:
+            self.slots.release()
+
+    def _check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise RuntimeError('image writer failed: %s' % error)
+
+    def save(self, image_numpy, path):
+        self._check()
+        self.slots.acquire()
+        return self.pool.submit(self._write, image_numpy, path)
+
+    def close(self):
+        self.pool.shutdown(wait=True)
+        self._check()
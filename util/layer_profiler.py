@@ -0,0 +1,230 @@
+import json
+import time
+from collections import OrderedDict
+
+import torch
+import torch.nn as nn
+
+
+def _tensors(value):
+    if torch.is_tensor(value):
+        return [value]
+    if isinstance(value, (tuple, list)):
+        return [t for t in value if torch.is_tensor(t)]
+    return []
+
+
+def _nbytes(tensors):
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+def forward_flops(module, inputs, outputs):
+    """Analytic forward FLOPs of a leaf module, a multiply-add counting as two."""
+    out = outputs[0] if outputs else None
+    if out is None:
+        return 0
+    if isinstance(module, nn.Conv2d):
+        kh, kw = module.kernel_size
+        return 2 * out.numel() * (module.in_channels // module.groups) * kh * kw
+    if isinstance(module, nn.ConvTranspose2d):
+        kh, kw = module.kernel_size
+        return 2 * inputs[0].numel() * (module.out_channels // module.groups) * kh * kw
+    if isinstance(module, nn.Linear):
+        return 2 * out.numel() * module.in_features
+    if isinstance(module, (nn.BatchNorm2d, nn.InstanceNorm2d)):
+        # mean, variance, normalize, and the affine scale and shift
+        return 5 * out.numel()
+    if isinstance(module, (nn.MaxPool2d, nn.AvgPool2d)):
+        k = module.kernel_size if isinstance(module.kernel_size, int) else module.kernel_size[0]
+        return out.numel() * k * k
+    # activations, pads, dropout: about one operation per output element
+    return out.numel()
+
+
+# gradients of the input and of the weights cost about one forward each
+def backward_flops(module, flops):
+    if isinstance(module, (nn.Conv2d, nn.ConvTranspose2d, nn.Linear)):
+        return 2 * flops
+    return flops
+
+
+class LayerStats():
+    def __init__(self, name, module):
+        self.name = name
+        self.type = type(module).__name__
+        self.calls = 0
+        self.forward_time = 0.0
+        self.backward_time = 0.0
+        self.flops = 0
+        self.backward_flops = 0
+        self.bytes = 0
+        self.output_shape = ()
+
+    def total_time(self):
+        return self.forward_time + self.backward_time
+
+    def as_dict(self):
+        return OrderedDict([('name', self.name), ('type', self.type), ('calls', self.calls),
+                            ('forward_ms', self.forward_time * 1000), ('backward_ms', self.backward_time * 1000),
+                            ('forward_gflops', self.flops / 1e9), ('backward_gflops', self.backward_flops / 1e9),
+                            ('forward_mb', self.bytes / (1024.0 * 1024.0)),
+                            ('output_shape', list(self.output_shape))])
+
+
+class LayerProfiler():
+    """Forward and backward time, FLOPs and bytes of every leaf module.
+
+    Forward time is taken between a pre-hook and a hook on each leaf module.
+    For backward, the autograd nodes a module created during its forward get
+    node hooks, and the time autograd spends in them is charged to the
+    module. Nodes are claimed by the first module reaching them, so nothing
+    is counted twice; call step() after every training step to release them.
+    Operations outside leaf modules (e.g. torch.cat in a forward) are charged
+    to the next module using their output. Bytes are the inputs, outputs and
+    parameters a forward reads or writes. Every forward and backward interval
+    is also kept as a Chrome trace event, see write_trace.
+    """
+
+    def __init__(self, networks, sync_cuda=False, max_events=200000):
+        self.networks = networks
+        self.sync_cuda = sync_cuda
+        self.max_events = max_events
+        self.stats = OrderedDict()
+        self.events = []
+        self.handles = []
+        self.claimed = set()
+        self.origin = time.perf_counter()
+
+    def _now(self):
+        if self.sync_cuda:
+            torch.cuda.synchronize()
+        return time.perf_counter()
+
+    def _event(self, name, category, start, end, args=None):
+        if len(self.events) < self.max_events:
+            event = {'name': name, 'cat': category, 'ph': 'X', 'pid': 0, 'tid': category,
+                     'ts': (start - self.origin) * 1e6, 'dur': (end - start) * 1e6}
+            if args:
+                event['args'] = args
+            self.events.append(event)
+
+    def attach(self):
+        for net_name, net in self.networks.items():
+            for name, module in net.named_modules():
+                if list(module.children()):
+                    continue
+                full_name = '%s.%s' % (net_name, name) if name else net_name
+                stats = LayerStats(full_name, module)
+                self.stats[full_name] = stats
+                self.handles.append(module.register_forward_pre_hook(self._pre_hook(stats)))
+                self.handles.append(module.register_forward_hook(self._hook(stats)))
+        return self
+
+    def detach(self):
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
+        self.claimed = set()
+
+    def step(self):
+        self.claimed = set()
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.detach()
+        return False
+
+    def _pre_hook(self, stats):
+        def hook(module, inputs):
+            module._profile_start = self._now()
+        return hook
+
+    def _hook(self, stats):
+        def hook(module, inputs, output):
+            end = self._now()
+            inputs, outputs = _tensors(inputs), _tensors(output)
+            flops = forward_flops(module, inputs, outputs)
+            nbytes = _nbytes(inputs) + _nbytes(outputs) + _nbytes(list(module.parameters(recurse=False)))
+            stats.calls += 1
+            stats.forward_time += end - module._profile_start
+            stats.flops += flops
+            stats.backward_flops += backward_flops(module, flops)
+            stats.bytes += nbytes
+            if outputs:
+                stats.output_shape = tuple(outputs[0].shape)
+            self._event(stats.name, 'forward', module._profile_start, end,
+                        {'flops': flops, 'bytes': nbytes, 'output': list(stats.output_shape)})
+            if torch.is_grad_enabled():
+                self._hook_backward(stats, outputs)
+            del module._profile_start
+        return hook
+
+    def _hook_backward(self, stats, outputs):
+        nodes = [t.grad_fn for t in outputs if t.grad_fn is not None]
+        while nodes:
+            node = nodes.pop()
+            if node is None or node in self.claimed or type(node).__name__ == 'AccumulateGrad':
+                continue
+            self.claimed.add(node)
+            nodes.extend(next_node for next_node, _ in node.next_functions)
+            self._time_node(stats, node)
+
+    def _time_node(self, stats, node):
+        start = [0.0]
+        # the hooks must not reference the node, it holds them
+        node_name = node.name()
+
+        def pre_hook(grad_outputs):
+            start[0] = self._now()
+
+        def hook(grad_inputs, grad_outputs):
+            end = self._now()
+            stats.backward_time += end - start[0]
+            self._event(stats.name, 'backward', start[0], end, {'node': node_name})
+
+        node.register_prehook(pre_hook)
+        node.register_hook(hook)
+
+    def ranked(self):
+        return sorted(self.stats.values(), key=lambda s: s.total_time(), reverse=True)
+
+    # totals per |key|(stats), e.g. the layer type or the enclosing block
+    def grouped(self, key):
+        groups = OrderedDict()
+        for stats in self.stats.values():
+            group = groups.setdefault(key(stats), OrderedDict([
+                ('layers', 0), ('forward', 0.0), ('backward', 0.0), ('flops', 0), ('bytes', 0)]))
+            group['layers'] += 1
+            group['forward'] += stats.forward_time
+            group['backward'] += stats.backward_time
+            group['flops'] += stats.flops + stats.backward_flops
+            group['bytes'] += stats.bytes
+        return sorted(groups.items(), key=lambda item: item[1]['forward'] + item[1]['backward'], reverse=True)
+
+    def format_table(self, top=30, steps=1):
+        """Ranked per layer, per type and per block tables, times per step."""
+        total = sum(s.total_time() for s in self.stats.values()) or 1e-12
+        lines = ['%-40s %-16s %9s %9s %6s %9s %9s %8s  %s' % (
+            'layer', 'type', 'fwd ms', 'bwd ms', '%', 'GFLOP', 'MB', 'GFLOP/s', 'output')]
+        for s in self.ranked()[:top]:
+            flops = s.flops + s.backward_flops
+            lines.append('%-40s %-16s %9.3f %9.3f %6.2f %9.3f %9.2f %8.1f  %s' % (
+                s.name[-40:], s.type[:16], s.forward_time * 1000 / steps, s.backward_time * 1000 / steps,
+                100.0 * s.total_time() / total, flops / 1e9 / steps, s.bytes / (1024.0 * 1024.0) / steps,
+                flops / 1e9 / max(s.total_time(), 1e-12), 'x'.join(str(d) for d in s.output_shape)))
+        for title, key in (('type', lambda s: s.type), ('block', lambda s: '.'.join(s.name.split('.')[:3]))):
+            lines.append('')
+            lines.append('%-40s %6s %9s %9s %6s %9s %9s' % (title, 'layers', 'fwd ms', 'bwd ms', '%', 'GFLOP', 'MB'))
+            for name, group in self.grouped(key):
+                lines.append('%-40s %6d %9.3f %9.3f %6.2f %9.3f %9.2f' % (
+                    name[-40:], group['layers'], group['forward'] * 1000 / steps, group['backward'] * 1000 / steps,
+                    100.0 * (group['forward'] + group['backward']) / total, group['flops'] / 1e9 / steps,
+                    group['bytes'] / (1024.0 * 1024.0) / steps))
+        return '\n'.join(lines)
+
+    def write_trace(self, path):
+        """Chrome trace (chrome://tracing, Perfetto) of the recorded intervals."""
+        with open(path, 'wt') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
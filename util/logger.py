@@ -0,0 +1,232 @@
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import torch
+
+
+class TextSink():
+    def __init__(self, log_name, echo=True):
+        self.log_file = open(log_name, 'a')
+        self.echo = echo
+
+    def write(self, record):
+        if record['phase'] == 'train':
+            message = '(epoch: %d/%d, iters: %d/%d, time: %.3f) ' % (
+                record['epoch'], record['total_epoch'], record['iters'], record['total_iters'], record['time'])
+        else:
+            message = '(%s epoch: %d) ' % (record['phase'], record['epoch'])
+        for k, v in record['values'].items():
+            message += '%s: %.3f ' % (k, v)
+        if self.echo:
+            print(message)
+        self.log_file.write('%s\n' % message)
+        self.log_file.flush()
+
+    def close(self):
+        self.log_file.close()
+
+
+class JsonlSink():
+    def __init__(self, log_name):
+        self.log_file = open(log_name, 'a')
+
+    def write(self, record):
+        self.log_file.write(json.dumps(record) + '\n')
+        self.log_file.flush()
+
+    def close(self):
+        self.log_file.close()
+
+
+class CsvSink():
+    """One row per record. Columns are fixed by the first record of each phase."""
+
+    def __init__(self, log_name):
+        self.log_name = log_name
+        self.writers = {}
+        self.files = []
+
+    def write(self, record):
+        row = OrderedDict((k, v) for k, v in record.items() if k != 'values')
+        row.update(record['values'])
+        phase = record['phase']
+        if phase not in self.writers:
+            root, ext = os.path.splitext(self.log_name)
+            path = self.log_name if phase == 'train' else '%s_%s%s' % (root, phase, ext)
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            f = open(path, 'a', newline='')
+            self.files.append(f)
+            self.writers[phase] = (csv.DictWriter(f, fieldnames=list(row.keys()), extrasaction='ignore'), f)
+            if new_file:
+                self.writers[phase][0].writeheader()
+        writer, f = self.writers[phase]
+        writer.writerow(row)
+        f.flush()
+
+    def close(self):
+        for f in self.files:
+            f.close()
+
+
+class VisdomSink():
+    """Plots every value in its own window. The client is created lazily on the
+    sink's worker thread; if visdom is missing or the server cannot be reached
+    the sink disables itself instead of failing training."""
+
+    def __init__(self, port, server='http://localhost', env='main'):
+        self.port = port
+        self.server = server
+        self.env = env
+        self.vis = None
+        self.disabled = False
+
+    def _connect(self):
+        try:
+            import visdom
+            # the sink only pushes plots, so skip the event socket and its startup wait
+            self.vis = visdom.Visdom(server=self.server, port=self.port, env=self.env, raise_exceptions=True,
+                                     use_incoming_socket=False)
+            if not self.vis.check_connection(timeout_seconds=2):
+                raise ConnectionError('no visdom server at %s:%d' % (self.server, self.port))
+        except Exception as e:
+            print('visdom sink disabled: %s' % e)
+            self.disabled = True
+
+    def write(self, record):
+        if self.disabled:
+            return
+        if self.vis is None:
+            self._connect()
+            if self.disabled:
+                return
+        for k, v in record['values'].items():
+            win = k if record['phase'] == 'train' else '%s_%s' % (record['phase'], k)
+            try:
+                self.vis.line(X=np.array([record['x']]), Y=np.array([v]),
+                              opts={'title': win + ' loss over time', 'xlabel': 'epoch', 'ylabel': 'loss'},
+                              update='append', win=win)
+            except Exception as e:
+                print('visdom sink disabled: %s' % e)
+                self.disabled = True
+                return
+
+    def close(self):
+        pass
+
+
+class _SinkWorker():
+    # each sink gets its own thread and bounded queue, so a slow sink only drops
+    # its own oldest records and never blocks the others or the training loop
+    def __init__(self, sink, max_pending):
+        self.sink = sink
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.dropped = 0
+        self.thread = threading.Thread(target=self._run, name='metrics-%s' % type(sink).__name__, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            if record is None:
+                self.sink.close()
+                return
+            try:
+                self.sink.write(record)
+            except Exception as e:
+                print('%s failed: %s' % (type(self.sink).__name__, e))
+
+    def put(self, record):
+        while True:
+            try:
+                self.queue.put_nowait(record)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def close(self, timeout=None):
+        self.put(None)
+        self.thread.join(timeout)
+
+
+class MetricsLogger():
+    """Buffers losses on their device and hands averaged records to sinks.
+
+    accumulate() only adds detached loss tensors to running sums, so it never
+    synchronizes with the gpu. log() copies all sums to the host in a single
+    transfer and queues the record for the sinks' background threads.
+    """
+
+    def __init__(self, sinks, max_pending=64):
+        self.workers = [_SinkWorker(sink, max_pending) for sink in sinks]
+        self.sums = OrderedDict()
+        self.count = 0
+
+    def accumulate(self, losses):
+        for k, v in losses.items():
+            v = v.detach()
+            if k in self.sums:
+                self.sums[k].add_(v)
+            else:
+                self.sums[k] = v.clone().float()
+        self.count += 1
+
+    def reset(self):
+        self.sums = OrderedDict()
+        self.count = 0
+
+    # mean of everything accumulated since the last call, as python floats
+    def pop_means(self):
+        if self.count == 0:
+            return OrderedDict()
+        means = torch.stack([v.reshape(()) for v in self.sums.values()]).div_(self.count).cpu().tolist()
+        result = OrderedDict(zip(self.sums.keys(), means))
+        self.reset()
+        return result
+
+    def log(self, phase, epoch, values, x=None, **extra):
+        record = OrderedDict([('phase', phase), ('epoch', epoch),
+                              ('x', epoch if x is None else x),
+                              ('timestamp', time.time())])
+        record.update(extra)
+        record['values'] = OrderedDict(values)
+        for worker in self.workers:
+            worker.put(record)
+
+    def flush_train(self, epoch, total_epoch, iters, total_iters, t):
+        values = self.pop_means()
+        if values:
+            self.log('train', epoch, values, x=epoch + float(iters) / total_iters, total_epoch=total_epoch,
+                     iters=iters, total_iters=total_iters, time=t)
+
+    def close(self, timeout=10):
+        for worker in self.workers:
+            worker.close(timeout)
+
+
+def create_logger(opt):
+    expr_dir = os.path.join(opt.checkpoints_dir, opt.name)
+    sinks = []
+    for name in opt.log_sinks.split(','):
+        name = name.strip()
+        if name == 'text':
+            sinks.append(TextSink(os.path.join(expr_dir, 'loss_log.txt')))
+        elif name == 'jsonl':
+            sinks.append(JsonlSink(os.path.join(expr_dir, 'loss_log.jsonl')))
+        elif name == 'csv':
+            sinks.append(CsvSink(os.path.join(expr_dir, 'loss_log.csv')))
+        elif name == 'visdom':
+            if opt.display_id > 0:
+                sinks.append(VisdomSink(opt.display_port))
+        elif name:
+            raise ValueError("Log sink [%s] not recognized." % name)
+    return MetricsLogger(sinks, max_pending=opt.log_queue_size)
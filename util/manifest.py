@@ -0,0 +1,85 @@
+import hashlib
+import json
+import os
+import time
+
+
+def file_digest(path, length=16):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()[:length]
+
+
+def config_digest(values, length=16):
+    return hashlib.sha1(json.dumps(values, sort_keys=True).encode()).hexdigest()[:length]
+
+
+class OutputManifest():
+    """Processed inputs of a results directory, for incremental re-runs.
+
+    manifest.jsonl holds one line per processed input with its path, size,
+    mtime, the checkpoint ID it was processed with and its output files
+    (relative to the manifest). Lines are appended as frames are done, so an
+    interrupted run keeps what it finished; the last line of a path wins.
+    An input is current when its size and mtime are unchanged, the
+    checkpoint ID matches and all of its outputs still exist.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.root = os.path.dirname(path)
+        self.entries = {}
+        self.lines = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # a line cut short by an interrupted run
+                        continue
+                    self.entries[entry['path']] = entry
+                    self.lines += 1
+        self.file = None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def is_current(self, path, checkpoint):
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None or entry['checkpoint'] != checkpoint:
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        if entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            return False
+        return all(os.path.exists(os.path.join(self.root, output)) for output in entry['outputs'])
+
+    def record(self, path, checkpoint, outputs=()):
+        if self.file is None:
+            self.file = open(self.path, 'a')
+        stat = os.stat(path)
+        entry = {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'checkpoint': checkpoint, 'outputs': [os.path.relpath(o, self.root) for o in outputs],
+                 'time': time.strftime('%Y-%m-%d %H:%M:%S')}
+        self.entries[entry['path']] = entry
+        self.file.write(json.dumps(entry) + '\n')
+        self.file.flush()
+        self.lines += 1
+
+    # rewrites the file without superseded lines once they are the majority
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.lines > 2 * len(self.entries):
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'wt') as f:
+                for entry in self.entries.values():
+                    f.write(json.dumps(entry) + '\n')
+            os.replace(tmp_path, self.path)
+            self.lines = len(self.entries)
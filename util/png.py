@@ -1,33 +1,65 @@
 import struct
 import zlib
 
-def encode(buf, width, height):
-  """ buf: must be bytes or a bytearray in py3, a regular string in py2. formatted RGBRGB... """
-  assert (width * height * 3 == len(buf))
-  bpp = 3
-
-  def raw_data():
-    # reverse the vertical line order and add null bytes at the start
-    row_bytes = width * bpp
-    for row_start in range((height - 1) * width * bpp, -1, -row_bytes):
-      yield b'\x00'
-      yield buf[row_start:row_start + row_bytes]
-
-  def chunk(tag, data):
-    return [
-        struct.pack("!I", len(data)),
-        tag,
-        data,
-        struct.pack("!I", 0xFFFFFFFF & zlib.crc32(data, zlib.crc32(tag)))
-      ]
-
-  SIGNATURE = b'\x89PNG\r\n\x1a\n'
-  COLOR_TYPE_RGB = 2
-  COLOR_TYPE_RGBA = 6
-  bit_depth = 8
+SIGNATURE = b'\x89PNG\r\n\x1a\n'
+COLOR_TYPE_GRAY = 0
+COLOR_TYPE_RGB = 2
+COLOR_TYPE_RGBA = 6
+COLOR_TYPES = {1: COLOR_TYPE_GRAY, 3: COLOR_TYPE_RGB, 4: COLOR_TYPE_RGBA}
+
+
+def _chunk(tag, data):
+  return [
+      struct.pack("!I", len(data)),
+      tag,
+      data,
+      struct.pack("!I", 0xFFFFFFFF & zlib.crc32(data, zlib.crc32(tag)))
+    ]
+
+
+def _png(raw, width, height, bit_depth, color_type, level):
   return b''.join(
       [ SIGNATURE ] +
-      chunk(b'IHDR', struct.pack("!2I5B", width, height, bit_depth, COLOR_TYPE_RGB, 0, 0, 0)) +
-      chunk(b'IDAT', zlib.compress(b''.join(raw_data()), 9)) +
-      chunk(b'IEND', b'')
+      _chunk(b'IHDR', struct.pack("!2I5B", width, height, bit_depth, color_type, 0, 0, 0)) +
+      _chunk(b'IDAT', zlib.compress(raw, level)) +
+      _chunk(b'IEND', b'')
     )
+
+
+def encode(buf, width, height, channels=3, bit_depth=8, level=9):
+  """ buf: must be bytes or a bytearray in py3, a regular string in py2. formatted RGBRGB...
+  rows are stored bottom-up. 16-bit samples must be big-endian. """
+  bpp = channels * bit_depth // 8
+  assert (width * height * bpp == len(buf))
+
+  # reverse the vertical line order and add null bytes at the start
+  row_bytes = width * bpp
+  raw = bytearray((row_bytes + 1) * height)
+  view = memoryview(buf)
+  for i, row_start in enumerate(range((height - 1) * row_bytes, -1, -row_bytes)):
+    start = i * (row_bytes + 1) + 1
+    raw[start:start + row_bytes] = view[row_start:row_start + row_bytes]
+
+  return _png(bytes(raw), width, height, bit_depth, COLOR_TYPES[channels], level)
+
+
+def encode_array(image, level=6):
+  """ image: numpy uint8 or uint16 array, (H, W), (H, W, 1), (H, W, 3) or (H, W, 4), rows top-down. """
+  import numpy as np
+  if image.ndim == 2:
+    image = image[:, :, None]
+  height, width, channels = image.shape
+  if image.dtype == np.uint8:
+    bit_depth = 8
+  elif image.dtype == np.uint16:
+    bit_depth = 16
+    image = image.astype('>u2')
+  else:
+    raise ValueError('unsupported dtype %s, expected uint8 or uint16' % image.dtype)
+
+  # filter type 0 (none) in front of every row
+  rows = np.ascontiguousarray(image).view(np.uint8).reshape(height, -1)
+  raw = np.empty((height, rows.shape[1] + 1), dtype=np.uint8)
+  raw[:, 0] = 0
+  raw[:, 1:] = rows
+  return _png(raw.tobytes(), width, height, bit_depth, COLOR_TYPES[channels], level)
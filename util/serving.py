@@ -0,0 +1,300 @@
+import asyncio
+import io
+import json
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import torch
+from PIL import Image
+
+from . import png
+from .timer import StageTimer
+
+
+# Frames travel as PNG (or anything PIL can open), or as raw bytes with
+# X-Width, X-Height and X-Dtype (uint8 | uint16) headers.
+def decode_frame(body, headers, input_nc=1):
+    content_type = headers.get('content-type', '')
+    if content_type.startswith('application/octet-stream'):
+        dtype = np.dtype(headers.get('x-dtype', 'uint8'))
+        shape = (int(headers['x-height']), int(headers['x-width']))
+        image = np.frombuffer(body, dtype=dtype).reshape(shape)
+    elif input_nc == 1:
+        # as SingleDataset reads its inputs: 16-bit frames are scaled to 8 bits, not clipped;
+        # imported here so restore.py can use the tensor conversions without cv2
+        import cv2
+        image = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise ValueError('not an image')
+    else:
+        image = np.array(Image.open(io.BytesIO(body)).convert('RGB'))
+    return frame_to_tensor(image)
+
+
+# same scaling as ToTensor + Normalize((0.5), (0.5)) in the datasets
+def frame_to_tensor(image):
+    scale = float(np.iinfo(image.dtype).max)
+    tensor = torch.from_numpy(image.astype(np.float32) / scale * 2 - 1)
+    if tensor.dim() == 2:
+        tensor = tensor.unsqueeze(0)
+    else:
+        tensor = tensor.permute(2, 0, 1)
+    return tensor.contiguous()
+
+
+def tensor_to_frame(tensor, bit_depth=8):
+    imtype = np.uint16 if bit_depth == 16 else np.uint8
+    image = (tensor.float().numpy().transpose(1, 2, 0) + 1) / 2.0 * float(np.iinfo(imtype).max)
+    return image.clip(0, np.iinfo(imtype).max).astype(imtype)
+
+
+def encode_frame(tensor, headers, bit_depth=8, level=1):
+    image = tensor_to_frame(tensor, bit_depth)
+    if headers.get('accept', '').startswith('application/octet-stream'):
+        return 'application/octet-stream', image.tobytes(), {
+            'X-Width': str(image.shape[1]), 'X-Height': str(image.shape[0]), 'X-Dtype': str(image.dtype)}
+    return 'image/png', png.encode_array(image, level), {}
+
+
+class DynamicBatcher():
+    """Merges concurrent requests into generator batches.
+
+    A batch is closed when it holds |max_batch_size| frames or |max_wait| seconds
+    after its first frame arrived. Only frames of the same shape for the same
+    model share a batch; others wait for the next one. |run_batch| is called
+    with the frames and the model they were submitted for. The generator runs on a single worker thread,
+    so the event loop keeps accepting requests meanwhile.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait=0.005, max_queue=256):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.pending = []
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='generator')
+        self.timer = StageTimer(window=1000)
+        self.batches = 0
+        self.frames = 0
+        self.task = None
+
+    def start(self):
+        self.task = asyncio.ensure_future(self._loop())
+
+    def depth(self):
+        return self.queue.qsize() + len(self.pending)
+
+    def full(self):
+        return self.queue.full()
+
+    # future of the output; raises asyncio.QueueFull when the queue is full
+    def submit(self, tensor, model=None):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((tensor, future, time.perf_counter(), model))
+        return future
+
+    async def _next(self, timeout=None):
+        if self.pending:
+            return self.pending.pop(0)
+        if timeout is None:
+            return await self.queue.get()
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    def _next_nowait(self):
+        if self.pending:
+            return self.pending.pop(0)
+        return self.queue.get_nowait()
+
+    async def _collect(self):
+        first = await self._next()
+        batch = [first]
+        deferred = []
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                # past the deadline, still take whatever is already queued
+                if remaining > 0:
+                    item = await self._next(remaining)
+                else:
+                    item = self._next_nowait()
+            except (asyncio.TimeoutError, asyncio.QueueEmpty):
+                break
+            if item[0].shape == first[0].shape and item[3] is first[3]:
+                batch.append(item)
+            else:
+                deferred.append(item)
+        self.pending = deferred + self.pending
+        return batch
+
+    async def _loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            tensors = [item[0] for item in batch]
+            start = time.perf_counter()
+            try:
+                outputs = await loop.run_in_executor(self.executor, self.run_batch, tensors, batch[0][3])
+            except Exception as e:
+                for _, future, _, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            now = time.perf_counter()
+            self.timer.add('batch', now - start)
+            self.batches += 1
+            self.frames += len(batch)
+            for (_, future, enqueued, _), output in zip(batch, outputs):
+                self.timer.add('latency', now - enqueued)
+                if not future.done():
+                    future.set_result(output)
+
+    def stats(self):
+        result = OrderedDict([('queue_depth', self.depth()), ('batches', self.batches), ('frames', self.frames),
+                              ('mean_batch_size', float(self.frames) / max(1, self.batches))])
+        for name in ('latency', 'batch'):
+            pct = self.timer.percentiles(name, (50, 95, 99))
+            for k, v in pct.items():
+                result['%s_%s_ms' % (name, k)] = v * 1000
+        return result
+
+
+class InferenceServer():
+    """Minimal asyncio HTTP/1.1 server around a DynamicBatcher.
+
+    POST /restore    frame in, restored frame out (PNG unless Accept asks for raw)
+    GET  /stats      queue depth, batch sizes and latency percentiles as JSON
+    GET  /health     200 once the model is loaded
+
+    With a ModelRegistry, /restore?model=<name>&epoch=<epoch> picks the
+    checkpoint (default_model when omitted), GET /models lists the resident
+    ones and POST /models/load?model=..&epoch=.. starts loading one in the
+    background. A request for a model that is not resident waits for its load
+    while requests for resident models keep being served. Model names are
+    checked by the registry, names with path separators or '..' get a 400.
+    Without a registry every frame is submitted with model None and
+    |run_batch| serves its default generator.
+    """
+
+    def __init__(self, batcher, input_nc=1, bit_depth=8, png_level=1, max_body=64 * 1024 * 1024,
+                 registry=None, default_model=None):
+        self.batcher = batcher
+        self.registry = registry
+        self.default_model = default_model
+        self.input_nc = input_nc
+        self.bit_depth = bit_depth
+        self.png_level = png_level
+        self.max_body = max_body
+        self.started = time.time()
+        self.requests = 0
+        self.rejected = 0
+        self.server = None
+
+    async def start(self, host, port):
+        self.batcher.start()
+        self.server = await asyncio.start_server(self.handle, host, port)
+        return self.server
+
+    def stats(self):
+        result = OrderedDict([('uptime', time.time() - self.started), ('requests', self.requests),
+                              ('rejected', self.rejected)])
+        result.update(self.batcher.stats())
+        if self.registry is not None:
+            result['models'] = self.registry.stats()
+        return result
+
+    def _model_key(self, query):
+        name, which_epoch = self.default_model
+        query = query or {}
+        return query.get('model', [name])[0], query.get('epoch', [which_epoch])[0]
+
+    async def dispatch(self, method, path, headers, body, query=None):
+        if method == 'GET' and path == '/health':
+            return 200, 'text/plain', b'ok', {}
+        if method == 'GET' and path == '/stats':
+            return 200, 'application/json', json.dumps(self.stats()).encode(), {}
+        if self.registry is not None and method == 'GET' and path == '/models':
+            return 200, 'application/json', json.dumps(self.registry.stats()).encode(), {}
+        if self.registry is not None and method == 'POST' and path == '/models/load':
+            try:
+                self.registry.prefetch(*self._model_key(query))
+            except ValueError as e:
+                return 400, 'text/plain', str(e).encode(), {}
+            return 202, 'application/json', json.dumps(self.registry.stats()).encode(), {}
+        if method == 'POST' and path == '/restore':
+            if self.batcher.full():
+                self.rejected += 1
+                return 503, 'text/plain', b'queue full', {}
+            loop = asyncio.get_running_loop()
+            try:
+                tensor = await loop.run_in_executor(None, decode_frame, body, headers, self.input_nc)
+            except Exception as e:
+                return 400, 'text/plain', ('cannot decode frame: %s' % e).encode(), {}
+            model = None
+            if self.registry is not None:
+                try:
+                    model = await asyncio.wrap_future(self.registry.prefetch(*self._model_key(query)))
+                except ValueError as e:
+                    return 400, 'text/plain', str(e).encode(), {}
+                except (IOError, OSError) as e:
+                    return 404, 'text/plain', ('cannot load model: %s' % e).encode(), {}
+            try:
+                # the queue may have filled while the frame was decoded or the model loaded
+                future = self.batcher.submit(tensor, model)
+            except asyncio.QueueFull:
+                self.rejected += 1
+                return 503, 'text/plain', b'queue full', {}
+            self.requests += 1
+            output = await future
+            content_type, payload, extra = await loop.run_in_executor(
+                None, encode_frame, output, headers, self.bit_depth, self.png_level)
+            return 200, content_type, payload, extra
+        return 404, 'text/plain', b'not found', {}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, value = line.decode('latin-1').split(':', 1)
+                    headers[key.strip().lower()] = value.strip()
+                length = int(headers.get('content-length', 0))
+                if length > self.max_body:
+                    status, content_type, payload, extra = 413, 'text/plain', b'frame too large', {}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    try:
+                        url = urlsplit(target)
+                        status, content_type, payload, extra = await self.dispatch(
+                            method, url.path, headers, body, parse_qs(url.query))
+                    except Exception as e:
+                        status, content_type, payload, extra = 500, 'text/plain', str(e).encode(), {}
+                    keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                response = ['HTTP/1.1 %d %s' % (status, _REASONS.get(status, '')),
+                            'Content-Type: %s' % content_type,
+                            'Content-Length: %d' % len(payload),
+                            'Connection: %s' % ('keep-alive' if keep_alive else 'close')]
+                response += ['%s: %s' % item for item in extra.items()]
+                writer.write(('\r\n'.join(response) + '\r\n\r\n').encode('latin-1') + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: 'OK', 202: 'Accepted', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large',
+            500: 'Internal Server Error', 503: 'Service Unavailable'}
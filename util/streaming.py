@@ -0,0 +1,176 @@
+import collections
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from data.image_folder import is_image_file
+
+
+class FrameQueue():
+    """Bounded queue between the acquisition and the generator.
+
+    With policy 'drop_oldest' a full queue discards its oldest frame so the
+    newest always gets in; with 'block' the producer waits for space.
+    """
+
+    def __init__(self, maxsize=8, policy='drop_oldest'):
+        if policy not in ('drop_oldest', 'block'):
+            raise ValueError("Drop policy [%s] not recognized." % policy)
+        self.maxsize = maxsize
+        self.policy = policy
+        self.items = collections.deque()
+        self.cond = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def put(self, item):
+        with self.cond:
+            if self.policy == 'block':
+                while len(self.items) >= self.maxsize and not self.closed:
+                    self.cond.wait()
+            elif len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.cond.notify_all()
+
+    # up to |n| frames; waits at most |timeout| for the first one
+    def get_many(self, n, timeout=None):
+        with self.cond:
+            if not self.items and not self.closed:
+                self.cond.wait(timeout)
+            batch = []
+            while self.items and len(batch) < n:
+                batch.append(self.items.popleft())
+            self.cond.notify_all()
+            return batch
+
+    # drop queued frames older than |max_age| seconds, the newest is always kept
+    def drop_stale(self, max_age, now):
+        with self.cond:
+            while len(self.items) > 1 and now - self.items[0][2] > max_age:
+                self.items.popleft()
+                self.dropped += 1
+            self.cond.notify_all()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+
+    def done(self):
+        with self.cond:
+            return self.closed and not self.items
+
+    def __len__(self):
+        return len(self.items)
+
+
+def read_image(path, input_nc=1):
+    if input_nc == 1:
+        # as SingleDataset reads its inputs: 16-bit frames are scaled to 8 bits, not clipped
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if image is None:
+            raise IOError('cannot read image %s' % path)
+        return image
+    return np.array(Image.open(path).convert('RGB'))
+
+
+class DirectoryWatcher():
+    """Yields (name, frame) for image files appearing in |root|.
+
+    A file is picked up once its size is unchanged between two polls, so frames
+    that are still being written are not read half-way. Files already present
+    at start are skipped unless |include_existing|.
+    """
+
+    def __init__(self, root, poll_interval=0.05, input_nc=1, include_existing=False):
+        self.root = root
+        self.poll_interval = poll_interval
+        self.input_nc = input_nc
+        self.seen = set()
+        self.sizes = {}
+        if not include_existing:
+            self.seen.update(entry.path for entry in os.scandir(root) if is_image_file(entry.name))
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def __iter__(self):
+        while not self.stopped:
+            ready = []
+            for entry in os.scandir(self.root):
+                if entry.path in self.seen or not is_image_file(entry.name):
+                    continue
+                stat = entry.stat()
+                if self.sizes.get(entry.path) == stat.st_size and stat.st_size > 0:
+                    ready.append((stat.st_mtime, entry.path))
+                else:
+                    self.sizes[entry.path] = stat.st_size
+            for _, path in sorted(ready):
+                self.seen.add(path)
+                self.sizes.pop(path, None)
+                try:
+                    frame = read_image(path, self.input_nc)
+                except (IOError, OSError) as e:
+                    print('skipping %s: %s' % (path, e))
+                    continue
+                yield os.path.basename(path), frame
+            if not ready:
+                time.sleep(self.poll_interval)
+
+
+class RawFrameReader():
+    """Yields (name, frame) from a stream of back-to-back raw frames."""
+
+    def __init__(self, stream, width, height, dtype='uint8', channels=1):
+        self.stream = stream
+        self.dtype = np.dtype(dtype)
+        self.shape = (height, width) if channels == 1 else (height, width, channels)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def __iter__(self):
+        index = 0
+        while not self.stopped:
+            data = self.stream.read(self.frame_bytes)
+            if len(data) < self.frame_bytes:
+                return
+            yield 'frame_%08d' % index, np.frombuffer(data, dtype=self.dtype).reshape(self.shape)
+            index += 1
+
+
+class StreamStats():
+    """Rolling achieved fps and lag over the last |window| seconds."""
+
+    def __init__(self, window=5.0):
+        self.window = window
+        self.events = collections.deque()
+        self.total = 0
+
+    def add(self, now, lags):
+        for lag in lags:
+            self.events.append((now, lag))
+        self.total += len(lags)
+        while self.events and now - self.events[0][0] > self.window:
+            self.events.popleft()
+
+    def fps(self, now):
+        if not self.events:
+            return 0.0
+        span = max(now - self.events[0][0], 1e-3)
+        return len(self.events) / span
+
+    def lag(self, q=50):
+        lags = sorted(lag for _, lag in self.events)
+        if not lags:
+            return 0.0
+        return lags[min(len(lags) - 1, int(round(q / 100.0 * (len(lags) - 1))))]
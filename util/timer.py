@@ -0,0 +1,183 @@
+import json
+import time
+from collections import OrderedDict, deque
+
+
+class _NullStage():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage():
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.timer.sync_cuda:
+            import torch
+            torch.cuda.synchronize()
+        self.timer.add(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Merged():
+    def __init__(self, timer):
+        self.timer = timer
+
+    def __enter__(self):
+        self.timer.pending = OrderedDict()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        pending, self.timer.pending = self.timer.pending, None
+        for name, seconds in pending.items():
+            self.timer.add(name, seconds)
+        return False
+
+
+class StageTimer():
+    """Wall time per named stage of the training loop.
+
+    Stages are timed with a monotonic clock. Each stage keeps a rolling window of
+    recent durations for percentiles plus per-epoch totals. When disabled, stage()
+    returns a shared no-op context and nothing is recorded.
+    """
+
+    def __init__(self, enabled=True, window=200, sync_cuda=False):
+        self.enabled = enabled
+        self.window = window
+        self.sync_cuda = sync_cuda
+        self.recent = OrderedDict()
+        self.pending = None
+        self.reset_epoch()
+
+    def reset_epoch(self):
+        self.totals = OrderedDict()
+        self.counts = OrderedDict()
+        self.images = 0
+        self.epoch_start = time.perf_counter()
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    # stages entered several times inside the block record one summed duration
+    # each when it ends, e.g. once per micro-batch but one sample per step
+    def merged(self):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Merged(self)
+
+    def add(self, name, seconds):
+        if self.pending is not None:
+            self.pending[name] = self.pending.get(name, 0.0) + seconds
+            return
+        if name not in self.totals:
+            self.totals[name] = 0.0
+            self.counts[name] = 0
+        if name not in self.recent:
+            self.recent[name] = deque(maxlen=self.window)
+        self.totals[name] += seconds
+        self.counts[name] += 1
+        self.recent[name].append(seconds)
+
+    # time spent waiting on each next() of |iterable| is recorded under |name|
+    def iterate(self, iterable, name='data'):
+        if not self.enabled:
+            for item in iterable:
+                yield item
+            return
+        it = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+            self.add(name, time.perf_counter() - start)
+            yield item
+
+    def step(self, n_images):
+        if self.enabled:
+            self.images += n_images
+
+    def percentiles(self, name, qs=(50, 90, 99)):
+        values = sorted(self.recent.get(name, ()))
+        if not values:
+            return OrderedDict(('p%d' % q, 0.0) for q in qs)
+        result = OrderedDict()
+        for q in qs:
+            idx = min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))
+            result['p%d' % q] = values[idx]
+        return result
+
+    def images_per_sec(self):
+        elapsed = time.perf_counter() - self.epoch_start
+        if elapsed <= 0:
+            return 0.0
+        return self.images / elapsed
+
+    def summary(self):
+        stages = OrderedDict()
+        for name, total in self.totals.items():
+            stage = OrderedDict([('total', total), ('count', self.counts[name]),
+                                 ('mean', total / max(1, self.counts[name]))])
+            stage.update(self.percentiles(name))
+            stages[name] = stage
+        return OrderedDict([('elapsed', time.perf_counter() - self.epoch_start),
+                            ('images', self.images),
+                            ('images_per_sec', self.images_per_sec()),
+                            ('stages', stages)])
+
+    def format_summary(self):
+        message = '(images/sec: %.2f) ' % self.images_per_sec()
+        for name in self.recent:
+            pct = self.percentiles(name)
+            message += '%s: p50 %.4f p90 %.4f ' % (name, pct['p50'], pct['p90'])
+        return message
+
+    # append this epoch's breakdown as one JSON line
+    def write_epoch(self, log_name, epoch):
+        if not self.enabled:
+            return
+        record = OrderedDict([('epoch', epoch), ('time', time.strftime('%Y-%m-%d %H:%M:%S'))])
+        record.update(self.summary())
+        with open(log_name, 'a') as log_file:
+            log_file.write(json.dumps(record) + '\n')
+
+
+# modules only some features need; the fast-start path should not load them
+OPTIONAL_MODULES = ('visdom', 'dominate', 'pytorch_msssim', 'cv2', 'scipy', 'torchvision', 'pdb')
+
+
+class StartupReport(StageTimer):
+    """Wall time of the startup phases (imports, options, model build, ...).
+
+    |start| is a time.perf_counter() value taken at the top of the entry point,
+    before any heavy import. Run with python -X importtime for a per-module view.
+    """
+
+    def __init__(self, start):
+        StageTimer.__init__(self, window=1)
+        self.start = start
+
+    def format_report(self):
+        lines = ['startup %.1f ms' % ((time.perf_counter() - self.start) * 1000)]
+        for name, total in self.totals.items():
+            lines.append('  %-14s %8.1f ms' % (name, total * 1000))
+        import sys
+        loaded = [name for name in OPTIONAL_MODULES if name in sys.modules]
+        lines.append('  optional modules loaded: %s' % (', '.join(loaded) if loaded else 'none'))
+        return '\n'.join(lines)
@@ -15,7 +15,7 @@ def tensor2im(image_tensor, imtype=np.uint8):
     image_numpy = image_tensor[0].cpu().float().numpy()  # 只选了第一个
     # print('min-max:{}-{}'.format(np.min(image_numpy),np.max(image_numpy)))
     # change color channel to last dim
-    image_numpy = (np.transpose(image_numpy, (1, 2, 0)) + 1) / 2.0 * 255.0
+    image_numpy = (np.transpose(image_numpy, (1, 2, 0)) + 1) / 2.0 * float(np.iinfo(imtype).max)
     return image_numpy.astype(imtype)
 
 
@@ -33,6 +33,12 @@ def diagnose_network(net, name='network'):
 
 
 def save_image(image_numpy, image_path):
+    if image_numpy.dtype == np.uint16:
+        # PIL has no 16-bit mode for every channel count, see util.png
+        from util import png
+        with open(image_path, 'wb') as f:
+            f.write(png.encode_array(image_numpy))
+        return
     image_pil = None
     if image_numpy.shape[2] == 1:
         image_numpy = np.reshape(image_numpy, (image_numpy.shape[0], image_numpy.shape[1]))
@@ -4,6 +4,7 @@ import ntpath
 import time
 from . import util
 from . import html
+from .image_writer import ImageWriter
 
 
 class Visualizer():
@@ -13,6 +14,9 @@ class Visualizer():
         self.use_html = opt.isTrain and not opt.no_html
         self.win_size = opt.display_winsize
         self.name = opt.name
+        self.image_writer = None
+        if opt.image_writer_threads > 0:
+            self.image_writer = ImageWriter(opt.image_writer_threads, level=opt.png_compression)
         if self.display_id > 0:
             import visdom
             self.vis = visdom.Visdom(port=opt.display_port)
@@ -23,11 +27,26 @@ class Visualizer():
             self.img_dir = os.path.join(self.web_dir, 'images')
             print('create web directory %s...' % self.web_dir)
             util.mkdirs([self.web_dir, self.img_dir])
+            self.webpage = html.PagedHTML(self.web_dir, 'Experiment name = %s' % self.name,
+                                          page_size=opt.html_page_size, reflesh=1, append=True)
+            self.html_epoch = None
         self.log_name = os.path.join(opt.checkpoints_dir, opt.name, 'loss_log.txt')
         with open(self.log_name, "a") as log_file:
             now = time.strftime("%c")
             log_file.write('================ Training Loss (%s) ================\n' % now)
 
+    # future of the background write, None when the image is already written
+    def save_image(self, image_numpy, image_path):
+        if self.image_writer is not None:
+            return self.image_writer.save(image_numpy, image_path)
+        util.save_image(image_numpy, image_path)
+        return None
+
+    # wait for pending image writes
+    def close(self):
+        if self.image_writer is not None:
+            self.image_writer.close()
+
     # |visuals|: dictionary of images to display or save
     def display_current_results(self, visuals, epoch):
         if self.display_id > 0:  # show images in the browser
@@ -75,22 +94,23 @@ class Visualizer():
         if self.use_html:  # save images to a html file
             for label, image_numpy in visuals.items():
                 img_path = os.path.join(self.img_dir, 'epoch%.3d_%s.png' % (epoch, label))
-                util.save_image(image_numpy, img_path)
-            # update website
-            webpage = html.HTML(self.web_dir, 'Experiment name = %s' % self.name, reflesh=1)
-            for n in range(epoch, 0, -1):
-                webpage.add_header('Results of Epoch [%d]' % n)
+                self.save_image(image_numpy, img_path)
+            # update website, one row per epoch; later displays of the same epoch
+            # overwrite the images the row already points at
+            if epoch != self.html_epoch:
+                self.html_epoch = epoch
+                self.webpage.add_header('Results of Epoch [%d]' % epoch)
                 ims = []
                 txts = []
                 links = []
 
                 for label, image_numpy in visuals.items():
-                    img_path = 'epoch%.3d_%s.png' % (n, label)
+                    img_path = 'epoch%.3d_%s.png' % (epoch, label)
                     ims.append(img_path)
                     txts.append(label)
                     links.append(img_path)
-                webpage.add_images(ims, txts, links, width=self.win_size)
-            webpage.save()
+                self.webpage.add_images(ims, txts, links, width=self.win_size)
+                self.webpage.save()
 
     # errors: dictionary of error labels and values
     def plot_current_errors(self, epoch, counter_ratio, opt, errors):
@@ -134,7 +154,7 @@ class Visualizer():
         with open(self.log_name, "a") as log_file:
             log_file.write('%s\n' % message)
 
-    # save image to the disk
+    # save image to the disk; returns the futures of its background writes
     def save_images(self, webpage, visuals, image_path):
         image_dir = webpage.get_image_dir()
         short_path = ntpath.basename(image_path[0])
@@ -144,13 +164,17 @@ class Visualizer():
         ims = []
         txts = []
         links = []
+        writes = []
 
         for label, image_numpy in visuals.items():
             image_name = '%s_%s.png' % (name, label)
             save_path = os.path.join(image_dir, image_name)
-            util.save_image(image_numpy, save_path)
+            write = self.save_image(image_numpy, save_path)
+            if write is not None:
+                writes.append(write)
 
             ims.append(image_name)
             txts.append(label)
             links.append(image_name)
         webpage.add_images(ims, txts, links, width=self.win_size)
+        return writes